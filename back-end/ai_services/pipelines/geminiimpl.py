@@ -1,15 +1,95 @@
-import requests
-from typing import Dict, Any
+import re
+import base64
+import atexit
+import logging
+import httpx
+import orjson
+from typing import Dict, Any, Optional, List, Tuple
+from .llmsbase import LLMServiceBase, normalize_entities, format_entity_list
 
+logger = logging.getLogger(__name__)
 
-import requests
-from typing import Dict, Any, Optional
-from pathlib import Path
-from dotenv import load_dotenv
-import os
-from .llmsbase import LLMServiceBase
+# Fallback patterns for responses that are not valid JSON
+_RISK_RE = re.compile(r'RISK_LEVEL\W*(Low|Medium|High)', re.IGNORECASE)
+_CONFIDENCE_RE = re.compile(r'CONFIDENCE\W*(\d+)', re.IGNORECASE)
 
+# Pooled HTTP clients shared by every GeminiService so keep-alive connections
+# (and their TLS sessions) are reused instead of reconnecting per call
+_HTTP_LIMITS = httpx.Limits(max_connections=32, max_keepalive_connections=16)
+_http_client = httpx.Client(timeout=60.0, limits=_HTTP_LIMITS)
+_async_http_client: Optional[httpx.AsyncClient] = None
 
+# Request bodies are serialized with orjson, much faster than the stdlib on
+# the large base64 image payloads
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+def _get_async_http_client() -> httpx.AsyncClient:
+    global _async_http_client
+    if _async_http_client is None:
+        _async_http_client = httpx.AsyncClient(timeout=60.0, limits=_HTTP_LIMITS)
+    return _async_http_client
+
+
+@atexit.register
+def _close_http_client() -> None:
+    _http_client.close()
+
+
+async def aclose_async_http_client() -> None:
+    """
+    Close the shared async client. Called from the app's lifespan shutdown,
+    on the event loop the client was used on.
+    """
+    global _async_http_client
+    if _async_http_client is not None:
+        client, _async_http_client = _async_http_client, None
+        await client.aclose()
+
+
+# Static instructions are sent as systemInstruction ahead of the per-request
+# content so the provider can reuse the cached prefix. Keep anything
+# per-request out of these.
+_IMAGE_SYSTEM_PROMPT = """Bạn là một AI phân tích lừa đảo chuyên nghiệp, hãy thật cân nhắc về các hình thức lừa đảo trên không gian mạng, đặc biệt ở Việt Nam.
+
+Hãy phân tích hình ảnh này một cách toàn diện để nhận diện các dấu hiệu lừa đảo, bao gồm:
+1. Nội dung văn bản trong hình ảnh
+2. Các yếu tố hình ảnh đáng ngờ (logo giả, thiết kế lừa đảo, v.v.)
+3. Các thông tin liên hệ và đường link
+4. Các dấu hiệu về thương hiệu, ngân hàng, hoặc tổ chức giả mạo
+
+Hãy cung cấp một phân tích chi tiết bao gồm:
+1. Mức độ nguy hiểm (Low/Medium/High)
+2. Các dấu hiệu nhận biết lừa đảo từ hình ảnh
+3. Các mối lo ngại về nội dung và thiết kế
+4. Đề xuất cho người dùng để bảo vệ
+5. Mức độ tin cậy của phân tích
+
+Hãy format câu trả lời của bạn dưới dạng json gồm những nội dung sau VÀ Ở TRONG NGÔN NGỮ TIẾNG VIỆT:
+RISK_LEVEL: [Low/Medium/High]
+CONFIDENCE: [0-100]
+ANALYSIS: [Phân tích chi tiết về hình ảnh và nội dung]
+RECOMMENDATIONS: [Các hành động phải làm]
+"""
+
+# Per-request part of the image prompt, only user data is spliced in
+_IMAGE_PROMPT_TMPL = """NỘI DUNG VĂN BẢN ĐÃ TRÍCH XUẤT (nếu có):
+{text_block}
+
+CÁC THỰC THỂ ĐÃ ĐƯỢC TRÍCH XUẤT:
+Các số điện thoại:
+{phones}
+Đường dẫn URLs:
+{urls}
+"""
+
+_TEXT_PROMPT_TMPLS = {
+    "general": "Analyze the following text and provide insights: {text}",
+    "sentiment": "Analyze the sentiment of this text: {text}",
+    "summary": "Provide a summary of this text: {text}"
+}
+
+_NO_TEXT = "Không có văn bản được trích xuất"
 
 
 class GeminiService(LLMServiceBase):
@@ -22,9 +102,11 @@ class GeminiService(LLMServiceBase):
         super().__init__(api_key=api_key, api_key_env="GEMINI_API_KEY")
         self.base_model = "gemini-2.0-flash"
         self.base_url = f"https://generativelanguage.googleapis.com/v1beta/models/{self.base_model}:generateContent"
+        self.batch_url = f"https://generativelanguage.googleapis.com/v1beta/models/{self.base_model}:batchGenerateContent"
     
     
-    def analyze_image_scam_risk(self, image_path: str, text: str, entities: Dict[str, Any]) -> Dict[str, Any]:
+    def analyze_image_scam_risk(self, image_path: str, text: str, entities: Dict[str, Any],
+                                prepared_image: Optional[Tuple[bytes, str]] = None) -> Dict[str, Any]:
         """
         Analyze image for scam or fraud risk using Gemini LLM with multimodal capabilities
         
@@ -32,56 +114,93 @@ class GeminiService(LLMServiceBase):
             image_path: Path to the image file
             text: Text extracted from screenshot
             entities: Dictionary containing extracted entities (phones, urls, etc.)
+            prepared_image: Optional (bytes, MIME type) from _prepare_image_for_vision
             
         Returns:
             Dictionary containing analysis results
         """
+        direct = self._maybe_direct_response(text, entities, has_image=True)
+        if direct is not None:
+            return direct
+        
         try:
-            # Encode image to base64
-            image_data = self._encode_image_to_base64(image_path)
-            
-            # Build prompt for image analysis
-            prompt = self._build_image_analysis_prompt(text, entities)
-            
-            # Prepare multimodal content
-            content = {
-                "contents": [{
-                    "parts": [
-                        {"text": prompt},
-                        {
-                            "inline_data": {
-                                "mime_type": self._get_mime_type(image_path),
-                                "data": image_data
-                            }
-                        }
-                    ]
-                }]
-            }
-            
+            content = self._build_image_content(image_path, text, entities, prepared_image)
             response = self._call_gemini_api_multimodal(content)
-            
-            if response.get("status_code") == 200:
-                result = response.get("data", {})
-                analysis = result.get("candidates", [{}])[0].get("content", {}).get("parts", [{}])[0].get("text", "")
-                return {
-                    "analysis": analysis,
-                    "risk_level": self._extract_risk_level(analysis),
-                    "confidence": self._extract_confidence(analysis),
-                    "model_used": self.base_model,
-                    "image_analyzed": True
-                }
-            else:
-                logger.error(f"Gemini API error: {response.get('error', 'Unknown error')}")
-                return {"error": response.get('error', 'API call failed')}
+            return self._parse_image_response(response)
                 
         except Exception as e:
             logger.error(f"Error in image scam risk analysis: {str(e)}")
             return {"error": str(e)}
     
+    async def analyze_image_scam_risk_async(self, image_path: str, text: str, entities: Dict[str, Any],
+                                            prepared_image: Optional[Tuple[bytes, str]] = None) -> Dict[str, Any]:
+        """
+        Non-blocking version of analyze_image_scam_risk
+        """
+        direct = self._maybe_direct_response(text, entities, has_image=True)
+        if direct is not None:
+            return direct
+        
+        try:
+            content = self._build_image_content(image_path, text, entities, prepared_image)
+            response = await self._call_gemini_api_multimodal_async(content)
+            return self._parse_image_response(response)
+                
+        except Exception as e:
+            logger.error(f"Error in image scam risk analysis: {str(e)}")
+            return {"error": str(e)}
+    
+    def _build_image_content(self, image_path: str, text: str, entities: Dict[str, Any],
+                             prepared_image: Optional[Tuple[bytes, str]] = None) -> Dict[str, Any]:
+        """
+        Build the multimodal request body for image analysis
+        """
+        # Downscale large screenshots (unless already done by the caller), then encode to base64
+        image_bytes, mime_type = prepared_image or self._prepare_image_for_vision(image_path)
+        image_data = base64.b64encode(image_bytes).decode('ascii')
+        
+        # Build prompt for image analysis
+        prompt = self._build_image_analysis_prompt(text, entities)
+        
+        return {
+            "systemInstruction": {"parts": [{"text": _IMAGE_SYSTEM_PROMPT}]},
+            "contents": [{
+                "parts": [
+                    {"text": prompt},
+                    {
+                        "inline_data": {
+                            "mime_type": mime_type,
+                            "data": image_data
+                        }
+                    }
+                ]
+            }]
+        }
+    
+    def _parse_image_response(self, response: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Convert a Gemini image analysis response into the common result format
+        """
+        if response.get("status_code") == 200:
+            result = response.get("data", {})
+            analysis = result.get("candidates", [{}])[0].get("content", {}).get("parts", [{}])[0].get("text", "")
+            risk_level, confidence = self._extract_risk_and_confidence(analysis)
+            return {
+                "analysis": analysis,
+                "risk_level": risk_level,
+                "confidence": confidence,
+                "model_used": self.base_model,
+                "image_analyzed": True
+            }
+        else:
+            logger.error(f"Gemini API error: {response.get('error', 'Unknown error')}")
+            return {"error": response.get('error', 'API call failed')}
+    
     
     def _build_image_analysis_prompt(self, text: str, entities: Dict[str, Any]) -> str:
         """
-        Build a comprehensive prompt for image-based scam analysis
+        Build the per-request part of the image analysis prompt.
+        The static instructions live in _IMAGE_SYSTEM_PROMPT.
         
         Args:
             text: Extracted text from OCR (if available)
@@ -90,39 +209,12 @@ class GeminiService(LLMServiceBase):
         Returns:
             Formatted prompt string
         """
-        phones = entities.get('phones', [])
-        urls = entities.get('urls', [])
-        
-        prompt = f"""
-        Bạn là một AI phân tích lừa đảo chuyên nghiệp, hãy thật cân nhắc về các hình thức lừa đảo trên không gian mạng, đặc biệt ở Việt Nam.
-        
-        Hãy phân tích hình ảnh này một cách toàn diện để nhận diện các dấu hiệu lừa đảo, bao gồm:
-        1. Nội dung văn bản trong hình ảnh
-        2. Các yếu tố hình ảnh đáng ngờ (logo giả, thiết kế lừa đảo, v.v.)
-        3. Các thông tin liên hệ và đường link
-        4. Các dấu hiệu về thương hiệu, ngân hàng, hoặc tổ chức giả mạo
-        
-        NỘI DUNG VĂN BẢN ĐÃ TRÍCH XUẤT (nếu có):
-        {text if text else 'Không có văn bản được trích xuất'}
-        
-        CÁC THỰC THỂ ĐÃ ĐƯỢC TRÍCH XUẤT:
-        Các số điện thoại: {phones if phones else 'None found'}
-        Đường dẫn URLs: {urls if urls else 'None found'}
-        
-        Hãy cung cấp một phân tích chi tiết bao gồm:
-        1. Mức độ nguy hiểm (Low/Medium/High)
-        2. Các dấu hiệu nhận biết lừa đảo từ hình ảnh
-        3. Các mối lo ngại về nội dung và thiết kế
-        4. Đề xuất cho người dùng để bảo vệ
-        5. Mức độ tin cậy của phân tích
-        
-        Hãy format câu trả lời của bạn dưới dạng json gồm những nội dung sau VÀ Ở TRONG NGÔN NGỮ TIẾNG VIỆT:
-        RISK_LEVEL: [Low/Medium/High]
-        CONFIDENCE: [0-100]
-        ANALYSIS: [Phân tích chi tiết về hình ảnh và nội dung]
-        RECOMMENDATIONS: [Các hành động phải làm]
-        """
-        return prompt
+        entities = normalize_entities(entities)
+        return _IMAGE_PROMPT_TMPL.format_map({
+            "text_block": text or _NO_TEXT,
+            "phones": format_entity_list(entities['phones']),
+            "urls": format_entity_list(entities['urls']),
+        })
     
     def _call_gemini_api_multimodal(self, content: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -135,26 +227,51 @@ class GeminiService(LLMServiceBase):
             Dictionary containing response data
         """
         try:
-            response = requests.post(
+            response = _http_client.post(
                 self.base_url,
                 params={"key": self.api_key},
-                json=content,
+                content=orjson.dumps(content),
+                headers=_JSON_HEADERS,
                 timeout=60  # Increased timeout for image processing
             )
+            return self._to_api_response(response)
             
+        except httpx.HTTPError as e:
+            logger.error(f"Request error: {str(e)}")
             return {
-                "status_code": response.status_code,
-                "data": response.json() if response.status_code == 200 else None,
-                "error": response.text if response.status_code != 200 else None
+                "status_code": 500,
+                "error": f"Request failed: {str(e)}"
             }
+    
+    async def _call_gemini_api_multimodal_async(self, content: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Non-blocking version of _call_gemini_api_multimodal
+        """
+        try:
+            response = await _get_async_http_client().post(
+                self.base_url,
+                params={"key": self.api_key},
+                content=orjson.dumps(content),
+                headers=_JSON_HEADERS,
+                timeout=60
+            )
+            return self._to_api_response(response)
             
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"Request error: {str(e)}")
             return {
                 "status_code": 500,
                 "error": f"Request failed: {str(e)}"
             }
     
+    @staticmethod
+    def _to_api_response(response: httpx.Response) -> Dict[str, Any]:
+        return {
+            "status_code": response.status_code,
+            "data": orjson.loads(response.content) if response.status_code == 200 else None,
+            "error": response.text if response.status_code != 200 else None
+        }
+    
     def _build_scam_analysis_prompt(self, text: str, entities: Dict[str, Any]) -> str:
         """
         Build a comprehensive prompt for scam analysis
@@ -208,26 +325,71 @@ class GeminiService(LLMServiceBase):
             Dictionary containing response data
         """
         try:
-            response = requests.post(
+            response = _http_client.post(
                 self.base_url,
                 params={"key": self.api_key},
-                json={"contents": [{"parts": [{"text": prompt}]}]},
+                content=orjson.dumps(self._build_text_body(prompt)),
+                headers=_JSON_HEADERS,
                 timeout=30
             )
+            return self._to_api_response(response)
             
+        except httpx.HTTPError as e:
+            logger.error(f"Request error: {str(e)}")
             return {
-                "status_code": response.status_code,
-                "data": response.json() if response.status_code == 200 else None,
-                "error": response.text if response.status_code != 200 else None
+                "status_code": 500,
+                "error": f"Request failed: {str(e)}"
             }
+    
+    async def _call_gemini_api_async(self, prompt: str) -> Dict[str, Any]:
+        """
+        Non-blocking version of _call_gemini_api
+        """
+        try:
+            response = await _get_async_http_client().post(
+                self.base_url,
+                params={"key": self.api_key},
+                content=orjson.dumps(self._build_text_body(prompt)),
+                headers=_JSON_HEADERS,
+                timeout=30
+            )
+            return self._to_api_response(response)
             
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"Request error: {str(e)}")
             return {
                 "status_code": 500,
                 "error": f"Request failed: {str(e)}"
             }
     
+    @staticmethod
+    def _build_text_body(prompt: str) -> Dict[str, Any]:
+        return {"contents": [{"parts": [{"text": prompt}]}]}
+    
+    def _extract_risk_and_confidence(self, analysis: str) -> Tuple[str, int]:
+        """
+        Extract risk level and confidence from analysis text in one go.
+        The prompt asks for JSON, so that is parsed first; the regexes are
+        only used when the answer is not valid JSON.
+        
+        Args:
+            analysis: Analysis text from LLM
+            
+        Returns:
+            Tuple of risk level (Low/Medium/High) and confidence (0-100)
+        """
+        start, end = analysis.find("{"), analysis.rfind("}")
+        if start != -1 and end > start:
+            try:
+                data = orjson.loads(analysis[start:end + 1])
+                risk_level = str(data.get("RISK_LEVEL", "")).title()
+                if risk_level in ("Low", "Medium", "High"):
+                    return risk_level, int(data.get("CONFIDENCE", 0))
+            except (ValueError, TypeError, AttributeError):
+                pass
+        
+        return self._extract_risk_level(analysis), self._extract_confidence(analysis)
+    
     def _extract_risk_level(self, analysis: str) -> str:
         """
         Extract risk level from analysis text
@@ -238,13 +400,10 @@ class GeminiService(LLMServiceBase):
         Returns:
             Risk level (Low/Medium/High)
         """
-        analysis_lower = analysis.lower()
-        if "high" in analysis_lower:
-            return "High"
-        elif "medium" in analysis_lower:
-            return "Medium"
-        else:
-            return "Low"
+        risk_match = _RISK_RE.search(analysis)
+        if risk_match:
+            return risk_match.group(1).title()
+        return "Low"
     
     def _extract_confidence(self, analysis: str) -> int:
         """
@@ -256,8 +415,7 @@ class GeminiService(LLMServiceBase):
         Returns:
             Confidence level (0-100)
         """
-        import re
-        confidence_match = re.search(r'CONFIDENCE: \s*(\d+)', analysis, re.IGNORECASE)
+        confidence_match = _CONFIDENCE_RE.search(analysis)
         if confidence_match:
             return int(confidence_match.group(1))
         return 0  # Default confidence if not found
@@ -273,15 +431,100 @@ class GeminiService(LLMServiceBase):
         Returns:
             Analysis results
         """
-        prompts = {
-            "general": f"Analyze the following text and provide insights: {text}",
-            "sentiment": f"Analyze the sentiment of this text: {text}",
-            "summary": f"Provide a summary of this text: {text}"
+        response = self._call_gemini_api(self._build_text_prompt(text, analysis_type))
+        return self._parse_text_response(response, analysis_type)
+    
+    async def analyze_text_content_async(self, text: str, analysis_type: str = "general") -> Dict[str, Any]:
+        """
+        Non-blocking version of analyze_text_content
+        """
+        response = await self._call_gemini_api_async(self._build_text_prompt(text, analysis_type))
+        return self._parse_text_response(response, analysis_type)
+    
+    def submit_text_content_batch(self, texts: List[str], analysis_type: str = "general") -> Optional[str]:
+        """
+        Submit many texts to the Gemini Batch API (cheaper, higher throughput,
+        but results can take hours). Collect them with fetch_text_content_batch.
+        
+        Args:
+            texts: Texts to analyze
+            analysis_type: Type of analysis to perform
+            
+        Returns:
+            Name of the batch operation, None when there is nothing to submit
+        """
+        if not texts:
+            return None
+        
+        body = {
+            "batch": {
+                "display_name": "trustie-text-analysis",
+                "input_config": {
+                    "requests": {
+                        "requests": [
+                            {
+                                "request": self._build_text_body(self._build_text_prompt(text, analysis_type)),
+                                "metadata": {"key": str(i)}
+                            }
+                            for i, text in enumerate(texts)
+                        ]
+                    }
+                }
+            }
         }
         
-        prompt = prompts.get(analysis_type, prompts["general"])
-        response = self._call_gemini_api(prompt)
+        response = _http_client.post(self.batch_url, params={"key": self.api_key},
+                                     content=orjson.dumps(body), headers=_JSON_HEADERS)
+        response.raise_for_status()
+        return orjson.loads(response.content)["name"]
+    
+    def fetch_text_content_batch(self, batch_id: Optional[str], texts: List[str],
+                                 analysis_type: str = "general") -> Optional[List[Dict[str, Any]]]:
+        """
+        Check a batch from submit_text_content_batch once, without waiting
+        
+        Args:
+            batch_id: Name returned by submit_text_content_batch
+            texts: The submitted texts, in the same order
+            analysis_type: Type of analysis that was requested
+            
+        Returns:
+            One result per input text, in the same format as analyze_text_content,
+            or None while the batch is still running
+        """
+        if batch_id is None:
+            return []
+        
+        response = _http_client.get(
+            f"https://generativelanguage.googleapis.com/v1beta/{batch_id}",
+            params={"key": self.api_key}
+        )
+        response.raise_for_status()
+        operation = orjson.loads(response.content)
+        if not operation.get("done"):
+            return None
         
+        if "error" in operation:
+            logger.error(f"Batch {batch_id} failed: {operation['error']}")
+            return [{"error": str(operation["error"])} for _ in texts]
+        
+        inlined = operation.get("response", {}).get("inlinedResponses", {}).get("inlinedResponses", [])
+        results: List[Dict[str, Any]] = [{"error": "Missing from batch output"} for _ in texts]
+        for position, item in enumerate(inlined):
+            index = int(item.get("metadata", {}).get("key", position))
+            if "error" in item:
+                results[index] = {"error": str(item["error"])}
+            else:
+                results[index] = self._parse_text_response(
+                    {"status_code": 200, "data": item.get("response", {})}, analysis_type
+                )
+        return results
+    
+    def _build_text_prompt(self, text: str, analysis_type: str) -> str:
+        template = _TEXT_PROMPT_TMPLS.get(analysis_type, _TEXT_PROMPT_TMPLS["general"])
+        return template.format_map({"text": text})
+    
+    def _parse_text_response(self, response: Dict[str, Any], analysis_type: str) -> Dict[str, Any]:
         if response.get("status_code") == 200:
             result = response.get("data", {})
             analysis = result.get("candidates", [{}])[0].get("content", {}).get("parts", [{}])[0].get("text", "")
@@ -0,0 +1,107 @@
+import json
+import math
+import time
+import hashlib
+import logging
+from typing import Dict, Any, Optional, Protocol
+from ...util.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Read image files in chunks when hashing so large screenshots are never fully buffered
+_HASH_CHUNK_SIZE = 64 * 1024
+
+
+class CacheBackend(Protocol):
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    def set(self, key: str, entry: Dict[str, Any]) -> None:
+        ...
+
+    def delete(self, key: str) -> None:
+        ...
+
+
+class MemoryCacheBackend:
+    def __init__(self, maxsize: int = 1024):
+        """
+        In-process cache backend, lost on restart. Holds at most maxsize
+        entries, evicting the least recently used.
+
+        Args:
+            maxsize: Maximum number of cached responses
+        """
+        # LLMCache checks the expiry itself, entries here only age out by LRU
+        self._store = TTLCache(maxsize=maxsize, ttl=math.inf)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self._store.get(key)
+
+    def set(self, key: str, entry: Dict[str, Any]) -> None:
+        self._store.set(key, entry)
+
+    def delete(self, key: str) -> None:
+        self._store.delete(key)
+
+
+class LLMCache:
+    def __init__(self, backend: Optional[CacheBackend] = None, ttl_seconds: Optional[int] = 3600):
+        """
+        Exact-match response cache for LLM calls
+
+        Args:
+            backend: Storage backend (defaults to in-memory)
+            ttl_seconds: Lifetime of an entry, None to never expire
+        """
+        self.backend = backend or MemoryCacheBackend()
+        self.ttl_seconds = ttl_seconds
+        self.stats = {"hits": 0, "misses": 0}
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the cached result for key, or None on miss/expiry
+        """
+        entry = self.backend.get(key)
+        if entry is not None and self.ttl_seconds is not None:
+            if time.time() - entry["created_at"] > self.ttl_seconds:
+                self.backend.delete(key)
+                entry = None
+
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+
+        self.stats["hits"] += 1
+        return entry["result"]
+
+    def set(self, key: str, result: Dict[str, Any]) -> None:
+        """
+        Store a result. Error responses are never cached.
+        """
+        if "error" in result:
+            return
+        self.backend.set(key, {"created_at": time.time(), "result": result})
+
+    @staticmethod
+    def text_key(model: str, text: str, analysis_type: str) -> str:
+        """
+        Build the cache key for a text analysis call
+        """
+        payload = json.dumps({"model": model, "prompt": text, "type": analysis_type}, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def image_key(model: str, image_path: str, text: str, entities: Optional[Dict[str, Any]]) -> str:
+        """
+        Build the cache key for an image analysis call from the image bytes,
+        the OCR text and the extracted entities
+        """
+        digest = hashlib.sha256()
+        digest.update(model.encode("utf-8"))
+        with open(image_path, "rb") as image_file:
+            while chunk := image_file.read(_HASH_CHUNK_SIZE):
+                digest.update(chunk)
+        payload = json.dumps({"text": text, "entities": entities or {}}, sort_keys=True, default=str)
+        digest.update(payload.encode("utf-8"))
+        return digest.hexdigest()
@@ -1,36 +1,156 @@
-from typing import Dict, Any, Optional
-from .llmsbase import LLMProvider
+import asyncio
+import functools
+from typing import Dict, Any, Optional, List, Tuple, Callable
+from .llmsbase import LLMProvider, normalize_entities
 from .geminiimpl import GeminiService
 from .openaiimpl import OpenAIService
+from .ocr_service import OCRService
+from .llm_cache import LLMCache
 
 class LLMService:
-    def __init__(self, provider: LLMProvider = LLMProvider.OPENAI, api_key: Optional[str] = None):
+    def __init__(self, provider: LLMProvider = LLMProvider.OPENAI, api_key: Optional[str] = None,
+                 cache: Optional[LLMCache] = None, ttl_seconds: Optional[int] = 3600):
         """
         Initialize LLM service with specified provider
-        
+
         Args:
             provider: LLM provider to use (GEMINI or OPENAI)
             api_key: Optional API key for the provider
+            cache: Optional response cache, an in-memory one is created if not provided
+            ttl_seconds: Lifetime of cached responses when no cache is provided
         """
         self.provider = provider
-        
+        self.cache = cache if cache is not None else LLMCache(ttl_seconds=ttl_seconds)
+
         if provider == LLMProvider.GEMINI:
             self.impl = GeminiService(api_key)
         elif provider == LLMProvider.OPENAI:
             self.impl = OpenAIService(api_key)
         else:
             raise ValueError(f"Unsupported LLM provider: {provider}")
-    
+
     def analyze_image_scam_risk(self, image_path: str, text: str, entities: Dict[str, Any]) -> Dict[str, Any]:
         """
         Analyze image for scam risk using the configured provider
         """
-        return self.impl.analyze_image_scam_risk(image_path, text, entities)
-    
+        entities = normalize_entities(entities)
+        key = LLMCache.image_key(self.impl.base_model, image_path, text, entities)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        result = self.impl.analyze_image_scam_risk(image_path, text, entities)
+        self.cache.set(key, result)
+        return result
+
     def analyze_text_content(self, text: str, analysis_type: str = "general") -> Dict[str, Any]:
         """
         Analyze text content using the configured provider
         """
-        return self.impl.analyze_text_content(text, analysis_type)
-    
-    # Add other methods as needed, delegating to the implementation
\ No newline at end of file
+        key = LLMCache.text_key(self.impl.base_model, text, analysis_type)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        result = self.impl.analyze_text_content(text, analysis_type)
+        self.cache.set(key, result)
+        return result
+
+    def submit_text_content_batch(self, items: List[str], analysis_type: str = "general") -> Optional[str]:
+        """
+        Submit many texts to the provider's batch endpoint in a single job.
+        Results can take hours, so nothing here waits for them: poll
+        fetch_text_content_batch with the returned id from an offline job.
+
+        Returns:
+            Batch id, None when there was nothing to send to the provider
+        """
+        return self.impl.submit_text_content_batch(items, analysis_type)
+
+    def fetch_text_content_batch(self, batch_id: Optional[str], items: List[str],
+                                 analysis_type: str = "general") -> Optional[List[Dict[str, Any]]]:
+        """
+        Results of a batch from submit_text_content_batch, or None while it is
+        still running. Finished results are cached like single analyses.
+
+        Returns:
+            One result per item, in input order
+        """
+        results = self.impl.fetch_text_content_batch(batch_id, items, analysis_type)
+        if results is not None:
+            for text, result in zip(items, results):
+                self.cache.set(LLMCache.text_key(self.impl.base_model, text, analysis_type), result)
+        return results
+
+    async def analyze_image_scam_risk_async(self, image_path: str, text: str, entities: Dict[str, Any],
+                                            prepared_image: Optional[Tuple[bytes, str]] = None) -> Dict[str, Any]:
+        """
+        Non-blocking version of analyze_image_scam_risk. Providers without a
+        native async client are run in a worker thread.
+        """
+        entities = normalize_entities(entities)
+        key = await asyncio.to_thread(LLMCache.image_key, self.impl.base_model, image_path, text, entities)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        if hasattr(self.impl, "analyze_image_scam_risk_async"):
+            result = await self.impl.analyze_image_scam_risk_async(image_path, text, entities, prepared_image)
+        else:
+            result = await asyncio.to_thread(self.impl.analyze_image_scam_risk, image_path, text, entities, prepared_image)
+        self.cache.set(key, result)
+        return result
+
+    async def analyze_image_parallel(self, image_path: str, lang: str = 'vie',
+                                     extract_entities: Optional[Callable[[str], Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """
+        OCR the image and prepare it for the vision model at the same time,
+        then run the image analysis once the OCR text is available
+
+        Args:
+            image_path: Path to the image file
+            lang: Language for OCR processing
+            extract_entities: Optional function building the entities dict from the OCR text
+
+        Returns:
+            Dictionary containing OCR text, entities, and LLM analysis
+        """
+        ocr_text, prepared_image = await asyncio.gather(
+            OCRService.extract_text_async(image_path, lang),
+            asyncio.to_thread(self.impl._prepare_image_for_vision, image_path)
+        )
+        entities = extract_entities(ocr_text) if extract_entities else {}
+        llm_result = await self.analyze_image_scam_risk_async(image_path, ocr_text, entities, prepared_image)
+
+        return {
+            "ocr_text": ocr_text,
+            "entities": entities,
+            "llm_analysis": llm_result
+        }
+
+    async def analyze_text_content_async(self, text: str, analysis_type: str = "general") -> Dict[str, Any]:
+        """
+        Non-blocking version of analyze_text_content
+        """
+        key = LLMCache.text_key(self.impl.base_model, text, analysis_type)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        if hasattr(self.impl, "analyze_text_content_async"):
+            result = await self.impl.analyze_text_content_async(text, analysis_type)
+        else:
+            result = await asyncio.to_thread(self.impl.analyze_text_content, text, analysis_type)
+        self.cache.set(key, result)
+        return result
+
+    # Add other methods as needed, delegating to the implementation
+
+
+@functools.lru_cache(maxsize=4)
+def get_llm_service(provider: LLMProvider = LLMProvider.OPENAI, api_key: Optional[str] = None) -> LLMService:
+    """
+    Return a shared LLMService for (provider, api_key), so callers reuse the
+    same provider client and connection pool instead of building new ones
+    """
+    return LLMService(provider, api_key)
@@ -1,14 +1,93 @@
+import io
 import os
-import base64
+import re
 import logging
+import functools
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional, List
+from urllib.parse import urlsplit, urlunsplit
+from typing import Dict, Any, Optional, List, Tuple
 from pathlib import Path
 from dotenv import load_dotenv
 from enum import Enum
+from PIL import Image, ImageOps
 
 logger = logging.getLogger(__name__)
 
+# Vision models downsample large images anyway, so anything bigger than this
+# (on the long edge) is resized before upload
+_VISION_MAX_SIDE = 1024
+_VISION_JPEG_QUALITY = 85
+
+_MIME_BY_EXT = {
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.png': 'image/png',
+    '.gif': 'image/gif',
+    '.webp': 'image/webp',
+    '.bmp': 'image/bmp'
+}
+
+# Inputs shorter than this, with no phones or URLs, are answered without the model
+_MIN_TEXT_LENGTH = 10
+
+# High-precision phrases that only show up in scam messages, answered as High
+# risk without the model. Keep this list short and specific, broader
+# keywords belong in sus_keyword.json.
+_OBVIOUS_SCAM_PHRASES = (
+    "chuyển tiền vào tài khoản an toàn",
+    "cung cấp mã otp",
+    "đọc mã otp",
+    "tài khoản của bạn sẽ bị khóa",
+    "bạn đã trúng thưởng",
+    "nộp phí để nhận thưởng",
+    "tài khoản tạm giữ",
+)
+_OBVIOUS_SCAM_RE = re.compile("|".join(re.escape(p) for p in sorted(_OBVIOUS_SCAM_PHRASES)), re.IGNORECASE)
+
+_NONE_LIST = "None found"
+
+def _normalize_url(url: str) -> str:
+    parts = urlsplit(url.strip())
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, parts.query, parts.fragment)).rstrip('/')
+
+def normalize_entities(entities: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Sort and deduplicate phones and URLs, so the same entities found in a
+    different order (or repeated by noisy OCR) give the same prompt and cache key
+    
+    Args:
+        entities: Extracted entities (phones, urls, etc.)
+        
+    Returns:
+        Copy of entities with normalized 'phones' and 'urls' lists
+    """
+    normalized = dict(entities or {})
+    normalized['phones'] = sorted({phone.strip() for phone in normalized.get('phones') or []})
+    normalized['urls'] = sorted({_normalize_url(url) for url in normalized.get('urls') or []})
+    return normalized
+
+def format_entity_list(values: List[str]) -> str:
+    """Render an entity list one item per line for the prompt"""
+    return "\n".join(values) or _NONE_LIST
+
+@functools.cache
+def _bootstrap_env() -> None:
+    """Load the .env file once per process"""
+    load_dotenv(dotenv_path=Path(__file__).parent / ".env")
+
+_bootstrap_env()
+
+# API keys resolved from the environment, by variable name
+_API_KEYS: Dict[str, str] = {}
+
+def _get_api_key(api_key_env: str) -> Optional[str]:
+    if api_key_env not in _API_KEYS:
+        api_key = os.getenv(api_key_env)
+        if not api_key:
+            return None
+        _API_KEYS[api_key_env] = api_key
+    return _API_KEYS[api_key_env]
+
 class LLMProvider(Enum):
     GEMINI = "gemini"
     OPENAI = "openai"
@@ -21,12 +100,10 @@ class LLMServiceBase(ABC):
             api_key: Direct API key string.
             api_key_env: Environment variable name containing the key.
         """
-        load_dotenv(dotenv_path=Path(__file__).parent / ".env")
-
         if api_key:
             self.api_key = api_key
         elif api_key_env:
-            self.api_key = os.getenv(api_key_env)
+            self.api_key = _get_api_key(api_key_env)
         else:
             raise ValueError("Must provide either `api_key` or `api_key_env`.")
 
@@ -34,22 +111,67 @@ class LLMServiceBase(ABC):
             raise Exception(f"API key not found (env var: {api_key_env})")
 
     # --- Common utilities ---
-    def _encode_image_to_base64(self, image_path: str) -> str:
+    def _maybe_direct_response(self, text: str, entities: Optional[Dict[str, Any]] = None,
+                               has_image: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Answer trivially safe or obviously malicious inputs without calling the model
+        
+        Args:
+            text: Text to analyze
+            entities: Extracted entities (phones, urls, etc.)
+            has_image: Whether an image goes with the text, in which case
+                short text alone is not enough to call it safe
+            
+        Returns:
+            A result in the common scam analysis format, or None if the model is needed
+        """
+        entities = entities or {}
+        text = (text or "").strip()
+        
+        if not has_image and len(text) < _MIN_TEXT_LENGTH and not entities.get('phones') and not entities.get('urls'):
+            return self._direct_response("Low", 100, "Nội dung quá ngắn hoặc trống, không có dấu hiệu lừa đảo.",
+                                         "Không cần hành động.")
+        
+        match = _OBVIOUS_SCAM_RE.search(text)
+        if match:
+            return self._direct_response("High", 95, f"Nội dung chứa cụm từ lừa đảo phổ biến: \"{match.group(0)}\".",
+                                         "Không làm theo yêu cầu, không cung cấp thông tin hay chuyển tiền. Báo cáo số điện thoại/đường dẫn liên quan.")
+        return None
+    
+    def _direct_response(self, risk_level: str, confidence: int, analysis: str, recommendation: str) -> Dict[str, Any]:
+        return {
+            "analysis": analysis,
+            "recommendation": recommendation,
+            "risk_level": risk_level,
+            "confidence": confidence,
+            "model_used": "direct",
+            "image_analyzed": False
+        }
+    
+    def _prepare_image_for_vision(self, image_path: str) -> Tuple[bytes, str]:
         """
-        Encode image file to base64 string
+        Get image bytes ready to send to a vision model. Images larger than
+        _VISION_MAX_SIDE are downscaled and re-encoded as JPEG; smaller ones
+        are sent unchanged.
         
         Args:
             image_path: Path to the image file
             
         Returns:
-            Base64 encoded string
+            Tuple of (image bytes, MIME type)
         """
-        try:
-            with open(image_path, "rb") as image_file:
-                return base64.b64encode(image_file.read()).decode('utf-8')
-        except Exception as e:
-            logger.error(f"Error encoding image to base64: {str(e)}")
-            raise
+        with Image.open(image_path) as img:
+            if max(img.size) <= _VISION_MAX_SIDE:
+                # PIL already sniffed the real format, no need to guess from the extension
+                mime_type = Image.MIME.get(img.format) or self._get_mime_type(image_path)
+                with open(image_path, "rb") as image_file:
+                    return image_file.read(), mime_type
+            
+            img = ImageOps.exif_transpose(img)
+            img.thumbnail((_VISION_MAX_SIDE, _VISION_MAX_SIDE), Image.LANCZOS)
+            buffer = io.BytesIO()
+            img.convert("RGB").save(buffer, "JPEG", quality=_VISION_JPEG_QUALITY, optimize=True)
+            return buffer.getvalue(), "image/jpeg"
     
     def _get_mime_type(self, image_path: str) -> str:
         """
@@ -61,26 +183,27 @@ class LLMServiceBase(ABC):
         Returns:
             MIME type string
         """
-        ext = os.path.splitext(image_path)[1].lower()
-        mime_types = {
-            '.jpg': 'image/jpeg',
-            '.jpeg': 'image/jpeg',
-            '.png': 'image/png',
-            '.gif': 'image/gif',
-            '.webp': 'image/webp',
-            '.bmp': 'image/bmp'
-        }
-        return mime_types.get(ext, 'image/jpeg')
+        return _MIME_BY_EXT.get(os.path.splitext(image_path)[1].lower(), 'image/jpeg')
 
     # --- Abstract methods ---
     @abstractmethod
-    def analyze_image_scam_risk(self, image_path: str, text: str, entities: Dict[str, Any]) -> Dict[str, Any]:
+    def analyze_image_scam_risk(self, image_path: str, text: str, entities: Dict[str, Any],
+                                prepared_image: Optional[Tuple[bytes, str]] = None) -> Dict[str, Any]:
         pass
 
     @abstractmethod
     def analyze_text_content(self, text: str, analysis_type: str = "general") -> Dict[str, Any]:
         pass
 
+    @abstractmethod
+    def submit_text_content_batch(self, texts: List[str], analysis_type: str = "general") -> Optional[str]:
+        pass
+
+    @abstractmethod
+    def fetch_text_content_batch(self, batch_id: Optional[str], texts: List[str],
+                                 analysis_type: str = "general") -> Optional[List[Dict[str, Any]]]:
+        pass
+
     @abstractmethod
     def _build_image_analysis_prompt(self, text: str, entities: Dict[str, Any]) -> str:
         pass
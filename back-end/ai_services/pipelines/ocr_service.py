@@ -1,10 +1,36 @@
 import pytesseract
-from PIL import Image
-from typing import Optional
+from typing import Optional, List, Any
+import os
+import asyncio
+import logging
 import platform
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
+logger = logging.getLogger(__name__)
 
+# Tesseract language codes mapped to PaddleOCR ones
+_PADDLE_LANGS = {
+    'vie': 'vi',
+    'eng': 'en',
+}
+
+# OCR gets its own pool, one worker per core. Tesseract runs as a subprocess
+# and PaddleOCR inference releases the GIL, so threads run it in parallel
+# without a per-process copy of the engines, and a burst of screenshots can't
+# take over the default executor used by everything else.
+_OCR_EXECUTOR = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix="ocr")
+
+
+@functools.cache
 def configure_tesseract_path():
+    """Point pytesseract at the tesseract binary, once per process"""
+    tesseract_cmd = os.getenv("TESSERACT_CMD")
+    if tesseract_cmd:
+        pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+        return
+
     system = platform.system()
     
     if system == "Windows":
@@ -14,17 +40,67 @@ def configure_tesseract_path():
     else:
         raise EnvironmentError(f"Unsupported OS: {system}")
 
-configure_tesseract_path()
-
 class OCRService:
-    @staticmethod
-    def extract_text(image_path: str, lang: Optional[str] = 'vie') -> str:
+    # PaddleOCR engines are expensive to build, so one per language is kept
+    # warm for the lifetime of the process
+    _engines = {}
+    _engine_lock = threading.Lock()
+
+    @classmethod
+    def _get_engine(cls, lang: str) -> Optional[Any]:
+        """
+        Return the in-process PaddleOCR engine for lang, or None if PaddleOCR
+        is not installed (callers then fall back to pytesseract)
         """
-        Extract text from an image file using pytesseract.
+        paddle_lang = _PADDLE_LANGS.get(lang, lang)
+        engine = cls._engines.get(paddle_lang)
+        if engine is not None or paddle_lang in cls._engines:
+            return engine
+
+        with cls._engine_lock:
+            if paddle_lang not in cls._engines:
+                try:
+                    from paddleocr import PaddleOCR
+                    cls._engines[paddle_lang] = PaddleOCR(lang=paddle_lang, use_angle_cls=False, show_log=False)
+                    logger.info(f"PaddleOCR engine loaded for '{paddle_lang}'")
+                except ImportError:
+                    logger.warning("PaddleOCR not found, using pytesseract. Install with: pip install paddleocr")
+                    cls._engines[paddle_lang] = None
+            return cls._engines[paddle_lang]
+
+    @classmethod
+    def extract_text(cls, image_path: str, lang: Optional[str] = 'vie') -> str:
+        """
+        Extract text from an image file, in-process with PaddleOCR when
+        available, otherwise with pytesseract.
         :param image_path: Path to the image file
-        :param lang: Language for OCR (default: 'eng')
+        :param lang: Language for OCR (default: 'vie')
         :return: Extracted text
         """
-        image = Image.open(image_path)
-        text = pytesseract.image_to_string(image, lang=lang)
-        return text 
\ No newline at end of file
+        engine = cls._get_engine(lang)
+        if engine is None:
+            configure_tesseract_path()
+            # Given a path, tesseract reads the file itself instead of
+            # pytesseract decoding it and re-encoding a temporary PNG
+            return pytesseract.image_to_string(image_path, lang=lang)
+
+        result = engine.ocr(image_path, cls=False)
+        return "\n".join(line[1][0] for block in result if block for line in block)
+
+    @classmethod
+    async def extract_text_async(cls, image_path: str, lang: Optional[str] = 'vie') -> str:
+        """
+        Non-blocking version of extract_text, run on the OCR pool
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_OCR_EXECUTOR, cls.extract_text, image_path, lang)
+
+    @classmethod
+    def extract_text_batch(cls, image_paths: List[str], lang: Optional[str] = 'vie') -> List[str]:
+        """
+        Extract text from several images, reusing the same warm engine.
+        :param image_paths: Paths to the image files
+        :param lang: Language for OCR (default: 'vie')
+        :return: Extracted text for each image, in input order
+        """
+        return [cls.extract_text(image_path, lang) for image_path in image_paths]
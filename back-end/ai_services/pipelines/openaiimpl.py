@@ -1,16 +1,98 @@
 # openaiimpl.py
 from openai import OpenAI
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List, Tuple
+import io
 import os
+import base64
 import re
+import httpx
+import orjson
 import logging
+import threading
 from pathlib import Path
 from dotenv import load_dotenv
-from .llmsbase import LLMServiceBase
-import json
+from .llmsbase import LLMServiceBase, normalize_entities, format_entity_list
 
 logger = logging.getLogger(__name__)
 
+# One SDK client (and connection pool) per API key, shared by all service instances
+_OPENAI_CLIENTS: Dict[str, OpenAI] = {}
+_OPENAI_CLIENTS_LOCK = threading.Lock()
+
+
+def _get_openai_client(api_key: str) -> OpenAI:
+    client = _OPENAI_CLIENTS.get(api_key)
+    if client is None:
+        with _OPENAI_CLIENTS_LOCK:
+            client = _OPENAI_CLIENTS.get(api_key)
+            if client is None:
+                client = OpenAI(
+                    api_key=api_key,
+                    max_retries=2,
+                    timeout=60.0,
+                    http_client=httpx.Client(
+                        limits=httpx.Limits(max_connections=32, max_keepalive_connections=16)
+                    )
+                )
+                _OPENAI_CLIENTS[api_key] = client
+    return client
+
+# Static instructions are sent as the system message so the provider can reuse
+# the cached prefix across requests. Keep anything per-request out of these.
+_IMAGE_SYSTEM_PROMPT = """Bạn là một AI phân tích lừa đảo chuyên nghiệp, hãy thật cân nhắc về các hình thức lừa đảo trên không gian mạng, đặc biệt ở Việt Nam.
+
+Hãy phân tích hình ảnh này một cách toàn diện để nhận diện các dấu hiệu lừa đảo, bao gồm:
+1. Nội dung văn bản trong hình ảnh
+2. Các yếu tố hình ảnh đáng ngờ (logo giả, thiết kế lừa đảo, v.v.)
+3. Các thông tin liên hệ và đường link
+4. Các dấu hiệu về thương hiệu, ngân hàng, hoặc tổ chức giả mạo
+
+Hãy cung cấp một phân tích chi tiết bao gồm:
+1. Mức độ nguy hiểm (Low/Medium/High)
+2. Các dấu hiệu nhận biết lừa đảo từ hình ảnh
+3. Các mối lo ngại về nội dung và thiết kế
+4. Đề xuất cho người dùng để bảo vệ
+5. Mức độ tin cậy của phân tích
+
+Hãy format câu trả lời của bạn dưới dạng json gồm những nội dung sau VÀ Ở TRONG NGÔN NGỮ TIẾNG VIỆT:
+RISK_LEVEL: [Low/Medium/High]
+CONFIDENCE: [0-100]
+ANALYSIS: [Phân tích chi tiết về hình ảnh và nội dung]
+RECOMMENDATIONS: [Các hành động phải làm]
+"""
+
+_SCAM_SYSTEM_PROMPT = """Bạn là một AI phân tích lừa đảo chuyên nghiệp, hãy thật cân nhắc về các hình thức lừa đảo trên không gian mạng, đặc biệt ở Việt Nam
+Nhiệm vụ của bạn là phân tích nội dung cuộc hội thoại để xác định khả năng đây là một cuộc lừa đảo. Hãy phân tích những nội dung thu thập được từ cuộc hội thoại
+qua điện thoại sau đây để phân tích khả năng lừa đảo (Đây là transcript nhận diện audio qua điện thoại nên đôi lúc sẽ có khoảng không nghe được)
+
+Hãy làm ơn cung cấp một phân tích bao gồm những nội dung sau:
+1. Mức độ nguy hiểm (Low/Medium/High)
+2. Các dấu hiệu nhận biết lừa đảo
+3. Các mối lo ngại liên quan đến đường link và số điện thoại
+4. Đề xuất cho người dùng để bảo vệ
+5. Mức độ tin cậy
+
+Hãy format câu trả lời của bạn dưới dạng json gồm những nội dung sau:
+RISK_LEVEL: [Low/Medium/High]
+CONFIDENCE: [0-100]
+ANALYSIS: [Phân tích chi tiết]
+RECOMMENDATIONS: [Các hành động phải làm]
+"""
+
+# Per-request part of the image prompt, only user data is spliced in
+_IMAGE_PROMPT_TMPL = """NỘI DUNG VĂN BẢN ĐÃ TRÍCH XUẤT (nếu có):
+{text_block}
+
+CÁC THỰC THỂ ĐÃ ĐƯỢC TRÍCH XUẤT:
+Các số điện thoại:
+{phones}
+Đường dẫn URLs:
+{urls}
+"""
+
+_NO_TEXT = "Không có văn bản được trích xuất"
+
+
 class OpenAIService(LLMServiceBase):
     def __init__(self, api_key: Optional[str] = None):
         """
@@ -21,9 +103,10 @@ class OpenAIService(LLMServiceBase):
         """
         super().__init__(api_key=api_key, api_key_env="OPENAI_API_KEY")
         self.base_model = "gpt-4.1-mini"
-        self.client = OpenAI(api_key=self.api_key)
+        self.client = _get_openai_client(self.api_key)
     
-    def analyze_image_scam_risk(self, image_path: str, text: str, entities: Dict[str, Any]) -> Dict[str, Any]:
+    def analyze_image_scam_risk(self, image_path: str, text: str, entities: Dict[str, Any],
+                                prepared_image: Optional[Tuple[bytes, str]] = None) -> Dict[str, Any]:
         """
         Analyze image for scam or fraud risk using OpenAI's multimodal capabilities
         
@@ -31,13 +114,19 @@ class OpenAIService(LLMServiceBase):
             image_path: Path to the image file
             text: Text extracted from screenshot
             entities: Dictionary containing extracted entities (phones, urls, etc.)
+            prepared_image: Optional (bytes, MIME type) from _prepare_image_for_vision
             
         Returns:
             Dictionary containing analysis results
         """
+        direct = self._maybe_direct_response(text, entities, has_image=True)
+        if direct is not None:
+            return direct
+        
         try:
-            # Encode image to base64
-            image_data = self._encode_image_to_base64(image_path)
+            # Downscale large screenshots (unless already done by the caller) before encoding them into the data URL
+            image_bytes, mime_type = prepared_image or self._prepare_image_for_vision(image_path)
+            image_url = "data:" + mime_type + ";base64," + base64.b64encode(image_bytes).decode('ascii')
             
             # Build prompt for image analysis
             prompt = self._build_image_analysis_prompt(text, entities)
@@ -45,6 +134,7 @@ class OpenAIService(LLMServiceBase):
             response = self.client.chat.completions.create(
                 model=self.base_model,
                 messages=[
+                    {"role": "system", "content": _IMAGE_SYSTEM_PROMPT},
                     {
                         "role": "user",
                         "content": [
@@ -52,7 +142,7 @@ class OpenAIService(LLMServiceBase):
                             {
                                 "type": "image_url",
                                 "image_url": {
-                                    "url": f"data:{self._get_mime_type(image_path)};base64,{image_data}"
+                                    "url": image_url
                                 }
                             }
                         ]
@@ -61,19 +151,7 @@ class OpenAIService(LLMServiceBase):
                 max_tokens=1000
             )
             
-            analysis = response.choices[0].message.content
-            json_match = re.search(r"```json\s*(\{.*?\})\s*```", analysis, re.DOTALL)
-            json_str = json_match.group(1) if json_match else analysis.strip()
-            json_response = json.loads(json_str)
-
-            return {
-                "analysis": json_response["ANALYSIS"],
-                "recommendation": json_response["RECOMMENDATIONS"],
-                "risk_level": json_response["RISK_LEVEL"],
-                "confidence": int(json_response["CONFIDENCE"]),
-                "model_used": self.base_model,
-                "image_analyzed": True
-            }
+            return self._parse_scam_analysis(response.choices[0].message.content)
                 
         except Exception as e:
             logger.error(f"Error in image scam risk analysis: {str(e)}")
@@ -90,114 +168,162 @@ class OpenAIService(LLMServiceBase):
         Returns:
             Analysis results
         """
-        prompts = self._build_scam_analysis_prompt(text)
-        
+        direct = self._maybe_direct_response(text)
+        if direct is not None:
+            return direct
         
         try:
             response = self.client.chat.completions.create(
                 model=self.base_model,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ],
+                messages=self._build_scam_messages(text),
                 max_tokens=1000
             )
             
-            analysis = response.choices[0].message.content
-            json_match = re.search(r"```json\s*(\{.*?\})\s*```", analysis, re.DOTALL)
-            json_str = json_match.group(1) if json_match else analysis.strip()
-            json_response = json.loads(json_str)
-
-            return {
-                "analysis": json_response["ANALYSIS"],
-                "recommendation": json_response["RECOMMENDATIONS"],
-                "risk_level": json_response["RISK_LEVEL"],
-                "confidence": int(json_response["CONFIDENCE"]),
-                "model_used": self.base_model,
-                "image_analyzed": True
-            }
+            return self._parse_scam_analysis(response.choices[0].message.content)
         except Exception as e:
             logger.error(f"Error in text analysis: {str(e)}")
             return {"error": str(e)}
     
-    def _build_image_analysis_prompt(self, text: str, entities: Dict[str, Any]) -> str:
+    def submit_text_content_batch(self, texts: List[str], analysis_type: str = "conversation") -> Optional[str]:
         """
-        Build a comprehensive prompt for image-based scam analysis
+        Submit many texts to the OpenAI Batch API (cheaper, higher throughput,
+        but results can take up to the 24h completion window). Collect them
+        with fetch_text_content_batch.
         
         Args:
-            text: Extracted text from OCR (if available)
-            entities: Extracted entities
+            texts: Texts to analyze
+            analysis_type: Type of analysis to perform
             
         Returns:
-            Formatted prompt string
+            Id of the batch, None when every text is answered without the model
         """
-        phones = entities.get('phones', [])
-        urls = entities.get('urls', [])
-        
-        prompt = f"""
-        Bạn là một AI phân tích lừa đảo chuyên nghiệp, hãy thật cân nhắc về các hình thức lừa đảo trên không gian mạng, đặc biệt ở Việt Nam.
+        pending = [i for i, text in enumerate(texts) if self._maybe_direct_response(text) is None]
+        if not pending:
+            return None
         
-        Hãy phân tích hình ảnh này một cách toàn diện để nhận diện các dấu hiệu lừa đảo, bao gồm:
-        1. Nội dung văn bản trong hình ảnh
-        2. Các yếu tố hình ảnh đáng ngờ (logo giả, thiết kế lừa đảo, v.v.)
-        3. Các thông tin liên hệ và đường link
-        4. Các dấu hiệu về thương hiệu, ngân hàng, hoặc tổ chức giả mạo
+        lines = [
+            orjson.dumps({
+                "custom_id": str(i),
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": self.base_model,
+                    "messages": self._build_scam_messages(texts[i]),
+                    "max_tokens": 1000
+                }
+            })
+            for i in pending
+        ]
+        batch_file = io.BytesIO(b"\n".join(lines))
+        uploaded = self.client.files.create(file=("batch.jsonl", batch_file), purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=uploaded.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+        return batch.id
+    
+    def fetch_text_content_batch(self, batch_id: Optional[str], texts: List[str],
+                                 analysis_type: str = "conversation") -> Optional[List[Dict[str, Any]]]:
+        """
+        Check a batch from submit_text_content_batch once, without waiting
         
-        NỘI DUNG VĂN BẢN ĐÃ TRÍCH XUẤT (nếu có):
-        {text if text else 'Không có văn bản được trích xuất'}
+        Args:
+            batch_id: Id returned by submit_text_content_batch
+            texts: The submitted texts, in the same order
+            analysis_type: Type of analysis that was requested
+            
+        Returns:
+            One result per input text, in the same format as analyze_text_content,
+            or None while the batch is still running
+        """
+        results: List[Optional[Dict[str, Any]]] = [self._maybe_direct_response(text) for text in texts]
+        if batch_id is None:
+            return results
         
-        CÁC THỰC THỂ ĐÃ ĐƯỢC TRÍCH XUẤT:
-        Các số điện thoại: {phones if phones else 'None found'}
-        Đường dẫn URLs: {urls if urls else 'None found'}
+        batch = self.client.batches.retrieve(batch_id)
+        if batch.status not in ("completed", "failed", "expired", "cancelled"):
+            return None
         
-        Hãy cung cấp một phân tích chi tiết bao gồm:
-        1. Mức độ nguy hiểm (Low/Medium/High)
-        2. Các dấu hiệu nhận biết lừa đảo từ hình ảnh
-        3. Các mối lo ngại về nội dung và thiết kế
-        4. Đề xuất cho người dùng để bảo vệ
-        5. Mức độ tin cậy của phân tích
+        pending = [i for i, result in enumerate(results) if result is None]
+        if batch.status != "completed" or not batch.output_file_id:
+            logger.error(f"Batch {batch_id} ended with status {batch.status}")
+            for i in pending:
+                results[i] = {"error": f"Batch ended with status {batch.status}"}
+            return results
         
-        Hãy format câu trả lời của bạn dưới dạng json gồm những nội dung sau VÀ Ở TRONG NGÔN NGỮ TIẾNG VIỆT:
-        RISK_LEVEL: [Low/Medium/High]
-        CONFIDENCE: [0-100]
-        ANALYSIS: [Phân tích chi tiết về hình ảnh và nội dung]
-        RECOMMENDATIONS: [Các hành động phải làm]
+        for i in pending:
+            results[i] = {"error": "Missing from batch output"}
+        output = self.client.files.content(batch.output_file_id).text
+        for line in output.splitlines():
+            if not line.strip():
+                continue
+            item = orjson.loads(line)
+            index = int(item["custom_id"])
+            if item.get("error"):
+                results[index] = {"error": str(item["error"])}
+                continue
+            try:
+                body = item["response"]["body"]
+                results[index] = self._parse_scam_analysis(body["choices"][0]["message"]["content"])
+            except Exception as e:
+                results[index] = {"error": str(e)}
+        return results
+    
+    def _build_scam_messages(self, text: str) -> List[Dict[str, Any]]:
+        return [
+            {"role": "system", "content": _SCAM_SYSTEM_PROMPT},
+            {"role": "user", "content": self._build_scam_analysis_prompt(text)}
+        ]
+    
+    def _parse_scam_analysis(self, analysis: str) -> Dict[str, Any]:
         """
-        return prompt
+        Convert the model's JSON answer into the common result format
+        """
+        json_match = re.search(r"```json\s*(\{.*?\})\s*```", analysis, re.DOTALL)
+        json_str = json_match.group(1) if json_match else analysis.strip()
+        json_response = orjson.loads(json_str)
+
+        return {
+            "analysis": json_response["ANALYSIS"],
+            "recommendation": json_response["RECOMMENDATIONS"],
+            "risk_level": json_response["RISK_LEVEL"],
+            "confidence": int(json_response["CONFIDENCE"]),
+            "model_used": self.base_model,
+            "image_analyzed": True
+        }
     
-    def _build_scam_analysis_prompt(self, text: str) -> str:
+    def _build_image_analysis_prompt(self, text: str, entities: Dict[str, Any]) -> str:
         """
-        Build a comprehensive prompt for scam analysis
+        Build the per-request part of the image analysis prompt.
+        The static instructions live in _IMAGE_SYSTEM_PROMPT.
         
         Args:
-            text: Extracted text from screenshot
+            text: Extracted text from OCR (if available)
             entities: Extracted entities
             
         Returns:
             Formatted prompt string
         """
-  
-        
-        prompt = f"""
-        Bạn là một AI phân tích lừa đảo chuyên nghiệp, hãy thật cân nhắc về các hình thức lừa đảo trên không gian mạng, đặc biệt ở Việt Nam
-        Nhiệm vụ của bạn là phân tích nội dung cuộc hội thoại để xác định khả năng đây là một cuộc lừa đảo. Hãy phân tích những nội dung thu thập được từ cuộc hội thoại 
-        qua điện thoại sau đây để phân tích khả năng lừa đảo (Đây là transcript nhận diện audio qua điện thoại nên đôi lúc sẽ có khoảng không nghe được)
-
-        Nội dung đoạn hội thoại: {text} 
+        entities = normalize_entities(entities)
+        return _IMAGE_PROMPT_TMPL.format_map({
+            "text_block": text or _NO_TEXT,
+            "phones": format_entity_list(entities['phones']),
+            "urls": format_entity_list(entities['urls']),
+        })
     
-        Hãy làm ơn cung cấp một phân tích bao gồm những nội dung sau:  
-        1. Mức độ nguy hiểm (Low/Medium/High)
-        2. Các dấu hiệu nhận biết lừa đảo
-        3. Các mối lo ngại liên quan đến đường link và số điện thoại
-        4. Đề xuất cho người dùng để bảo vệ
-        5. Mức độ tin cậy 
+    def _build_scam_analysis_prompt(self, text: str) -> str:
+        """
+        Build the per-request part of the conversation analysis prompt.
+        The static instructions live in _SCAM_SYSTEM_PROMPT.
         
-        Hãy format câu trả lời của bạn dưới dạng json gồm những nội dung sau:
-        RISK_LEVEL: [Low/Medium/High]
-        CONFIDENCE: [0-100]
-        ANALYSIS: [Phân tích chi tiết]
-        RECOMMENDATIONS: [Các hành động phải làm]
+        Args:
+            text: Conversation transcript
+            
+        Returns:
+            Formatted prompt string
         """
-        return prompt
+        return f"Nội dung đoạn hội thoại: {text}"
     
 
 
@@ -205,7 +331,7 @@ class OpenAIService(LLMServiceBase):
         try:
             json_match = re.search(r"```json\s*(\{.*?\})\s*```", analysis, re.DOTALL)
             json_str = json_match.group(1) if json_match else analysis.strip()
-            return json.loads(json_str)
+            return orjson.loads(json_str)
         except Exception:
             return {
                 "message": "JSON FORMAT ERROR"
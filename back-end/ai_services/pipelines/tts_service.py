@@ -1,14 +1,61 @@
 import os
+import json
+import hashlib
 import logging
-from typing import Dict, Any
+import functools
+import threading
+from typing import Dict, Any, Optional
 from pathlib import Path
+import struct
 import tempfile
-import wave
 
 
 logger = logging.getLogger(__name__)
 
+# Synthesis parameters used for every request
+_SYNTHESIS_PARAMS = {
+    "volume": 1.5,
+    "length_scale": 1.8,  # twice as slow
+    "noise_scale": 0.4,  # more audio variation
+    "noise_w_scale": 0.5,  # more speaking variation
+    "normalize_audio": True,  # use raw audio from voice
+}
+
+
+# 1 MiB write buffer for streaming PCM chunks to disk
+_WRITE_BUFFER_SIZE = 1 << 20
+
+
+def _wav_header(data_size: int, sample_rate: int, sample_width: int = 2, channels: int = 1) -> bytes:
+    """Build the 44-byte header of a PCM WAV file holding data_size bytes of audio"""
+    byte_rate = sample_rate * sample_width * channels
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + data_size, b"WAVE",
+        b"fmt ", 16, 1, channels, sample_rate, byte_rate, sample_width * channels, sample_width * 8,
+        b"data", data_size,
+    )
+
+
+@functools.cache
+def _get_synthesis_config(volume: float, length_scale: float, noise_scale: float,
+                          noise_w_scale: float, normalize_audio: bool):
+    """Build (once per parameter set) the Piper synthesis config"""
+    import piper
+    return piper.SynthesisConfig(
+        volume=volume,
+        length_scale=length_scale,
+        noise_scale=noise_scale,
+        noise_w_scale=noise_w_scale,
+        normalize_audio=normalize_audio,
+    )
+
+
 class TTSService:
+    # The Piper voice is loaded once and shared by every instance
+    _voice: Optional[Any] = None
+    _voice_lock = threading.Lock()
+
     def __init__(self, output_dir: str = "./data/tts_outputs"):
         """
         Initialize TTS service with Piper TTS Python API
@@ -48,6 +95,37 @@ class TTSService:
             "config_path": str(config_file)
         }
     
+    def _get_voice(self):
+        """Load the Piper voice on first use and reuse it afterwards"""
+        if TTSService._voice is None:
+            with TTSService._voice_lock:
+                if TTSService._voice is None:
+                    import piper
+                    model_paths = self._get_model_paths()
+                    TTSService._voice = piper.PiperVoice.load(
+                        model_paths['model_path'],
+                        config_path=model_paths['config_path']
+                    )
+        return TTSService._voice
+    
+    def _write_wav(self, tts, text: str, syn_config, path: str) -> None:
+        """
+        Stream Piper's PCM chunks straight to a WAV file, then patch the
+        header sizes once the total length is known
+        """
+        sample_rate = tts.config.sample_rate
+        data_size = 0
+        with open(path, 'wb', buffering=_WRITE_BUFFER_SIZE) as f:
+            f.write(_wav_header(0, sample_rate))
+            for chunk in tts.synthesize(text, syn_config=syn_config):
+                audio = chunk.audio_int16_bytes
+                f.write(audio)
+                data_size += len(audio)
+            f.seek(4)
+            f.write(struct.pack("<I", 36 + data_size))
+            f.seek(40)
+            f.write(struct.pack("<I", data_size))
+    
     def text_to_speech(self, text: str) -> Dict[str, Any]:
         """
         Convert text to speech using Piper TTS Python API
@@ -59,43 +137,47 @@ class TTSService:
             Dictionary containing file path and metadata
         """
         try:
-            # Import piper here to avoid import errors if not installed
-            import piper 
-            
-            
-            # Validate input
-            if not text.strip():
+            # Validate input; surrounding whitespace doesn't change the audio,
+            # so it's dropped to share cache entries
+            text = text.strip()
+            if not text:
                 raise ValueError("Text cannot be empty")
             
-            # Get local model paths
-            model_paths = self._get_model_paths()
-            
-            # Generate output filename
-            import hashlib
-            text_hash = hashlib.md5(text.encode('utf-8')).hexdigest()[:8]
+            # Generate output filename from the text and synthesis parameters,
+            # so a parameter change never serves audio made with the old ones
+            hash_input = json.dumps({"text": text, **_SYNTHESIS_PARAMS}, sort_keys=True, ensure_ascii=False)
+            text_hash = hashlib.blake2b(hash_input.encode('utf-8'), digest_size=8).hexdigest()
             output_filename = f"tts_{text_hash}.wav"
             output_path = self.output_dir / output_filename
             
-            # Initialize Piper TTS
-            tts = piper.PiperVoice.load(
-                model_paths['model_path'],
-                config_path=model_paths['config_path']
-            )
+            # Same text was already synthesized, reuse the file
+            if output_path.exists() and output_path.stat().st_size > 0:
+                return {
+                    "success": True,
+                    "file_path": str(output_path),
+                    "file_name": output_filename,
+                    "etag": text_hash,
+                    "cached": True
+                }
+            
+            # Get the shared Piper voice
+            tts = self._get_voice()
 
 
             # Generate speech
             logger.info(f"Generating speech for text: {text[:50]}...")
             
-            syn_config = piper.SynthesisConfig(
-                volume=1.5,  
-                length_scale=1.8,  # twice as slow
-                noise_scale=0.4,  # more audio variation
-                noise_w_scale=0.5,  # more speaking variation
-                normalize_audio=True, # use raw audio from voice
-            )
+            syn_config = _get_synthesis_config(**_SYNTHESIS_PARAMS)
 
-            with wave.open(str(output_path), 'wb') as wf:
-                tts.synthesize_wav(text, wf, syn_config=syn_config)
+            # Write to a temp file first so a half-written file is never served from cache
+            with tempfile.NamedTemporaryFile(dir=self.output_dir, suffix=".wav", delete=False) as tmp_file:
+                tmp_path = tmp_file.name
+            try:
+                self._write_wav(tts, text, syn_config, tmp_path)
+                os.replace(tmp_path, output_path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
                
             
             logger.info(f"TTS generation successful: {output_path}")
@@ -103,7 +185,9 @@ class TTSService:
             return {
                 "success": True,
                 "file_path": str(output_path),
-                "file_name": output_filename
+                "file_name": output_filename,
+                "etag": text_hash,
+                "cached": False
             }
             
         except ImportError:
@@ -1,41 +1,67 @@
 import re
-import requests
+import httpx
 from urllib.parse import urlparse
 
+try:
+    import re2
+except ImportError:
+    re2 = None
+
+
+def compile_pattern(pattern: str, ignore_case: bool = False):
+    """
+    Compile a pattern that runs on untrusted text. Uses RE2 (linear time, no
+    catastrophic backtracking) when google-re2 is installed and the pattern
+    is RE2-compatible, otherwise the standard re module.
+    """
+    if ignore_case:
+        pattern = '(?i)' + pattern
+    if re2 is not None:
+        try:
+            return re2.compile(pattern)
+        except re2.error:
+            pass
+    return re.compile(pattern)
+
+
+_URL_RE = compile_pattern(
+    r'https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+'
+    r'(?:/[-\w._~:/?#[\]@!$&\'()*+,;=]*)?'
+    r'|(?:www\.)[-\w.]+\.[a-z]{2,}(?:/[-\w._~:/?#[\]@!$&\'()*+,;=]*)?',
+    ignore_case=True
+)
+_URL_FIRST_RE = compile_pattern(r'(https?://\S+|www\.\S+)', ignore_case=True)
+
+# Shared pooled client so repeated link checks reuse keep-alive connections
+_http_client = httpx.Client(
+    limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+    timeout=5.0,
+    headers={'User-Agent': 'Mozilla/5.0'},
+    follow_redirects=True
+)
 
 
 class UtilService: 
     @staticmethod 
-    def is_contain_link(self, text: str):
+    def is_contain_link(text: str):
         """
         Returns True if the text contains a URL, False otherwise.
         Supports HTTP, HTTPS, and common domain patterns.
         """
-        url_pattern = re.compile(
-            r'https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+'
-            r'(?:/[-\w._~:/?#[\]@!$&\'()*+,;=]*)?'
-            r'|(?:www\.)[-\w.]+\.[a-z]{2,}(?:/[-\w._~:/?#[\]@!$&\'()*+,;=]*)?',
-            re.IGNORECASE
-        )
-
-        return bool(url_pattern.search(text))
+        return bool(_URL_RE.search(text))
 
     @staticmethod
-    def is_link_accessible(self, text:str):
+    def is_link_accessible(text:str):
         """
         Returns True if the text contains an accessible URL, False otherwise.
         Handles common exceptions and follows redirects.
         """
-        if not self.is_contain_link(text):
+        if not UtilService.is_contain_link(text):
             return False
             
         try:
             # Extract first URL found in text
-            url_match = re.search(
-                r'(https?://\S+|www\.\S+)', 
-                text, 
-                re.IGNORECASE
-            )
+            url_match = _URL_FIRST_RE.search(text)
             
             if not url_match:
                 return False
@@ -52,14 +78,9 @@ class UtilService:
                 return False
                 
             # Make HEAD request (faster than GET)
-            response = requests.head(
-                url,
-                allow_redirects=True,
-                timeout=5,
-                headers={'User-Agent': 'Mozilla/5.0'}
-            )
+            response = _http_client.head(url)
             
             return response.status_code < 400
             
-        except (requests.RequestException, ValueError):
+        except (httpx.HTTPError, ValueError):
             return False
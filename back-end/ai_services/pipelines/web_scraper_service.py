@@ -1,4 +1,5 @@
-import requests
+import httpx
+import ssl
 from urllib.parse import urlparse
 import re
 from bs4 import BeautifulSoup
@@ -6,18 +7,174 @@ import tldextract
 import warnings
 from fake_useragent import UserAgent
 import os
-import json
+import orjson
+import time
+import functools
+import itertools
+import threading
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
 from pathlib import Path
+from .util import compile_pattern
 
 
+_LINK_RE = compile_pattern(
+    r'(https?://[^\s]+|www\.[^\s]+|bit\.ly/[^\s]+|tinyurl\.com/[^\s]+)',
+    ignore_case=True
+)
+_URL_FIRST_RE = compile_pattern(r'(https?://\S+|www\.\S+)', ignore_case=True)
+
+# Only the start of a page is needed for the 5000-char text excerpt, so stop
+# downloading after this many bytes
+_MAX_PAGE_BYTES = 256 * 1024
+_READ_CHUNK_SIZE = 16 * 1024
+
+_UA_POOL_SIZE = 16
+
+# Scan results are cached per normalized URL, the same phishing link tends to
+# arrive in many messages
+_CONTENT_CACHE_SIZE = 4096
+_CONTENT_CACHE_TTL = 600
+_MAX_AGE_RE = re.compile(r'max-age=(\d+)', re.IGNORECASE)
+
+# The C-based lxml parser is much faster than the pure-Python one, use it when installed
+try:
+    import lxml  # noqa: F401
+    _HTML_PARSER = 'lxml'
+except ImportError:
+    _HTML_PARSER = 'html.parser'
+
+
+def _normalize_cache_key(url):
+    """Lowercase scheme and host and drop a trailing slash, the path keeps its case"""
+    parsed = urlparse(url)
+    return parsed._replace(scheme=parsed.scheme.lower(), netloc=parsed.netloc.lower()).geturl().rstrip('/')
+
+def _response_ttl(headers):
+    """
+    Cache lifetime for a scan result, honouring the page's Cache-Control and
+    Expires headers but never exceeding _CONTENT_CACHE_TTL
+    """
+    cache_control = headers.get('Cache-Control', '')
+    if 'no-store' in cache_control or 'no-cache' in cache_control:
+        return 0
+    max_age = _MAX_AGE_RE.search(cache_control)
+    if max_age:
+        return min(int(max_age.group(1)), _CONTENT_CACHE_TTL)
+    expires = headers.get('Expires')
+    if expires:
+        try:
+            remaining = parsedate_to_datetime(expires).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return 0
+        return max(0, min(int(remaining), _CONTENT_CACHE_TTL))
+    return _CONTENT_CACHE_TTL
+
+def _is_ssl_error(exc):
+    """Check whether an httpx error was caused by a failed TLS handshake/verification"""
+    while exc is not None:
+        if isinstance(exc, ssl.SSLError):
+            return True
+        exc = exc.__cause__ or exc.__context__
+    return False
+
+@functools.lru_cache(maxsize=4)
+def _read_keywords_file(path, mtime):
+    """
+    Parse a keywords file, cached per (path, mtime) so new SafeScraper
+    instances don't re-read an unchanged file. Supports .json and .txt.
+    """
+    if path.endswith('.json'):
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    # Assume text file, one keyword per line
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()]
+
+@functools.lru_cache(maxsize=4)
+def _compile_keywords(keywords):
+    if not keywords:
+        return None
+    return re.compile("|".join(re.escape(kw) for kw in keywords))
+
+@functools.lru_cache(maxsize=4096)
+def _match_domain(keyword_re, domain):
+    """
+    Keyword check for one domain. Most scans hit a small set of domains, so
+    results (including the tldextract split) are cached. Reloaded keywords
+    compile to a new pattern, which naturally misses the old entries.
+    """
+    extracted = tldextract.extract(domain)
+    # Separator keeps a keyword from matching across the two parts
+    target = f"{extracted.domain}\n{extracted.subdomain}"
+    return keyword_re.search(target) is not None
+
 # Suppress SSL warnings (not recommended for production)
 warnings.filterwarnings("ignore", message="Unverified HTTPS request")
 
 class SafeScraper:
-    def __init__(self, keywords_file="sus_keyword.json"):
+    def __init__(self, keywords_file="sus_keyword.json", async_client=None):
         self.user_agent = UserAgent()
+        # Sample a few user agents once and rotate through them per scan
+        self._ua_pool = tuple(self.user_agent.random for _ in range(_UA_POOL_SIZE))
+        self._ua_cycle = itertools.cycle(self._ua_pool)
+        # normalized URL -> (expires_at, result), kept in LRU order
+        self._content_cache = OrderedDict()
+        self._cache_lock = threading.Lock()
         self.keywords_file = keywords_file
         self.suspicious_keywords = self.load_keywords()
+        self._keyword_re = self._build_keyword_matcher()
+        # Long-lived pooled client, keep-alive connections are reused across scans
+        self._client = httpx.Client(
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+            timeout=httpx.Timeout(8.0),
+            headers={'User-Agent': self._ua_pool[0]},
+            verify=True,  # SSL verification
+            follow_redirects=True,
+            max_redirects=3
+        )
+        # Optionally shared with the app (e.g. app.state), otherwise created lazily
+        self._async_client = async_client
+        self._owns_async_client = async_client is None
+    
+    def _get_async_client(self):
+        """
+        Create the async client on first use, inside the running event loop
+        it will be bound to
+        """
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+                timeout=httpx.Timeout(8.0),
+                headers={'User-Agent': self._ua_pool[0]},
+                verify=True,
+                follow_redirects=True,
+                max_redirects=3
+            )
+        return self._async_client
+    
+    def close(self):
+        """Close the pooled HTTP client"""
+        self._client.close()
+    
+    async def aclose(self):
+        """Close both pooled HTTP clients"""
+        self.close()
+        if self._async_client is not None and self._owns_async_client:
+            await self._async_client.aclose()
+            self._async_client = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
     
     def load_keywords(self):
         """
@@ -35,22 +192,18 @@ class SafeScraper:
         ]
         
         try:
-            # Create directory if needed
-            Path(self.keywords_file).parent.mkdir(parents=True, exist_ok=True)
-            
+            # Parsed once per file version, later calls only cost a stat
+            return _read_keywords_file(self.keywords_file, os.path.getmtime(self.keywords_file))
+        
+        except FileNotFoundError:
             # Create default file if it doesn't exist
-            if not os.path.exists(self.keywords_file):
+            try:
+                Path(self.keywords_file).parent.mkdir(parents=True, exist_ok=True)
                 with open(self.keywords_file, 'w') as f:
                     f.write("\n".join(default_keywords))
-                return default_keywords
-            
-            # Check file extension for appropriate parsing
-            if self.keywords_file.endswith('.json'):
-                with open(self.keywords_file, 'r') as f:
-                    return json.load(f)
-            else:  # Assume text file
-                with open(self.keywords_file, 'r') as f:
-                    return [line.strip() for line in f if line.strip()]
+            except OSError as e:
+                print(f"Warning: Couldn't create keywords file ({e}).")
+            return default_keywords
                     
         except Exception as e:
             print(f"Warning: Couldn't load keywords file ({e}). Using defaults.")
@@ -58,25 +211,31 @@ class SafeScraper:
     
     def reload_keywords(self):
         """Hot-reload keywords without restarting"""
+        _read_keywords_file.cache_clear()
         self.suspicious_keywords = self.load_keywords()
+        self._keyword_re = self._build_keyword_matcher()
 
+    def _build_keyword_matcher(self):
+        """
+        Compile all keywords into one alternation so a domain is scanned in a
+        single pass. The JSON file groups keywords by category, so dict values
+        are flattened.
+        """
+        keywords = self.suspicious_keywords
+        if isinstance(keywords, dict):
+            keywords = [kw for group in keywords.values() for kw in group]
+        return _compile_keywords(tuple(sorted({kw.lower() for kw in keywords if kw})))
 
 
     def contains_link(self, text):
         """Improved URL detection with common scam patterns"""
-        url_pattern = re.compile(
-            r'(https?://[^\s]+|www\.[^\s]+|bit\.ly/[^\s]+|tinyurl\.com/[^\s]+)',
-            re.IGNORECASE
-        )
-        return bool(url_pattern.search(text))
+        return bool(_LINK_RE.search(text))
     
     def is_suspicious_domain(self, domain):
         """Check for known suspicious domain patterns"""
-        extracted = tldextract.extract(domain)
-        return any(
-            kw in extracted.domain.lower() or kw in extracted.subdomain.lower()
-            for kw in self.suspicious_keywords
-        )
+        if self._keyword_re is None:
+            return False
+        return _match_domain(self._keyword_re, domain.lower())
     
     def get_website_content(self, text):
         """
@@ -94,111 +253,190 @@ class SafeScraper:
             return {'contains_link': False}
         
         try:
-            # Extract URL from text
-            url_match = re.search(r'(https?://\S+|www\.\S+)', text, re.IGNORECASE)
-            raw_url = url_match.group(0)
+            url, security_checks = self._prepare_url(text)
+            cache_key = _normalize_cache_key(url)
+            cached = self._get_cached(cache_key)
+            if cached is not None:
+                return cached
             
-            # Normalize URL
-            if not raw_url.startswith(('http://', 'https://')):
-                url = 'https://' + raw_url
-            else:
-                url = raw_url
+            # First make a HEAD request to check safety and redirects
+            headers = {'User-Agent': next(self._ua_cycle)}
+            response = self._client.head(url, headers=headers)
+            blocked = self._check_head_response(response, url, security_checks)
+            if blocked:
+                return self._cache_result(cache_key, blocked)
             
-            parsed = urlparse(url)
-            domain = parsed.netloc
+            # Now make the actual GET request with sandboxed parameters,
+            # streamed so only the first _MAX_PAGE_BYTES are downloaded
+            with self._client.stream('GET', security_checks['final_url'], headers=headers, timeout=10) as response:
+                ttl = _response_ttl(response.headers)
+                blocked = self._check_content_type(response, security_checks)
+                if blocked:
+                    return self._cache_result(cache_key, blocked, ttl)
+                
+                body = bytearray()
+                for chunk in response.iter_bytes(_READ_CHUNK_SIZE):
+                    body += chunk
+                    if len(body) >= _MAX_PAGE_BYTES:
+                        break
+            result = self._parse_page(bytes(body), response.charset_encoding, security_checks)
+            return self._cache_result(cache_key, result, ttl)
+        
+        except Exception as e:
+            return self._error_result(e)
+    
+    async def get_website_content_async(self, text):
+        """
+        Non-blocking version of get_website_content, for use from async
+        FastAPI endpoints. Same return format.
+        """
+        if not self.contains_link(text):
+            return {'contains_link': False}
+        
+        try:
+            url, security_checks = self._prepare_url(text)
+            cache_key = _normalize_cache_key(url)
+            cached = self._get_cached(cache_key)
+            if cached is not None:
+                return cached
             
-            # Security checks
-            security_checks = {
-                'is_https': parsed.scheme == 'https',
-                'is_suspicious_domain': self.is_suspicious_domain(domain),
-                'has_redirects': False,
-                'final_url': url
-            }
+            client = self._get_async_client()
+            headers = {'User-Agent': next(self._ua_cycle)}
+            response = await client.head(url, headers=headers)
+            blocked = self._check_head_response(response, url, security_checks)
+            if blocked:
+                return self._cache_result(cache_key, blocked)
             
-            # First make a HEAD request to check safety
-            with requests.Session() as session:
-                # Configure session with security parameters
-                session.max_redirects = 3
-                session.timeout = 8
-                
-                # First request (HEAD) to check redirects
-                headers = {'User-Agent': self.user_agent.random}
-                response = session.head(
-                    url,
-                    headers=headers,
-                    allow_redirects=True,
-                    verify=True  # SSL verification
-                )
-                
-                security_checks.update({
-                    'has_redirects': response.url != url,
-                    'final_url': response.url,
-                    'status_code': response.status_code
-                })
-                
-                # If suspicious domain or too many redirects, abort
-                if (security_checks['is_suspicious_domain'] or 
-                    response.status_code >= 400):
-                    return {
-                        'contains_link': True,
-                        'is_accessible': False,
-                        'is_suspicious': True,
-                        'security_checks': security_checks,
-                        'error': 'Suspicious domain or inaccessible'
-                    }
-                
-                # Now make the actual GET request with sandboxed parameters
-                response = session.get(
-                    response.url,  # Follow final URL
-                    headers=headers,
-                    timeout=10,
-                    verify=True,
-                    stream=True  # Don't download immediately
-                )
-                
-                # Check content type for safety
-                content_type = response.headers.get('Content-Type', '')
-                if not content_type.startswith('text/html'):
-                    return {
-                        'contains_link': True,
-                        'is_accessible': True,
-                        'is_suspicious': True,
-                        'security_checks': security_checks,
-                        'error': f'Non-HTML content: {content_type}'
-                    }
-                
-                # Safe parsing with BeautifulSoup
-                soup = BeautifulSoup(response.content, 'html.parser', 
-                                   from_encoding=response.encoding)
+            async with client.stream('GET', security_checks['final_url'], headers=headers, timeout=10) as response:
+                ttl = _response_ttl(response.headers)
+                blocked = self._check_content_type(response, security_checks)
+                if blocked:
+                    return self._cache_result(cache_key, blocked, ttl)
                 
-                # Remove potentially dangerous elements
-                for script in soup(["script", "style", "iframe", "object", "embed"]):
-                    script.decompose()
-                
-                # Get clean text content
-                text_content = soup.get_text(separator=' ', strip=True)
-                
-                return {
-                    'contains_link': True,
-                    'is_accessible': True,
-                    'is_suspicious': security_checks['is_suspicious_domain'],
-                    'content': text_content[:5000],  # Limit content size
-                    'security_checks': security_checks
-                }
+                body = bytearray()
+                async for chunk in response.aiter_bytes(_READ_CHUNK_SIZE):
+                    body += chunk
+                    if len(body) >= _MAX_PAGE_BYTES:
+                        break
+            result = self._parse_page(bytes(body), response.charset_encoding, security_checks)
+            return self._cache_result(cache_key, result, ttl)
+        
+        except Exception as e:
+            return self._error_result(e)
+    
+    def _get_cached(self, cache_key):
+        with self._cache_lock:
+            entry = self._content_cache.get(cache_key)
+            if entry is None:
+                return None
+            expires_at, result = entry
+            if expires_at < time.monotonic():
+                del self._content_cache[cache_key]
+                return None
+            self._content_cache.move_to_end(cache_key)
+            return dict(result)
+    
+    def _cache_result(self, cache_key, result, ttl=_CONTENT_CACHE_TTL):
+        """Store a scan result (network errors are never cached) and return it"""
+        if ttl > 0:
+            with self._cache_lock:
+                self._content_cache[cache_key] = (time.monotonic() + ttl, dict(result))
+                self._content_cache.move_to_end(cache_key)
+                if len(self._content_cache) > _CONTENT_CACHE_SIZE:
+                    self._content_cache.popitem(last=False)
+        return result
+    
+    def _prepare_url(self, text):
+        """Extract and normalize the first URL in text, and run the static security checks"""
+        raw_url = _URL_FIRST_RE.search(text).group(0)
+        
+        # Normalize URL
+        if not raw_url.startswith(('http://', 'https://')):
+            url = 'https://' + raw_url
+        else:
+            url = raw_url
+        
+        parsed = urlparse(url)
+        domain = parsed.netloc
         
-        except requests.exceptions.SSLError:
+        # Security checks
+        security_checks = {
+            'is_https': parsed.scheme == 'https',
+            'is_suspicious_domain': self.is_suspicious_domain(domain),
+            'has_redirects': False,
+            'final_url': url
+        }
+        return url, security_checks
+    
+    def _check_head_response(self, response, url, security_checks):
+        """Record redirect info from the HEAD response, return a result if the scan must stop here"""
+        final_url = str(response.url)
+        security_checks.update({
+            'has_redirects': final_url != url,
+            'final_url': final_url,
+            'status_code': response.status_code
+        })
+        
+        # If suspicious domain or too many redirects, abort
+        if (security_checks['is_suspicious_domain'] or 
+            response.status_code >= 400):
             return {
                 'contains_link': True,
                 'is_accessible': False,
                 'is_suspicious': True,
-                'error': 'SSL verification failed - potential security risk'
+                'security_checks': security_checks,
+                'error': 'Suspicious domain or inaccessible'
             }
-        except Exception as e:
+        return None
+    
+    def _check_content_type(self, response, security_checks):
+        """Return a result if the response is not HTML, before its body is downloaded"""
+        # Check content type for safety
+        content_type = response.headers.get('Content-Type', '')
+        if not content_type.startswith('text/html'):
+            return {
+                'contains_link': True,
+                'is_accessible': True,
+                'is_suspicious': True,
+                'security_checks': security_checks,
+                'error': f'Non-HTML content: {content_type}'
+            }
+        return None
+    
+    def _parse_page(self, body, encoding, security_checks):
+        """Extract the visible text of an HTML page"""
+        # Safe parsing with BeautifulSoup
+        soup = BeautifulSoup(body, _HTML_PARSER, 
+                           from_encoding=encoding)
+        
+        # Remove potentially dangerous elements
+        for script in soup(["script", "style", "iframe", "object", "embed"]):
+            script.decompose()
+        
+        # Get clean text content
+        text_content = soup.get_text(separator=' ', strip=True)
+        
+        return {
+            'contains_link': True,
+            'is_accessible': True,
+            'is_suspicious': security_checks['is_suspicious_domain'],
+            'content': text_content[:5000],  # Limit content size
+            'security_checks': security_checks
+        }
+    
+    def _error_result(self, e):
+        if isinstance(e, httpx.HTTPError) and _is_ssl_error(e):
             return {
                 'contains_link': True,
                 'is_accessible': False,
-                'error': str(e)
+                'is_suspicious': True,
+                'error': 'SSL verification failed - potential security risk'
             }
+        return {
+            'contains_link': True,
+            'is_accessible': False,
+            'error': str(e)
+        }
 
 # # Usage Example
 # scraper = SafeScraper()
@@ -1,14 +1,40 @@
 from .pipelines.ocr_service import OCRService
-from .pipelines.llms import LLMService
+from .pipelines.llms import get_llm_service
 from .pipelines.tts_service import TTSService
+from .pipelines.util import compile_pattern
 from typing import Dict, Any
+from functools import cached_property, lru_cache
+
+# Phones, URLs and emails in a single pass. URLs and emails are tried first, so
+# digits inside them are not reported as phone numbers.
+_ENTITY_RE = compile_pattern(
+    r'(?P<urls>https?://\S+)'
+    r'|(?P<emails>\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b)'
+    r'|(?P<phones>\+?\d[\d\- ]{7,}\d)'
+)
+
+_PHONE_SEPARATORS_RE = compile_pattern(r'[\- ]')
+
+# At most this many entities of each kind are kept (and sent to the LLM)
+_MAX_ENTITIES = 32
 
 class AIServices:
-    def __init__(self):
-        """Initialize AI services with OCR, LLM, and TTS capabilities"""
-        self.ocr_service = OCRService()
-        self.llm_service = LLMService()
-        self.tts_service = TTSService()
+    """
+    OCR, LLM, and TTS capabilities. Each sub-service is created on first use,
+    so importing this module doesn't load models or require API keys.
+    """
+    
+    @cached_property
+    def ocr_service(self) -> OCRService:
+        return OCRService()
+    
+    @cached_property
+    def llm_service(self):
+        return get_llm_service()
+    
+    @cached_property
+    def tts_service(self) -> TTSService:
+        return TTSService()
     
     def extract_text_from_image(self, image_path: str, lang: str = 'vie') -> str:
         """
@@ -110,6 +136,20 @@ class AIServices:
             "llm_analysis": llm_result
         }
     
+    async def process_screenshot_analysis_async(self, image_path: str, lang: str = 'vie') -> Dict[str, Any]:
+        """
+        Non-blocking version of process_screenshot_analysis. OCR and image
+        preparation run in parallel before the LLM call.
+        
+        Args:
+            image_path: Path to the screenshot image
+            lang: Language for OCR processing
+            
+        Returns:
+            Dictionary containing OCR text, entities, and LLM analysis
+        """
+        return await self.llm_service.analyze_image_parallel(image_path, lang, self._extract_entities)
+    
     def _extract_entities(self, text: str) -> Dict[str, Any]:
         """
         Extract entities from text (phone numbers, URLs, etc.)
@@ -120,25 +160,29 @@ class AIServices:
         Returns:
             Dictionary containing extracted entities
         """
-        import re
-        
-        # Extract phone numbers
-        phones = re.findall(r'\+?\d[\d\- ]{7,}\d', text)
-        
-        # Extract URLs
-        urls = re.findall(r'(https?://\S+)', text)
-        
-        # Extract email addresses
-        emails = re.findall(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', text)
-        
-        return {
-            "phones": phones,
-            "urls": urls,
-            "emails": emails
+        # dicts keep first-seen order and drop duplicates from noisy OCR
+        found = {
+            "phones": {},
+            "urls": {},
+            "emails": {}
         }
+        for match in _ENTITY_RE.finditer(text):
+            kind = match.lastgroup
+            value = match.group()
+            if kind == "phones":
+                # Collapse formatting variants like "0912-345 678" and "0912345678"
+                value = _PHONE_SEPARATORS_RE.sub("", value)
+            if len(found[kind]) < _MAX_ENTITIES:
+                found[kind][value] = None
+        
+        return {kind: list(values) for kind, values in found.items()}
 
 # Create a global instance for easy access
-ai_services = AIServices()
+@lru_cache(maxsize=None)
+def get_ai_services() -> AIServices:
+    return AIServices()
+
+ai_services = get_ai_services()
 
 # Convenience functions for backward compatibility
 def extract_text_from_image(image_path: str, lang: str = 'vie') -> str:
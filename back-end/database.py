@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
@@ -20,14 +20,42 @@ db = os.getenv("POSTGRESQL_DB")
 DATABASE_URL = f"postgresql://{user}:{password}@{host}:{port}/{db}"
 print(DATABASE_URL)
 
-# Create SQLAlchemy engine
+# Create SQLAlchemy engine, shared by every session below so all services
+# draw from the one pool
+# Pooled connections are reused across requests; pre-ping and recycle drop
+# connections the server has closed before a request gets them
 engine = create_engine(
     DATABASE_URL,
-    connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
+    pool_size=int(os.getenv("DB_POOL_SIZE", 20)),
+    max_overflow=int(os.getenv("DB_MAX_OVERFLOW", 40)),
+    pool_pre_ping=True,
+    pool_recycle=1800,
+    # Rows per multi-row INSERT when executemany uses RETURNING
+    insertmanyvalues_page_size=1000,
+    # executemany UPDATEs/DELETEs go out in batches instead of one round
+    # trip per row
+    executemany_mode="values_plus_batch",
+    # Room for the compiled form of every statement the services issue
+    query_cache_size=1200,
+    # Fail fast when the server is unreachable instead of hanging a worker
+    connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {
+        "connect_timeout": int(os.getenv("DB_CONNECT_TIMEOUT", 2))
+    }
 )
 
 # Create SessionLocal class
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Committed objects keep their loaded values, so returning them after commit
+# doesn't reload each row with another SELECT
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+# Sessions for endpoints that only read. Postgres runs their transactions as
+# READ ONLY, which skips write bookkeeping and rejects accidental writes.
+ReadOnlySessionLocal = sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    expire_on_commit=False,
+    bind=engine.execution_options(postgresql_readonly=True)
+)
 
 # Import Base from models
 from .models.base import Base
@@ -40,6 +68,31 @@ def get_db():
     finally:
         db.close()
 
+# Dependency for read-only endpoints
+def get_db_ro():
+    db = ReadOnlySessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+# Open pool connections before traffic arrives, so the first requests
+# don't pay for the TCP handshake and authentication
+def warm_pool(connections: int = int(os.getenv("DB_WARM_CONNECTIONS", 4))) -> None:
+    opened = []
+    try:
+        for _ in range(connections):
+            conn = engine.connect()
+            opened.append(conn)
+            conn.execute(text("SELECT 1"))
+    finally:
+        # Closing hands them back to the pool, still connected
+        for conn in opened:
+            conn.close()
+
 # Create all tables
 def create_tables():
+    with engine.begin() as conn:
+        # Trigram indexes on phone_numbers depend on it
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
     Base.metadata.create_all(bind=engine) 
\ No newline at end of file
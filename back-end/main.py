@@ -1,12 +1,40 @@
 from fastapi import FastAPI, File, UploadFile, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from contextlib import asynccontextmanager
+import asyncio
+import logging
 import uvicorn
 import shutil
 import os
 from typing import Any
+from .database import warm_pool
+from .ai_services.pipelines.geminiimpl import aclose_async_http_client
 from .routes import phone, alerts, screenshot, user, family, reports, tts
 
-app = FastAPI(title="Backend API của Trustie", version="1.0.1")
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Connect to the database at startup rather than on the first requests.
+    # A database that isn't up yet must not keep the app from starting.
+    try:
+        await asyncio.to_thread(warm_pool)
+    except Exception as e:
+        logger.warning("Could not prewarm the DB connection pool: %s", e)
+    yield
+    await aclose_async_http_client()
+
+app = FastAPI(
+    title="Backend API của Trustie",
+    version="1.0.1",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
+)
+
+# List responses are repetitive JSON and shrink several times over when
+# compressed; small bodies aren't worth the CPU and go out as is
+app.add_middleware(GZipMiddleware, minimum_size=1000)
 
 # Include routers
 app.include_router(phone.router)
@@ -19,4 +47,15 @@ app.include_router(tts.router)
 
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # httptools parses HTTP in C; loop="auto" picks uvloop when it is installed.
+    # Each worker loads its own OCR/TTS models, lower WEB_CONCURRENCY if memory is tight.
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8000,
+        # Serve on a UNIX socket instead when set, for clients on the same host
+        uds=os.getenv("TRUSTIE_UDS"),
+        loop="auto",
+        http="httptools",
+        workers=int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1))
+    )
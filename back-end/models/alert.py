@@ -1,15 +1,15 @@
 import datetime
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Enum as SQLEnum, Boolean
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Enum as SQLEnum, Boolean, Index
 from sqlalchemy.orm import relationship
-from .base import Base
+from .base import Base, UTC_NOW
 
 class Alert(Base):
     __tablename__ = "alerts"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    family_member_id = Column(Integer, ForeignKey("family_members.id"), nullable=True)
-    detection_result_id = Column(Integer, ForeignKey("scam_detection_results.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    family_member_id = Column(Integer, ForeignKey("family_members.id", ondelete="CASCADE"), nullable=True)
+    detection_result_id = Column(Integer, ForeignKey("scam_detection_results.id", ondelete="CASCADE"), nullable=False)
     
     alert_type = Column(SQLEnum("scam_detected", "suspicious_activity", "high_risk", "urgent", name="alert_type_enum"), nullable=False)
     severity = Column(SQLEnum("low", "medium", "high", "critical", name="severity_enum"), default="medium")
@@ -17,8 +17,24 @@ class Alert(Base):
     is_read = Column(Boolean, default=False, index=True)
     is_acknowledged = Column(Boolean, default=False)
     acknowledged_at = Column(DateTime, nullable=True)
-    acknowledged_by = Column(Integer, ForeignKey("users.id"), nullable=True)
-    created_at = Column(DateTime, default=datetime.datetime.utcnow, index=True)
+    acknowledged_by = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, server_default=UTC_NOW, index=True)
+
+    # Composite indexes for the per-user alert list and severity filter, plus
+    # small partial ones covering only unread and open critical alerts, the
+    # rare states the unread count/list and the dashboard look for
+    __table_args__ = (
+        Index("ix_alerts_user_created_id", user_id, created_at.desc(), id.desc()),
+        Index(
+            "ix_alerts_user_unread_created", user_id, created_at.desc(), id.desc(),
+            postgresql_where=(is_read == False)
+        ),
+        Index("ix_alerts_user_severity_created", user_id, severity, created_at.desc()),
+        Index(
+            "ix_alerts_user_critical_open", user_id, created_at.desc(),
+            postgresql_where=((severity == "critical") & (is_acknowledged == False))
+        ),
+    )
 
     # Relationships
     user = relationship("User", foreign_keys=[user_id], back_populates="alerts")
@@ -1,5 +1,5 @@
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import MetaData
+from sqlalchemy import MetaData, func
 
 # Define naming convention for constraints
 convention = {
@@ -11,4 +11,10 @@ convention = {
 }
 
 metadata = MetaData(naming_convention=convention)
-Base = declarative_base(metadata=metadata) 
\ No newline at end of file
+Base = declarative_base(metadata=metadata)
+
+# Current UTC time computed by Postgres, for server-side timestamp defaults.
+# Stays a naive UTC timestamp like the datetime.utcnow() values set in Python.
+# Columns keep their Python default too: tables created before the server
+# defaults existed have none, and nothing migrates them.
+UTC_NOW = func.timezone("utc", func.now())
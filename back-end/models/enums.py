@@ -0,0 +1,13 @@
+from sqlalchemy import Enum as SQLEnum
+from .base import metadata
+
+# Canonical value sets for enum columns used by more than one model
+PRIORITY_VALUES = ("low", "medium", "high", "urgent")
+SOURCE_TYPE_VALUES = ("phone", "screenshot", "website", "sms")
+RESULT_LABEL_VALUES = ("safe", "scam", "suspicious", "unknown")
+
+# Enum types shared by several tables. On Postgres SQLEnum is a native ENUM
+# (4 bytes per value, no label strings in rows or indexes). Binding them to the
+# metadata makes create_all emit each CREATE TYPE once, ahead of the tables.
+SOURCE_TYPE_ENUM = SQLEnum(*SOURCE_TYPE_VALUES, name="source_type_enum", metadata=metadata)
+PRIORITY_ENUM = SQLEnum(*PRIORITY_VALUES, name="priority_enum", metadata=metadata)
@@ -1,26 +1,32 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, DateTime, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
-from .base import Base
+from .base import Base, UTC_NOW
 
 class FamilyMember(Base):
     __tablename__ = "family_members"
 
     id = Column(Integer, primary_key=True, index=True)
     
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    linked_user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    linked_user_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
     name = Column(String(255), nullable=False)
     relation_type = Column(String(100), nullable=True)  # "spouse", "child", "parent", "sibling"
     phone_number = Column(String(20), nullable=True)
     email = Column(String(255), nullable=True)
     notify_on_alert = Column(Boolean, default=True)
     is_primary_contact = Column(Boolean, default=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, server_default=UTC_NOW)
+    updated_at = Column(DateTime, default=datetime.utcnow, server_default=UTC_NOW, onupdate=UTC_NOW)
+
+    # A family member is linked to a user at most once. Also the conflict
+    # target link_family_member inserts against.
+    __table_args__ = (
+        UniqueConstraint("user_id", "linked_user_id", name="uq_family_link"),
+    )
 
     # Relationships
     user = relationship("User", foreign_keys=[user_id], back_populates="family_members")
     linked_user = relationship("User", foreign_keys=[linked_user_id])
-    alerts = relationship("Alert", back_populates="family_member", cascade="all, delete-orphan")
+    alerts = relationship("Alert", back_populates="family_member", cascade="all, delete-orphan", passive_deletes=True)
 
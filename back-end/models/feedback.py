@@ -1,7 +1,7 @@
 from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Enum as SQLEnum
 from sqlalchemy.orm import relationship
 from datetime import datetime
-from .base import Base
+from .base import Base, UTC_NOW
 
 class Feedback(Base):
     __tablename__ = "feedbacks"
@@ -12,11 +12,11 @@ class Feedback(Base):
     rating = Column(Integer, nullable=True)  # 1-5 rating
     status = Column(SQLEnum("open", "in_progress", "resolved", "closed", name="feedback_status_enum"), default="open")
     admin_response = Column(Text, nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow, index=True)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, server_default=UTC_NOW, index=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, server_default=UTC_NOW, onupdate=UTC_NOW)
     resolved_at = Column(DateTime, nullable=True)
     
-    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    user_id = Column(Integer, ForeignKey('users.id', ondelete="CASCADE"), nullable=False)
 
     # Relationships
     user = relationship("User", back_populates="feedbacks") 
\ No newline at end of file
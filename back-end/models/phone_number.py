@@ -1,7 +1,7 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Text
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
-from .base import Base
+from .base import Base, UTC_NOW
 
 class PhoneNumber(Base):
     __tablename__ = "phone_numbers"
@@ -15,13 +15,23 @@ class PhoneNumber(Base):
     flag_reason = Column(String(255), nullable=True)  # Reason for flagging
     risk_score = Column(Integer, default=0)  # Risk score from 0-100
     last_checked = Column(DateTime, nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, server_default=UTC_NOW)
+    updated_at = Column(DateTime, default=datetime.utcnow, server_default=UTC_NOW, onupdate=UTC_NOW)
     
-    owner_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    owner_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=True)
+
+    # Trigram indexes let the substring search (LIKE '%q%') use an index
+    # instead of scanning the table. Needs the pg_trgm extension.
+    # ix_phone_numbers_flagged_keyset serves the flagged list's keyset pages.
+    __table_args__ = (
+        Index("ix_phone_numbers_flagged_keyset", risk_score.desc(), id.desc(), postgresql_where=(is_flagged == True)),
+        Index("ix_phone_numbers_number_trgm", number, postgresql_using="gin", postgresql_ops={"number": "gin_trgm_ops"}),
+        Index("ix_phone_numbers_info_trgm", info, postgresql_using="gin", postgresql_ops={"info": "gin_trgm_ops"}),
+        Index("ix_phone_numbers_origin_trgm", origin, postgresql_using="gin", postgresql_ops={"origin": "gin_trgm_ops"}),
+    )
     
     # Relationships
     owner = relationship("User", back_populates="phones")
-    sms_logs = relationship("SMSLog", back_populates="phone", cascade="all, delete-orphan")
-    reports = relationship("Report", back_populates="reported_phone", cascade="all, delete-orphan")
-    scan_requests = relationship("ScanRequest", back_populates="phone", cascade="all, delete-orphan")
+    sms_logs = relationship("SMSLog", back_populates="phone", cascade="all, delete-orphan", passive_deletes=True)
+    reports = relationship("Report", back_populates="reported_phone", cascade="all, delete-orphan", passive_deletes=True)
+    scan_requests = relationship("ScanRequest", back_populates="phone", cascade="all, delete-orphan", passive_deletes=True)
@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Enum as SQLEnum, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
-from .base import Base
+from .base import Base, UTC_NOW
+from .enums import PRIORITY_ENUM
 
 class Report(Base):
     __tablename__ = "reports"
@@ -10,16 +11,20 @@ class Report(Base):
     reason = Column(Text, nullable=False)
     report_type = Column(SQLEnum("phone", "website", "sms", "general", name="report_type_enum"), nullable=False)
     status = Column(SQLEnum("pending", "reviewed", "resolved", "dismissed", name="report_status_enum"), default="pending")
-    priority = Column(SQLEnum("low", "medium", "high", "urgent", name="priority_enum"), default="medium")
+    priority = Column(PRIORITY_ENUM, default="medium")
     admin_notes = Column(Text, nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow, index=True)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, server_default=UTC_NOW, index=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, server_default=UTC_NOW, onupdate=UTC_NOW)
     resolved_at = Column(DateTime, nullable=True)
     
-    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
-    reported_phone_id = Column(Integer, ForeignKey('phone_numbers.id'), nullable=True)
-    reported_website_id = Column(Integer, ForeignKey('websites.id'), nullable=True)
-    reported_sms_id = Column(Integer, ForeignKey('sms_logs.id'), nullable=True)
+    user_id = Column(Integer, ForeignKey('users.id', ondelete="CASCADE"), nullable=False)
+    reported_phone_id = Column(Integer, ForeignKey('phone_numbers.id', ondelete="CASCADE"), nullable=True)
+    reported_website_id = Column(Integer, ForeignKey('websites.id', ondelete="CASCADE"), nullable=True)
+    reported_sms_id = Column(Integer, ForeignKey('sms_logs.id', ondelete="CASCADE"), nullable=True)
+
+    __table_args__ = (
+        Index("ix_reports_user_status_created", user_id, status, created_at.desc()),
+    )
 
     # Relationships
     user = relationship("User", back_populates="reports")
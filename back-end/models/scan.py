@@ -1,26 +1,33 @@
 import datetime
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Enum as SQLEnum, Index
 from sqlalchemy.orm import relationship
-from .base import Base
+from .base import Base, UTC_NOW
+from .enums import SOURCE_TYPE_ENUM, PRIORITY_ENUM
 
 class ScanRequest(Base):
     __tablename__ = "scan_requests"
     
     id = Column(Integer, primary_key=True, index=True)
     source_from = Column(String(100), nullable=False)  # "manual", "automatic", "scheduled"
-    source_type = Column(SQLEnum("phone", "screenshot", "website", "sms", name="source_type_enum"), nullable=False)
+    source_type = Column(SOURCE_TYPE_ENUM, nullable=False)
     status = Column(SQLEnum("pending", "processing", "completed", "failed", name="scan_status_enum"), default="pending")
-    priority = Column(SQLEnum("low", "medium", "high", "urgent", name="priority_enum"), default="medium")
+    priority = Column(PRIORITY_ENUM, default="medium")
     notes = Column(Text, nullable=True)
-    timestamp = Column(DateTime, default=datetime.datetime.utcnow, index=True)
+    timestamp = Column(DateTime, default=datetime.datetime.utcnow, server_default=UTC_NOW, index=True)
     completed_at = Column(DateTime, nullable=True)
 
     # Foreign keys - only one should be set based on source_type
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    screenshot_id = Column(Integer, ForeignKey("screenshots.id"), nullable=True)
-    phone_id = Column(Integer, ForeignKey("phone_numbers.id"), nullable=True)
-    website_id = Column(Integer, ForeignKey("websites.id"), nullable=True)
-    sms_id = Column(Integer, ForeignKey("sms_logs.id"), nullable=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    screenshot_id = Column(Integer, ForeignKey("screenshots.id", ondelete="CASCADE"), nullable=True)
+    phone_id = Column(Integer, ForeignKey("phone_numbers.id", ondelete="CASCADE"), nullable=True)
+    website_id = Column(Integer, ForeignKey("websites.id", ondelete="CASCADE"), nullable=True)
+    sms_id = Column(Integer, ForeignKey("sms_logs.id", ondelete="CASCADE"), nullable=True)
+
+    __table_args__ = (
+        Index("ix_scan_req_user_status_ts", user_id, status, timestamp.desc()),
+        # A user's scans newest first, whatever their status
+        Index("ix_scan_req_user_ts", user_id, timestamp.desc()),
+    )
     
     # Relationships
     user = relationship("User", back_populates="scan_requests")
@@ -28,4 +35,6 @@ class ScanRequest(Base):
     phone = relationship("PhoneNumber", back_populates="scan_requests")
     website = relationship("Website", back_populates="scan_requests")
     sms = relationship("SMSLog", back_populates="scan_requests")
-    scan_results = relationship("ScamDetectionResult", back_populates="scan_request", cascade="all, delete-orphan")
\ No newline at end of file
+    # Results are almost always read with their scan, load them for a whole list in one IN query
+    scan_results = relationship("ScamDetectionResult", back_populates="scan_request", cascade="all, delete-orphan", passive_deletes=True, lazy="selectin")
+
@@ -1,26 +1,36 @@
 import datetime
-from sqlalchemy import Column, Integer, String, ForeignKey, Float, DateTime, Text, JSON, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, ForeignKey, Float, DateTime, Text, JSON, Enum as SQLEnum, Index
 from sqlalchemy.orm import relationship
-from .base import Base
+from .base import Base, UTC_NOW
+from .enums import SOURCE_TYPE_ENUM, RESULT_LABEL_VALUES
 
 class ScamDetectionResult(Base):
     __tablename__ = "scam_detection_results"
 
     id = Column(Integer, primary_key=True, index=True)
-    source_type = Column(SQLEnum("phone", "screenshot", "website", "sms", name="source_type_enum"), nullable=False)
+    source_type = Column(SOURCE_TYPE_ENUM, nullable=False)
     source_id = Column(Integer, nullable=False)  # FK is dynamic based on source_type
-    result_label = Column(SQLEnum("safe", "scam", "suspicious", "unknown", name="result_label_enum"), nullable=False)
+    result_label = Column(SQLEnum(*RESULT_LABEL_VALUES, name="result_label_enum"), nullable=False)
     confidence_score = Column(Float, nullable=False)  # 0.0 to 1.0
     risk_score = Column(Integer, default=0)  # 0-100 risk score
     detection_method = Column(String(100), nullable=True)  # "ai_model", "rule_based", "manual"
     analysis_details = Column(Text, nullable=True)  # Detailed analysis results
     ai_model_version = Column(String(50), nullable=True)
     processing_time = Column(Float, nullable=True)  # Time taken to process in seconds
-    created_at = Column(DateTime, default=datetime.datetime.utcnow, index=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, server_default=UTC_NOW, index=True)
     
     # Foreign key to scan request
-    scan_request_id = Column(Integer, ForeignKey("scan_requests.id"), nullable=True)
+    scan_request_id = Column(Integer, ForeignKey("scan_requests.id", ondelete="CASCADE"), nullable=True, index=True)
+
+    # One small partial index per source type, so looking up the results of a
+    # given phone/website/... is an index seek despite the untyped source_id
+    __table_args__ = (
+        Index("ix_sdr_phone", source_id, postgresql_where=(source_type == "phone")),
+        Index("ix_sdr_screenshot", source_id, postgresql_where=(source_type == "screenshot")),
+        Index("ix_sdr_website", source_id, postgresql_where=(source_type == "website")),
+        Index("ix_sdr_sms", source_id, postgresql_where=(source_type == "sms")),
+    )
     
     # Relationships
     scan_request = relationship("ScanRequest", back_populates="scan_results")
-    alerts = relationship("Alert", back_populates="detection_result", cascade="all, delete-orphan")
+    alerts = relationship("Alert", back_populates="detection_result", cascade="all, delete-orphan", passive_deletes=True)
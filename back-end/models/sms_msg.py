@@ -1,7 +1,7 @@
 from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Text
 from sqlalchemy.orm import relationship
 from datetime import datetime
-from .base import Base
+from .base import Base, UTC_NOW
 
 class SMSLog(Base):
     __tablename__ = "sms_logs"
@@ -13,14 +13,15 @@ class SMSLog(Base):
     flag_reason = Column(String(255), nullable=True)
     risk_score = Column(Integer, default=0)  # Risk score from 0-100
     message_type = Column(String(50), nullable=True)  # "incoming", "outgoing"
-    timestamp = Column(DateTime, default=datetime.utcnow, index=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    timestamp = Column(DateTime, default=datetime.utcnow, server_default=UTC_NOW, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow, server_default=UTC_NOW)
 
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    phone_id = Column(Integer, ForeignKey("phone_numbers.id"), nullable=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    phone_id = Column(Integer, ForeignKey("phone_numbers.id", ondelete="CASCADE"), nullable=True)
 
     # Relationships
     user = relationship("User", back_populates="sms_logs")
     phone = relationship("PhoneNumber", back_populates="sms_logs")
-    scan_requests = relationship("ScanRequest", back_populates="sms", cascade="all, delete-orphan")
-    reports = relationship("Report", back_populates="reported_sms", cascade="all, delete-orphan")
+    scan_requests = relationship("ScanRequest", back_populates="sms", cascade="all, delete-orphan", passive_deletes=True)
+    # Batch-loaded with one IN query for a whole list of messages; use noload() where unused
+    reports = relationship("Report", back_populates="reported_sms", cascade="all, delete-orphan", passive_deletes=True, lazy="selectin")
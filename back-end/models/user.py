@@ -1,7 +1,7 @@
 from sqlalchemy import Column, Integer, String, Boolean, DateTime
 from sqlalchemy.orm import relationship
 from datetime import datetime
-from .base import Base
+from .base import Base, UTC_NOW
 
 class User(Base):
     __tablename__ = "users"
@@ -12,15 +12,15 @@ class User(Base):
     device_id = Column(String(255), unique=True, nullable=False)
     is_elderly = Column(Boolean, default=False)
     is_active = Column(Boolean, default=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, server_default=UTC_NOW)
+    updated_at = Column(DateTime, default=datetime.utcnow, server_default=UTC_NOW, onupdate=UTC_NOW)
 
     # Relationships
-    phones = relationship("PhoneNumber", back_populates="owner", cascade="all, delete-orphan")
-    sms_logs = relationship("SMSLog", back_populates="user", cascade="all, delete-orphan")
-    screenshots = relationship("Screenshot", back_populates="user", cascade="all, delete-orphan")
-    alerts = relationship("Alert", back_populates="user", cascade="all, delete-orphan", foreign_keys="Alert.user_id")    
-    feedbacks = relationship("Feedback", back_populates="user", cascade="all, delete-orphan")
-    reports = relationship("Report", back_populates="user", cascade="all, delete-orphan")
-    family_members = relationship("FamilyMember", foreign_keys="FamilyMember.user_id", back_populates="user", cascade="all, delete-orphan")
-    scan_requests = relationship("ScanRequest", back_populates="user", cascade="all, delete-orphan")
+    phones = relationship("PhoneNumber", back_populates="owner", cascade="all, delete-orphan", passive_deletes=True)
+    sms_logs = relationship("SMSLog", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    screenshots = relationship("Screenshot", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    alerts = relationship("Alert", back_populates="user", cascade="all, delete-orphan", passive_deletes=True, foreign_keys="Alert.user_id")    
+    feedbacks = relationship("Feedback", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    reports = relationship("Report", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    family_members = relationship("FamilyMember", foreign_keys="FamilyMember.user_id", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    scan_requests = relationship("ScanRequest", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
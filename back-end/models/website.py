@@ -1,7 +1,7 @@
 from sqlalchemy import Column, Integer, String, Float, DateTime, Text, Boolean
 from sqlalchemy.orm import relationship
 from datetime import datetime
-from .base import Base
+from .base import Base, UTC_NOW
 
 class Website(Base):
     __tablename__ = "websites"
@@ -16,9 +16,10 @@ class Website(Base):
     flag_reason = Column(String(255), nullable=True)
     ssl_valid = Column(Boolean, nullable=True)
     last_checked = Column(DateTime, nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, server_default=UTC_NOW)
+    updated_at = Column(DateTime, default=datetime.utcnow, server_default=UTC_NOW, onupdate=UTC_NOW)
     
     # Relationships
-    scan_requests = relationship("ScanRequest", back_populates="website", cascade="all, delete-orphan")
-    reports = relationship("Report", back_populates="reported_website", cascade="all, delete-orphan")
\ No newline at end of file
+    scan_requests = relationship("ScanRequest", back_populates="website", cascade="all, delete-orphan", passive_deletes=True)
+    # Batch-loaded with one IN query for a whole list of websites; use noload() where unused
+    reports = relationship("Report", back_populates="reported_website", cascade="all, delete-orphan", passive_deletes=True, lazy="selectin")
\ No newline at end of file
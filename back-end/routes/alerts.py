@@ -1,11 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from ..database import get_db
-from ..services.alert_service import AlertService
-from ..schemas import Alert as AlertSchema, SeverityEnum, AlertTypeEnum
-from ..models.alert import Alert
-from pydantic import BaseModel
+from datetime import datetime
+from ..database import get_db, get_db_ro, ReadOnlySessionLocal
+from ..services.alert_service import AlertService, encode_alert_cursor, decode_alert_cursor
+from ..schemas import Alert as AlertSchema, AlertCreate, SeverityEnum, AlertTypeEnum
+from pydantic import BaseModel, ConfigDict
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
@@ -22,6 +23,9 @@ class CreateAlertRequest(BaseModel):
     family_member_id: Optional[int] = None
 
 class AlertResponse(BaseModel):
+    # Lets FastAPI validate ORM objects and row mappings straight into the response
+    model_config = ConfigDict(from_attributes=True)
+    
     id: int
     user_id: int
     alert_type: str
@@ -29,47 +33,92 @@ class AlertResponse(BaseModel):
     message: str
     is_read: bool
     is_acknowledged: bool
-    created_at: str
+    created_at: datetime
+
+class AlertDashboardResponse(BaseModel):
+    alerts: List[AlertResponse]
+    unread_count: int
+    critical_alerts: List[AlertResponse]
+
+def _query_in_own_session(query):
+    # Sessions aren't thread-safe, so every concurrent query gets its own
+    db = ReadOnlySessionLocal()
+    try:
+        return query(AlertService(db))
+    finally:
+        db.close()
 
 @router.get("/user/{user_id}", response_model=List[AlertResponse])
-async def get_user_alerts(
+def get_user_alerts(
     user_id: int,
+    response: Response,
     limit: int = Query(50, ge=1, le=200),
     offset: int = Query(0, ge=0),
     unread_only: bool = Query(False),
-    db: Session = Depends(get_db)
+    before: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
+    db: Session = Depends(get_db_ro)
 ):
     """
     Get alerts for a specific user
+    
+    Pages are best fetched with the `before` cursor, which stays fast on deep
+    pages; `offset` is kept for older clients.
     """
+    try:
+        cursor = decode_alert_cursor(before) if before else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
     try:
         alert_service = AlertService(db)
         alerts = alert_service.get_user_alerts(
             user_id=user_id,
             limit=limit,
             offset=offset,
-            unread_only=unread_only
+            unread_only=unread_only,
+            before=cursor
         )
         
-        return [AlertResponse(
-            id=alert.id,
-            user_id=alert.user_id,
-            alert_type=alert.alert_type,
-            severity=alert.severity,
-            message=alert.message,
-            is_read=alert.is_read,
-            is_acknowledged=alert.is_acknowledged,
-            created_at=alert.created_at.isoformat()
-        ) for alert in alerts]
+        if len(alerts) == limit:
+            response.headers["X-Next-Cursor"] = encode_alert_cursor(alerts[-1])
+        
+        # Row mappings are validated against AlertResponse by FastAPI
+        return alerts
         
     except Exception as e:
         logger.error(f"Error getting user alerts: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@router.get("/user/{user_id}/dashboard", response_model=AlertDashboardResponse)
+async def get_alert_dashboard(
+    user_id: int,
+    limit: int = Query(50, ge=1, le=200)
+):
+    """
+    Recent alerts, unread count and unacknowledged critical alerts in one call.
+    The three queries run concurrently on separate pooled connections.
+    """
+    try:
+        alerts, unread_count, critical_alerts = await asyncio.gather(
+            asyncio.to_thread(_query_in_own_session, lambda service: service.get_user_alerts(user_id, limit=limit)),
+            asyncio.to_thread(_query_in_own_session, lambda service: service.get_unread_alert_count(user_id)),
+            asyncio.to_thread(_query_in_own_session, lambda service: service.get_critical_alerts(user_id))
+        )
+        
+        return {
+            "alerts": alerts,
+            "unread_count": unread_count,
+            "critical_alerts": critical_alerts
+        }
+        
+    except Exception as e:
+        logger.error(f"Error getting alert dashboard: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
 @router.get("/user/{user_id}/unread-count")
-async def get_unread_alert_count(
+def get_unread_alert_count(
     user_id: int,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db_ro)
 ):
     """
     Get count of unread alerts for a user
@@ -84,8 +133,8 @@ async def get_unread_alert_count(
         logger.error(f"Error getting unread alert count: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
-@router.put("/{alert_id}/read")
-async def mark_alert_as_read(
+@router.put("/{alert_id}/read", response_model=AlertResponse)
+def mark_alert_as_read(
     alert_id: int,
     user_id: int = Query(...),
     db: Session = Depends(get_db)
@@ -97,16 +146,7 @@ async def mark_alert_as_read(
         alert_service = AlertService(db)
         alert = alert_service.mark_alert_as_read(alert_id, user_id)
         
-        return AlertResponse(
-            id=alert.id,
-            user_id=alert.user_id,
-            alert_type=alert.alert_type,
-            severity=alert.severity,
-            message=alert.message,
-            is_read=alert.is_read,
-            is_acknowledged=alert.is_acknowledged,
-            created_at=alert.created_at.isoformat()
-        )
+        return alert
         
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
@@ -114,8 +154,8 @@ async def mark_alert_as_read(
         logger.error(f"Error marking alert as read: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
-@router.put("/{alert_id}/acknowledge")
-async def acknowledge_alert(
+@router.put("/{alert_id}/acknowledge", response_model=AlertResponse)
+def acknowledge_alert(
     alert_id: int,
     user_id: int = Query(...),
     db: Session = Depends(get_db)
@@ -127,16 +167,7 @@ async def acknowledge_alert(
         alert_service = AlertService(db)
         alert = alert_service.acknowledge_alert(alert_id, user_id)
         
-        return AlertResponse(
-            id=alert.id,
-            user_id=alert.user_id,
-            alert_type=alert.alert_type,
-            severity=alert.severity,
-            message=alert.message,
-            is_read=alert.is_read,
-            is_acknowledged=alert.is_acknowledged,
-            created_at=alert.created_at.isoformat()
-        )
+        return alert
         
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
@@ -145,7 +176,7 @@ async def acknowledge_alert(
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.delete("/{alert_id}")
-async def delete_alert(
+def delete_alert(
     alert_id: int,
     user_id: int = Query(...),
     db: Session = Depends(get_db)
@@ -169,10 +200,10 @@ async def delete_alert(
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.get("/user/{user_id}/severity/{severity}", response_model=List[AlertResponse])
-async def get_alerts_by_severity(
+def get_alerts_by_severity(
     user_id: int,
     severity: SeverityEnum,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db_ro)
 ):
     """
     Get alerts by severity level
@@ -181,25 +212,16 @@ async def get_alerts_by_severity(
         alert_service = AlertService(db)
         alerts = alert_service.get_alerts_by_severity(user_id, severity)
         
-        return [AlertResponse(
-            id=alert.id,
-            user_id=alert.user_id,
-            alert_type=alert.alert_type,
-            severity=alert.severity,
-            message=alert.message,
-            is_read=alert.is_read,
-            is_acknowledged=alert.is_acknowledged,
-            created_at=alert.created_at.isoformat()
-        ) for alert in alerts]
+        return alerts
         
     except Exception as e:
         logger.error(f"Error getting alerts by severity: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.get("/user/{user_id}/critical", response_model=List[AlertResponse])
-async def get_critical_alerts(
+def get_critical_alerts(
     user_id: int,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db_ro)
 ):
     """
     Get critical alerts for a user
@@ -208,23 +230,14 @@ async def get_critical_alerts(
         alert_service = AlertService(db)
         alerts = alert_service.get_critical_alerts(user_id)
         
-        return [AlertResponse(
-            id=alert.id,
-            user_id=alert.user_id,
-            alert_type=alert.alert_type,
-            severity=alert.severity,
-            message=alert.message,
-            is_read=alert.is_read,
-            is_acknowledged=alert.is_acknowledged,
-            created_at=alert.created_at.isoformat()
-        ) for alert in alerts]
+        return alerts
         
     except Exception as e:
         logger.error(f"Error getting critical alerts: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.post("/create", response_model=AlertResponse)
-async def create_alert(
+def create_alert(
     request: CreateAlertRequest,
     db: Session = Depends(get_db)
 ):
@@ -232,47 +245,42 @@ async def create_alert(
     Create a new alert
     """
     try:
-        alert_service = AlertService(db)
-        
-        # Create alert based on type
-        if request.alert_type == AlertTypeEnum.SCAM_DETECTED:
-            # This would typically be called from phone check endpoint
-            raise HTTPException(status_code=400, detail="Use phone check endpoint for scam alerts")
-        else:
-            # For other alert types, create directly
-            alert = Alert(
-                user_id=request.user_id,
-                family_member_id=request.family_member_id,
-                alert_type=request.alert_type,
-                severity=request.severity,
-                message=request.message,
-                detection_result_id=request.detection_result_id
-            )
-            
-            db.add(alert)
-            db.commit()
-            db.refresh(alert)
-        
-        return AlertResponse(
-            id=alert.id,
-            user_id=alert.user_id,
-            alert_type=alert.alert_type,
-            severity=alert.severity,
-            message=alert.message,
-            is_read=alert.is_read,
-            is_acknowledged=alert.is_acknowledged,
-            created_at=alert.created_at.isoformat()
-        )
+        # Same path as the bulk endpoint, with a single alert
+        return _create_alerts(db, [request])[0]
         
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
         logger.error(f"Error creating alert: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@router.post("/create-bulk", response_model=List[AlertResponse])
+def create_alerts_bulk(
+    requests: List[CreateAlertRequest],
+    db: Session = Depends(get_db)
+):
+    """
+    Create many alerts in one INSERT round-trip
+    """
+    try:
+        return _create_alerts(db, requests)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error bulk creating alerts: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+def _create_alerts(db: Session, requests: List[CreateAlertRequest]):
+    if any(request.alert_type == AlertTypeEnum.SCAM_DETECTED for request in requests):
+        # These would typically be called from phone check endpoint
+        raise HTTPException(status_code=400, detail="Use phone check endpoint for scam alerts")
+    
+    alert_service = AlertService(db)
+    return alert_service.bulk_create([AlertCreate(**request.model_dump()) for request in requests])
+
 @router.put("/user/{user_id}/mark-all-read")
-async def mark_all_alerts_as_read(
+def mark_all_alerts_as_read(
     user_id: int,
     db: Session = Depends(get_db)
 ):
@@ -281,12 +289,9 @@ async def mark_all_alerts_as_read(
     """
     try:
         alert_service = AlertService(db)
-        alerts = alert_service.get_user_alerts(user_id, unread_only=True)
-        
-        for alert in alerts:
-            alert_service.mark_alert_as_read(alert.id, user_id)
+        updated = alert_service.bulk_mark_all_read(user_id)
         
-        return {"message": f"Marked {len(alerts)} alerts as read"}
+        return {"message": f"Marked {updated} alerts as read"}
         
     except Exception as e:
         logger.error(f"Error marking all alerts as read: {str(e)}")
@@ -1,11 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from ..database import get_db
-from ..services.phone_service import PhoneService
-from ..services.alert_service import AlertService
-from ..schemas import PhoneNumberCreate, PhoneNumber as PhoneNumberSchema
-from pydantic import BaseModel
+from ..services.phone_service import PhoneService, encode_flagged_cursor, decode_flagged_cursor
+from ..util.etag import updated_at_etag, etag_matches
+from ..schemas import PhoneNumberCreate, PhoneNumber as PhoneNumberSchema, PhoneStr
+from pydantic import BaseModel, Field
 from datetime import datetime
 import logging
 
@@ -15,7 +16,7 @@ router = APIRouter(prefix="/phone", tags=["phone"])
 
 # Request/Response models
 class PhoneCheckRequest(BaseModel):
-    phone_number: str
+    phone_number: PhoneStr
     user_id: Optional[int] = None
 
 class PhoneCheckResponse(BaseModel):
@@ -30,19 +31,19 @@ class PhoneCheckResponse(BaseModel):
     message: Optional[str] = None
 
 class FlagPhoneRequest(BaseModel):
-    phone_number: str
+    phone_number: PhoneStr
     flag_reason: str
     risk_score: int = 50
 
 class PhoneSearchRequest(BaseModel):
     query: str
-    limit: int = 50
+    limit: int = Field(50, ge=1, le=1000)
 
 
 # ROUTE 
 
 @router.post("/check", response_model=PhoneCheckResponse)
-async def check_phone_number(
+def check_phone_number(
     request: PhoneCheckRequest,
     db: Session = Depends(get_db)
 ):
@@ -59,11 +60,11 @@ async def check_phone_number(
         return PhoneCheckResponse(**result)
         
     except Exception as e:
-        logger.error(f"Error checking phone number: {str(e)}")
+        logger.error("Error checking phone number: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.post("/flag", response_model=PhoneNumberSchema)
-async def flag_phone_number(
+def flag_phone_number(
     request: FlagPhoneRequest,
     db: Session = Depends(get_db)
 ):
@@ -78,14 +79,14 @@ async def flag_phone_number(
             risk_score=request.risk_score
         )
         
-        return PhoneNumberSchema.from_orm(phone_record)
+        return phone_record
         
     except Exception as e:
-        logger.error(f"Error flagging phone number: {str(e)}")
+        logger.error("Error flagging phone number: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.post("/add", response_model=PhoneNumberSchema)
-async def add_phone_number(
+def add_phone_number(
     phone_data: PhoneNumberCreate,
     db: Session = Depends(get_db)
 ):
@@ -96,36 +97,53 @@ async def add_phone_number(
         phone_service = PhoneService(db)
         phone_record = phone_service.add_phone_number(phone_data)
         
-        return PhoneNumberSchema.from_orm(phone_record)
+        return phone_record
         
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        logger.error(f"Error adding phone number: {str(e)}")
+        logger.error("Error adding phone number: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.get("/flagged", response_model=List[PhoneNumberSchema])
-async def get_flagged_phones(
+def get_flagged_phones(
     limit: int = Query(100, ge=1, le=1000),
     offset: int = Query(0, ge=0),
+    before: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
     db: Session = Depends(get_db)
 ):
     """
-    Get all flagged phone numbers
+    Get all flagged phone numbers, riskiest first
+    
+    Pages are best fetched with the `before` cursor, which stays fast on deep
+    pages; `offset` is kept for older clients.
     """
+    try:
+        cursor = decode_flagged_cursor(before) if before else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
     try:
         phone_service = PhoneService(db)
-        phones = phone_service.get_flagged_phones(limit=limit, offset=offset)
+        phones = phone_service.get_flagged_phones_cached(limit=limit, offset=offset, before=cursor)
+        
+        headers = {}
+        if len(phones) == limit:
+            headers["X-Next-Cursor"] = encode_flagged_cursor(phones[-1])
         
-        return [PhoneNumberSchema.from_orm(phone) for phone in phones]
+        # Rows come straight from the DB in the schema's shape, so they're
+        # serialized as-is instead of being validated again per row
+        return ORJSONResponse(phones, headers=headers)
         
     except Exception as e:
-        logger.error(f"Error getting flagged phones: {str(e)}")
+        logger.error("Error getting flagged phones: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.get("/{phone_id}", response_model=PhoneNumberSchema)
-async def get_phone_by_id(
+def get_phone_by_id(
     phone_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db)
 ):
     """
@@ -133,21 +151,34 @@ async def get_phone_by_id(
     """
     try:
         phone_service = PhoneService(db)
+        
+        # Answer re-fetches from updated_at alone, before loading the row.
+        # Lookups stamp last_checked without touching updated_at, so a
+        # revalidated copy may show an older last_checked.
+        updated_at = phone_service.get_phone_updated_at(phone_id)
+        if updated_at is None:
+            raise HTTPException(status_code=404, detail="Phone number not found")
+        
+        etag = updated_at_etag(updated_at)
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        
         phone = phone_service.get_phone_by_id(phone_id)
         
         if not phone:
             raise HTTPException(status_code=404, detail="Phone number not found")
         
-        return PhoneNumberSchema.from_orm(phone)
+        response.headers["ETag"] = updated_at_etag(phone.updated_at)
+        return phone
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error getting phone by ID: {str(e)}")
+        logger.error("Error getting phone by ID: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.put("/{phone_id}/risk-score", response_model=PhoneNumberSchema)
-async def update_phone_risk_score(
+def update_phone_risk_score(
     phone_id: int,
     risk_score: int = Query(..., ge=0, le=100),
     db: Session = Depends(get_db)
@@ -159,16 +190,16 @@ async def update_phone_risk_score(
         phone_service = PhoneService(db)
         phone = phone_service.update_phone_risk_score(phone_id, risk_score)
         
-        return PhoneNumberSchema.from_orm(phone)
+        return phone
         
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
-        logger.error(f"Error updating phone risk score: {str(e)}")
+        logger.error("Error updating phone risk score: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.post("/search", response_model=List[PhoneNumberSchema])
-async def search_phones(
+def search_phones(
     request: PhoneSearchRequest,
     db: Session = Depends(get_db)
 ):
@@ -182,14 +213,14 @@ async def search_phones(
             limit=request.limit
         )
         
-        return [PhoneNumberSchema.from_orm(phone) for phone in phones]
+        return ORJSONResponse(phones)
         
     except Exception as e:
-        logger.error(f"Error searching phones: {str(e)}")
+        logger.error("Error searching phones: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.get("/user/{user_id}", response_model=List[PhoneNumberSchema])
-async def get_user_phones(
+def get_user_phones(
     user_id: int,
     db: Session = Depends(get_db)
 ):
@@ -200,14 +231,14 @@ async def get_user_phones(
         phone_service = PhoneService(db)
         phones = phone_service.get_user_phones(user_id)
         
-        return [PhoneNumberSchema.from_orm(phone) for phone in phones]
+        return ORJSONResponse(phones)
         
     except Exception as e:
-        logger.error(f"Error getting user phones: {str(e)}")
+        logger.error("Error getting user phones: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.post("/check-and-alert")
-async def check_phone_and_create_alert(
+def check_phone_and_create_alert(
     request: PhoneCheckRequest,
     db: Session = Depends(get_db)
 ):
@@ -216,30 +247,28 @@ async def check_phone_and_create_alert(
     """
     try:
         phone_service = PhoneService(db)
-        alert_service = AlertService(db)
         
-        # Check the phone number
-        result = phone_service.check_phone_number(
+        if not request.user_id:
+            return {
+                "phone_check": phone_service.check_phone_number(request.phone_number),
+                "alert_created": False
+            }
+        
+        # Create a dummy detection result ID (in real app, this would come from AI analysis)
+        detection_result_id = 1  # This should be replaced with actual detection result
+        
+        # Check the phone number and, if it's flagged, create the alert in one roundtrip
+        result, alert_id = phone_service.check_and_alert_atomic(
             phone_number=request.phone_number,
-            user_id=request.user_id
+            user_id=request.user_id,
+            detection_result_id=detection_result_id
         )
         
-        # If phone is flagged and user_id is provided, create alert
-        if result["found"] and result["is_flagged"] and request.user_id:
-            # Create a dummy detection result ID (in real app, this would come from AI analysis)
-            detection_result_id = 1  # This should be replaced with actual detection result
-            
-            alert = alert_service.create_scam_alert(
-                user_id=request.user_id,
-                phone_number=request.phone_number,
-                risk_score=result["risk_score"],
-                detection_result_id=detection_result_id
-            )
-            
+        if alert_id is not None:
             return {
                 "phone_check": result,
                 "alert_created": True,
-                "alert_id": alert.id
+                "alert_id": alert_id
             }
         
         return {
@@ -248,5 +277,5 @@ async def check_phone_and_create_alert(
         }
         
     except Exception as e:
-        logger.error(f"Error checking phone and creating alert: {str(e)}")
+        logger.error("Error checking phone and creating alert: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error") 
\ No newline at end of file
@@ -3,8 +3,8 @@ from sqlalchemy.orm import Session
 from typing import List, Optional
 from ..database import get_db
 from ..services.report_service import ReportService
-from ..schemas import Report as ReportSchema
-from pydantic import BaseModel
+from ..schemas import Report as ReportSchema, PhoneStr
+from pydantic import BaseModel, ConfigDict
 from datetime import datetime
 import logging
 
@@ -14,7 +14,7 @@ router = APIRouter(prefix="/reports", tags=["reports"])
 
 # Request models
 class PhoneReportRequest(BaseModel):
-    phone_number: str
+    phone_number: PhoneStr
     reason: str
     user_id: int
     priority: str = "medium"
@@ -27,7 +27,7 @@ class WebsiteReportRequest(BaseModel):
     url: Optional[str] = None
 
 class SMSReportRequest(BaseModel):
-    sender_phone: str
+    sender_phone: PhoneStr
     reason: str
     user_id: int
     priority: str = "medium"
@@ -53,13 +53,12 @@ class ReportResponse(BaseModel):
     reported_website_id: Optional[int] = None
     reported_sms_id: Optional[int] = None
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 # ROUTES
 
 @router.post("/phone", response_model=ReportResponse)
-async def report_phone(
+def report_phone(
     request: PhoneReportRequest,
     db: Session = Depends(get_db)
 ):
@@ -75,14 +74,30 @@ async def report_phone(
             priority=request.priority
         )
         
-        return ReportResponse.from_orm(report)
+        return report
         
     except Exception as e:
-        logger.error(f"Error creating phone report: {str(e)}")
+        logger.error("Error creating phone report: %s", e)
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@router.post("/phone/bulk", response_model=List[ReportResponse])
+def report_phones_bulk(
+    requests: List[PhoneReportRequest],
+    db: Session = Depends(get_db)
+):
+    """
+    Report many phone numbers in one transaction. Unknown phones are created.
+    """
+    try:
+        report_service = ReportService(db)
+        return report_service.report_phones_bulk([request.model_dump() for request in requests])
+        
+    except Exception as e:
+        logger.error("Error bulk creating phone reports: %s", e)
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 @router.post("/website", response_model=ReportResponse)
-async def report_website(
+def report_website(
     request: WebsiteReportRequest,
     db: Session = Depends(get_db)
 ):
@@ -99,14 +114,14 @@ async def report_website(
             url=request.url
         )
         
-        return ReportResponse.from_orm(report)
+        return report
         
     except Exception as e:
-        logger.error(f"Error creating website report: {str(e)}")
+        logger.error("Error creating website report: %s", e)
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 @router.post("/sms", response_model=ReportResponse)
-async def report_sms(
+def report_sms(
     request: SMSReportRequest,
     db: Session = Depends(get_db)
 ):
@@ -123,10 +138,10 @@ async def report_sms(
             message_body=request.message_body
         )
         
-        return ReportResponse.from_orm(report)
+        return report
         
     except Exception as e:
-        logger.error(f"Error creating SMS report: {str(e)}")
+        logger.error("Error creating SMS report: %s", e)
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 # @router.get("/user/{user_id}", response_model=List[ReportResponse])
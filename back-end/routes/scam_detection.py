@@ -1,18 +1,24 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import Dict, Any, Optional
-from ..database import get_db
+from ..database import get_db, SessionLocal
 from ..services.scam_detection_service import ScamDetectionService
+from ..services.phone_service import PhoneService
+from ..schemas import PhoneStr
 from pydantic import BaseModel
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/scam-detection", tags=["scam-detection"])
 
+# Phones checked at the same time by /bulk-check, each holding a DB connection
+_BULK_CHECK_CONCURRENCY = 16
+
 # Request/Response models
 class ScamDetectionRequest(BaseModel):
-    phone_number: str
+    phone_number: PhoneStr
     user_id: int
     context: Optional[str] = None  # Additional context about the call/message
 
@@ -32,7 +38,7 @@ class DetectionHistoryResponse(BaseModel):
     recent_scans: list
 
 @router.post("/detect", response_model=ScamDetectionResponse)
-async def detect_scam(
+def detect_scam(
     request: ScamDetectionRequest,
     db: Session = Depends(get_db)
 ):
@@ -57,11 +63,11 @@ async def detect_scam(
         return ScamDetectionResponse(**result)
         
     except Exception as e:
-        logger.error(f"Error in scam detection: {str(e)}")
+        logger.error("Error in scam detection: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.get("/history/{user_id}", response_model=DetectionHistoryResponse)
-async def get_detection_history(
+def get_detection_history(
     user_id: int,
     limit: int = Query(50, ge=1, le=200),
     db: Session = Depends(get_db)
@@ -76,11 +82,11 @@ async def get_detection_history(
         return DetectionHistoryResponse(**history)
         
     except Exception as e:
-        logger.error(f"Error getting detection history: {str(e)}")
+        logger.error("Error getting detection history: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.get("/stats/{user_id}")
-async def get_detection_stats(
+def get_detection_stats(
     user_id: int,
     db: Session = Depends(get_db)
 ):
@@ -108,37 +114,58 @@ async def get_detection_stats(
         }
         
     except Exception as e:
-        logger.error(f"Error getting detection stats: {str(e)}")
+        logger.error("Error getting detection stats: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
+def _check_numbers_in_own_session(phone_numbers: list[str]) -> Dict[str, Dict[str, Any]]:
+    db = SessionLocal()
+    try:
+        return PhoneService(db).check_phone_numbers_bulk(phone_numbers)
+    finally:
+        db.close()
+
+def _detect_in_own_session(phone_number: str, user_id: int, phone_check: Dict[str, Any]) -> Dict[str, Any]:
+    # Sessions aren't thread-safe, so every concurrent check gets its own
+    db = SessionLocal()
+    try:
+        return ScamDetectionService(db).detect_scam_from_phone(
+            phone_number=phone_number,
+            user_id=user_id,
+            phone_check=phone_check
+        )
+    finally:
+        db.close()
+
 @router.post("/bulk-check")
 async def bulk_check_phone_numbers(
     phone_numbers: list[str],
-    user_id: int = Query(...),
-    db: Session = Depends(get_db)
+    user_id: int = Query(...)
 ):
     """
-    Check multiple phone numbers at once
+    Check multiple phone numbers at once, up to 16 concurrently
     """
     try:
-        scam_detection_service = ScamDetectionService(db)
-        results = []
-        
-        for phone_number in phone_numbers:
-            try:
-                result = scam_detection_service.detect_scam_from_phone(
-                    phone_number=phone_number,
-                    user_id=user_id
-                )
-                results.append({
-                    "phone_number": phone_number,
-                    "result": result
-                })
-            except Exception as e:
-                results.append({
-                    "phone_number": phone_number,
-                    "error": str(e)
-                })
+        # One IN query looks up every number before the per-number analysis
+        phone_checks = await asyncio.to_thread(_check_numbers_in_own_session, phone_numbers)
+        semaphore = asyncio.Semaphore(_BULK_CHECK_CONCURRENCY)
+        
+        async def check_one(phone_number: str) -> Dict[str, Any]:
+            async with semaphore:
+                try:
+                    result = await asyncio.to_thread(
+                        _detect_in_own_session, phone_number, user_id, dict(phone_checks[phone_number])
+                    )
+                    return {
+                        "phone_number": phone_number,
+                        "result": result
+                    }
+                except Exception as e:
+                    return {
+                        "phone_number": phone_number,
+                        "error": str(e)
+                    }
+        
+        results = await asyncio.gather(*(check_one(phone_number) for phone_number in phone_numbers))
         
         return {
             "total_checked": len(phone_numbers),
@@ -148,11 +175,11 @@ async def bulk_check_phone_numbers(
         }
         
     except Exception as e:
-        logger.error(f"Error in bulk phone check: {str(e)}")
+        logger.error("Error in bulk phone check: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.get("/risk-assessment/{phone_number}")
-async def get_risk_assessment(
+def get_risk_assessment(
     phone_number: str,
     context: Optional[str] = Query(None),
     db: Session = Depends(get_db)
@@ -199,5 +226,5 @@ async def get_risk_assessment(
         }
         
     except Exception as e:
-        logger.error(f"Error in risk assessment: {str(e)}")
+        logger.error("Error in risk assessment: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error") 
\ No newline at end of file
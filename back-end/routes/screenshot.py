@@ -1,8 +1,11 @@
-from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, UploadFile, File, Form, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import Optional
-from ..database import get_db
+import asyncio
+from ..database import get_db, get_db_ro, SessionLocal
 from ..services.screenshot_service import ScreenshotService
+from ..ai_services.services import ai_services
+from ..schemas import Screenshot as ScreenshotSchema
 import logging
 
 logger = logging.getLogger(__name__)
@@ -21,8 +24,65 @@ async def analyze_screenshot(
     """
     try:
         service = ScreenshotService(db)
-        result = service.process_screenshot(file, user_id, description)
+        result = await service.process_screenshot_async(file, user_id, description)
         return result
     except Exception as e:
-        logger.error(f"Error analyzing screenshot: {str(e)}")
-        raise HTTPException(status_code=500, detail="Internal server error")
\ No newline at end of file
+        logger.error("Error analyzing screenshot: %s", e)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+def _mark_processed_in_own_session(screenshot_id: int, ocr_text: Optional[str]) -> None:
+    # The request's session is closed by the time the background job finishes
+    db = SessionLocal()
+    try:
+        ScreenshotService(db).mark_processed(screenshot_id, ocr_text)
+    finally:
+        db.close()
+
+async def _analyze_in_background(screenshot_id: int, image_path: str) -> None:
+    try:
+        analysis_result = await ai_services.process_screenshot_analysis_async(image_path)
+        await asyncio.to_thread(_mark_processed_in_own_session, screenshot_id, analysis_result["ocr_text"])
+    except Exception:
+        logger.exception("Error analyzing screenshot %s in background", screenshot_id)
+        # Finish the row without OCR text, so pollers don't wait on it forever
+        try:
+            await asyncio.to_thread(_mark_processed_in_own_session, screenshot_id, None)
+        except Exception:
+            logger.exception("Could not mark screenshot %s as failed", screenshot_id)
+
+@router.post("/upload", status_code=202)
+async def upload_screenshot(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    user_id: int = Form(...),
+    description: Optional[str] = Form(None),
+    db: Session = Depends(get_db)
+):
+    """
+    Upload a screenshot and return right away; OCR and the LLM analysis run
+    after the response is sent. Poll GET /screenshot/{screenshot_id} until
+    is_processed is true. A processed screenshot without ocr_text means the
+    analysis failed.
+    """
+    try:
+        service = ScreenshotService(db)
+        screenshot = await service.save_screenshot_async(file, user_id, description)
+    except Exception as e:
+        logger.error("Error uploading screenshot: %s", e)
+        raise HTTPException(status_code=500, detail="Internal server error")
+    
+    background_tasks.add_task(_analyze_in_background, screenshot.id, service.resolve_image_path(screenshot))
+    return {
+        "screenshot_id": screenshot.id,
+        "is_processed": False
+    }
+
+@router.get("/{screenshot_id}", response_model=ScreenshotSchema)
+def get_screenshot(screenshot_id: int, db: Session = Depends(get_db_ro)):
+    """
+    Processing status and OCR text of an uploaded screenshot
+    """
+    screenshot = ScreenshotService(db).get_screenshot(screenshot_id)
+    if not screenshot:
+        raise HTTPException(status_code=404, detail="Screenshot not found")
+    return screenshot
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException, Form
+from fastapi import APIRouter, HTTPException, Form, Request, Response
 from fastapi.responses import FileResponse
 import logging
 from ..ai_services.services import ai_services
@@ -7,8 +7,11 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/text-to-speech", tags=["text-to-speech"])
 
+# Audio for a given text never changes, clients may keep it for a day
+_AUDIO_CACHE_CONTROL = "public, max-age=86400"
+
 @router.post("/")
-async def text_to_speech(text: str = Form(...)):
+def text_to_speech(request: Request, text: str = Form(...)):
     """
     Convert text to speech and return the audio file
     
@@ -28,15 +31,25 @@ async def text_to_speech(text: str = Form(...)):
         if not result.get("success", False):
             raise HTTPException(status_code=500, detail=result.get("error", "TTS bị lỗi"))
         
+        headers = {
+            "ETag": f'"{result["etag"]}"',
+            "Cache-Control": _AUDIO_CACHE_CONTROL
+        }
+        
+        # The client already has this audio
+        if request.headers.get("if-none-match") == headers["ETag"]:
+            return Response(status_code=304, headers=headers)
+        
         # Return the audio file directly
         return FileResponse(
             path=result["file_path"],
             media_type="audio/wav",
-            filename=result["file_name"]
+            filename=result["file_name"],
+            headers=headers
         )
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error in text_to_speech: {str(e)}")
+        logger.error("Error in text_to_speech: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error") 
\ No newline at end of file
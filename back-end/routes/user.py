@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
 from typing import List
 from ..database import get_db
 from ..services.user_service import UserService
+from ..util.etag import updated_at_etag, etag_matches
 from ..schemas import UserCreate, User as UserSchema
 
 router = APIRouter(prefix="/users", tags=["users"])
@@ -12,23 +13,30 @@ def create_user(user: UserCreate, db: Session = Depends(get_db)):
     service = UserService(db)
     try:
         created = service.create_user(user)
-        return UserSchema.from_orm(created)
+        return created
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/{user_id}", response_model=UserSchema)
-def get_user(user_id: int, db: Session = Depends(get_db)):
+def get_user(user_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
     service = UserService(db)
+    updated_at = service.get_user_updated_at(user_id)
+    if updated_at is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    etag = updated_at_etag(updated_at)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
     user = service.get_user(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    return UserSchema.from_orm(user)
+    response.headers["ETag"] = updated_at_etag(user.updated_at)
+    return user
 
 @router.get("/", response_model=List[UserSchema])
 def get_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
     service = UserService(db)
     users = service.get_users(skip=skip, limit=limit)
-    return [UserSchema.from_orm(u) for u in users]
+    return users
 
 @router.put("/{user_id}", response_model=UserSchema)
 def update_user(user_id: int, user: UserCreate, db: Session = Depends(get_db)):
@@ -36,7 +44,7 @@ def update_user(user_id: int, user: UserCreate, db: Session = Depends(get_db)):
     updated = service.update_user(user_id, user)
     if not updated:
         raise HTTPException(status_code=404, detail="User not found")
-    return UserSchema.from_orm(updated)
+    return updated
 
 @router.delete("/{user_id}")
 def delete_user(user_id: int, db: Session = Depends(get_db)):
@@ -1,7 +1,17 @@
-from pydantic import BaseModel, EmailStr, HttpUrl
-from typing import Optional, List
+from pydantic import AfterValidator, BaseModel, ConfigDict, EmailStr, HttpUrl, StringConstraints
+from typing import Annotated, Optional, List
 from datetime import datetime
 from enum import Enum
+from .util.phone import normalize_phone
+
+# Phone numbers sent in requests: digits with an optional leading '+' and
+# common formatting. Checked by pydantic-core before any DB work and handed on
+# in the canonical form they are stored in.
+PhoneStr = Annotated[
+    str,
+    StringConstraints(strip_whitespace=True, pattern=r"^\+?[0-9 ().\-]{6,20}$"),
+    AfterValidator(normalize_phone),
+]
 
 # Enums
 class SourceTypeEnum(str, Enum):
@@ -31,12 +41,13 @@ class SeverityEnum(str, Enum):
 # Base schemas
 class UserBase(BaseModel):
     name: str
-    email: Optional[EmailStr] = None
+    email: Optional[str] = None
     device_id: str
     is_elderly: bool = False
 
 class UserCreate(UserBase):
-    pass
+    # Emails are validated on the way in; responses echo the stored value
+    email: Optional[EmailStr] = None
 
 class User(UserBase):
     id: int
@@ -44,8 +55,7 @@ class User(UserBase):
     created_at: datetime
     updated_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 # Phone Number schemas
 class PhoneNumberBase(BaseModel):
@@ -55,6 +65,7 @@ class PhoneNumberBase(BaseModel):
     origin: Optional[str] = None
 
 class PhoneNumberCreate(PhoneNumberBase):
+    number: PhoneStr
     owner_id: Optional[int] = None
 
 class PhoneNumber(PhoneNumberBase):
@@ -67,8 +78,7 @@ class PhoneNumber(PhoneNumberBase):
     updated_at: datetime
     owner_id: Optional[int] = None
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 # SMS schemas
 class SMSLogBase(BaseModel):
@@ -90,8 +100,7 @@ class SMSLog(SMSLogBase):
     user_id: int
     phone_id: Optional[int] = None
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 # Website schemas
 class WebsiteBase(BaseModel):
@@ -113,8 +122,7 @@ class Website(WebsiteBase):
     created_at: datetime
     updated_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 # Scan Request schemas
 class ScanRequestBase(BaseModel):
@@ -141,8 +149,7 @@ class ScanRequest(ScanRequestBase):
     website_id: Optional[int] = None
     sms_id: Optional[int] = None
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 # Scan Result schemas
 class ScamDetectionResultBase(BaseModel):
@@ -164,8 +171,7 @@ class ScamDetectionResult(ScamDetectionResultBase):
     created_at: datetime
     scan_request_id: Optional[int] = None
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 # Alert schemas
 class AlertBase(BaseModel):
@@ -189,19 +195,19 @@ class Alert(AlertBase):
     acknowledged_by: Optional[int] = None
     created_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 # Family Member schemas
 class FamilyMemberBase(BaseModel):
     name: str
     relationship: Optional[str] = None
     phone_number: Optional[str] = None
-    email: Optional[EmailStr] = None
+    email: Optional[str] = None
     notify_on_alert: bool = True
     is_primary_contact: bool = False
 
 class FamilyMemberCreate(FamilyMemberBase):
+    email: Optional[EmailStr] = None
     user_id: int
     linked_user_id: Optional[int] = None
 
@@ -212,8 +218,7 @@ class FamilyMember(FamilyMemberBase):
     created_at: datetime
     updated_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 # Report schemas
 class ReportBase(BaseModel):
@@ -239,8 +244,7 @@ class Report(ReportBase):
     reported_website_id: Optional[int] = None
     reported_sms_id: Optional[int] = None
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 # Screenshot schemas
 class ScreenshotBase(BaseModel):
@@ -260,8 +264,7 @@ class Screenshot(ScreenshotBase):
     created_at: datetime
     user_id: int
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 # Feedback schemas
 class FeedbackBase(BaseModel):
@@ -281,5 +284,4 @@ class Feedback(FeedbackBase):
     resolved_at: Optional[datetime] = None
     user_id: int
 
-    class Config:
-        from_attributes = True 
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
@@ -1,6 +1,8 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
-from typing import List, Optional, Dict, Any
+from sqlalchemy import and_, or_, delete, func, insert, lambda_stmt, select, tuple_, update
+from sqlalchemy.engine import RowMapping
+from typing import List, Optional, Dict, Any, Tuple
+from bisect import bisect_right
 from datetime import datetime
 from ..models.alert import Alert
 from ..models.user import User
@@ -11,14 +13,52 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Columns returned by the read-only alert list queries. Selecting them with Core
+# skips ORM instance construction and identity-map bookkeeping.
+ALERT_LIST_COLUMNS = (
+    Alert.id,
+    Alert.user_id,
+    Alert.alert_type,
+    Alert.severity,
+    Alert.message,
+    Alert.is_read,
+    Alert.is_acknowledged,
+    Alert.created_at
+)
+
+# Risk scores from each threshold up map to the next severity level
+_SEVERITY_THRESHOLDS = (40, 60, 80)
+_SEVERITY_LEVELS = (SeverityEnum.LOW, SeverityEnum.MEDIUM, SeverityEnum.HIGH, SeverityEnum.CRITICAL)
+
+def encode_alert_cursor(alert) -> str:
+    """
+    Opaque keyset cursor pointing just past the given alert row
+    """
+    return f"{alert['created_at'].isoformat()}_{alert['id']}"
+
+def decode_alert_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Parse a cursor from encode_alert_cursor, raises ValueError when malformed
+    """
+    created_at, _, alert_id = cursor.rpartition("_")
+    return datetime.fromisoformat(created_at), int(alert_id)
+
 class AlertService:
     def __init__(self, db: Session):
         self.db = db
+        # Family alert recipients per user, loaded once for the lifetime of the
+        # service (one request), however many alerts it raises
+        self._family_recipients = {}
     
     def create_scam_alert(self, user_id: int, phone_number: str, risk_score: int, 
-                         detection_result_id: int, message: str = None) -> Alert:
+                         detection_result_id: int, message: str = None,
+                         commit: bool = True) -> Alert:
         """
         Create an alert when a scam phone number is detected
+        
+        Args:
+            commit: When False the alerts are only flushed, for callers that
+                commit them together with their own writes
         """
         try:
             # Determine alert severity based on risk score
@@ -28,7 +68,9 @@ class AlertService:
             if not message:
                 message = f"Phát hiện cuộc gọi có khả năng lừa đảo {phone_number}"
             
-            alert_data = AlertCreate(
+            # Arguments are already typed, so the Alert is built directly
+            # rather than validated through AlertCreate first
+            alert = Alert(
                 user_id=user_id,
                 alert_type=AlertTypeEnum.SCAM_DETECTED,
                 severity=severity,
@@ -36,20 +78,16 @@ class AlertService:
                 detection_result_id=detection_result_id
             )
             
-            alert = Alert(
-                user_id=alert_data.user_id,
-                alert_type=alert_data.alert_type,
-                severity=alert_data.severity,
-                message=alert_data.message,
-                detection_result_id=alert_data.detection_result_id
-            )
-            
             self.db.add(alert)
-            self.db.commit()
-            self.db.refresh(alert)
+            # The INSERT returns the new id and created_at (eager defaults),
+            # so there's nothing to re-SELECT
+            if commit:
+                self.db.commit()
+            else:
+                self.db.flush()
             
             # Notify family members
-            self._notify_family_members(user_id, alert)
+            self._notify_family_members(user_id, alert, commit=commit)
             
             return alert
             
@@ -64,7 +102,7 @@ class AlertService:
         Create an alert for suspicious activity
         """
         try:
-            alert_data = AlertCreate(
+            alert = Alert(
                 user_id=user_id,
                 alert_type=AlertTypeEnum.SUSPICIOUS_ACTIVITY,
                 severity=SeverityEnum.MEDIUM,
@@ -72,17 +110,10 @@ class AlertService:
                 detection_result_id=detection_result_id
             )
             
-            alert = Alert(
-                user_id=alert_data.user_id,
-                alert_type=alert_data.alert_type,
-                severity=alert_data.severity,
-                message=alert_data.message,
-                detection_result_id=alert_data.detection_result_id
-            )
-            
             self.db.add(alert)
+            # The INSERT returns the new id and created_at (eager defaults),
+            # so there's nothing to re-SELECT
             self.db.commit()
-            self.db.refresh(alert)
             
             # Notify family members
             self._notify_family_members(user_id, alert)
@@ -94,18 +125,59 @@ class AlertService:
             logger.error(f"Error creating suspicious activity alert: {str(e)}")
             raise
     
+    def bulk_create(self, alerts: List[AlertCreate]) -> List[RowMapping]:
+        """
+        Insert many alerts with one executemany and a single commit
+        
+        Returns:
+            The created alerts as row mappings, in the same order as the input
+        """
+        if not alerts:
+            return []
+        
+        try:
+            # RETURNING with executemany is batched by insertmanyvalues
+            stmt = insert(Alert).returning(*ALERT_LIST_COLUMNS, sort_by_parameter_order=True)
+            rows = self.db.execute(stmt, [alert.model_dump() for alert in alerts]).mappings().all()
+            self.db.commit()
+            
+            return rows
+            
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Error bulk creating alerts: {str(e)}")
+            raise
+    
     def get_user_alerts(self, user_id: int, limit: int = 50, offset: int = 0, 
-                       unread_only: bool = False) -> List[Alert]:
+                       unread_only: bool = False,
+                       before: Optional[Tuple[datetime, int]] = None) -> List[RowMapping]:
         """
-        Get alerts for a specific user
+        Get alerts for a specific user as read-only row mappings, newest first
+        
+        Args:
+            before: (created_at, id) of the last alert of the previous page. When
+                given, the page starts right after it (keyset pagination) and
+                offset should be left at 0
         """
         try:
-            query = self.db.query(Alert).filter(Alert.user_id == user_id)
+            # lambda_stmt caches the built statement per code path; user_id,
+            # limit and offset are picked up from the closures as bound params
+            stmt = lambda_stmt(lambda: select(*ALERT_LIST_COLUMNS).where(Alert.user_id == user_id))
             
             if unread_only:
-                query = query.filter(Alert.is_read == False)
+                stmt += lambda s: s.where(Alert.is_read == False)
+            
+            if before is not None:
+                # Seeks through the (user_id, created_at, id) index instead of
+                # scanning and discarding offset rows
+                before_created_at, before_id = before
+                stmt += lambda s: s.where(
+                    tuple_(Alert.created_at, Alert.id) < tuple_(before_created_at, before_id)
+                )
+            
+            stmt += lambda s: s.order_by(Alert.created_at.desc(), Alert.id.desc()).offset(offset).limit(limit)
             
-            return query.order_by(Alert.created_at.desc()).offset(offset).limit(limit).all()
+            return self.db.execute(stmt).mappings().all()
             
         except Exception as e:
             logger.error(f"Error getting user alerts: {str(e)}")
@@ -116,16 +188,18 @@ class AlertService:
         Mark an alert as read
         """
         try:
-            alert = self.db.query(Alert).filter(
-                and_(Alert.id == alert_id, Alert.user_id == user_id)
-            ).first()
+            # One UPDATE ... RETURNING, the ownership check is part of the WHERE
+            alert = self.db.execute(
+                update(Alert)
+                .where(and_(Alert.id == alert_id, Alert.user_id == user_id))
+                .values(is_read=True)
+                .returning(Alert)
+            ).scalar_one_or_none()
             
             if not alert:
                 raise ValueError(f"Alert {alert_id} not found for user {user_id}")
             
-            alert.is_read = True
             self.db.commit()
-            self.db.refresh(alert)
             
             return alert
             
@@ -134,23 +208,49 @@ class AlertService:
             logger.error(f"Error marking alert as read: {str(e)}")
             raise
     
+    def bulk_mark_all_read(self, user_id: int) -> int:
+        """
+        Mark every unread alert of a user as read with a single UPDATE
+        
+        Returns:
+            Number of alerts updated
+        """
+        try:
+            result = self.db.execute(
+                update(Alert)
+                .where(and_(Alert.user_id == user_id, Alert.is_read == False))
+                .values(is_read=True)
+                .execution_options(synchronize_session=False)
+            )
+            self.db.commit()
+            
+            return result.rowcount
+            
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Error marking all alerts as read: {str(e)}")
+            raise
+    
     def acknowledge_alert(self, alert_id: int, user_id: int) -> Alert:
         """
         Acknowledge an alert
         """
         try:
-            alert = self.db.query(Alert).filter(
-                and_(Alert.id == alert_id, Alert.user_id == user_id)
-            ).first()
+            alert = self.db.execute(
+                update(Alert)
+                .where(and_(Alert.id == alert_id, Alert.user_id == user_id))
+                .values(
+                    is_acknowledged=True,
+                    acknowledged_at=datetime.utcnow(),
+                    acknowledged_by=user_id
+                )
+                .returning(Alert)
+            ).scalar_one_or_none()
             
             if not alert:
                 raise ValueError(f"Alert {alert_id} not found for user {user_id}")
             
-            alert.is_acknowledged = True
-            alert.acknowledged_at = datetime.utcnow()
-            alert.acknowledged_by = user_id
             self.db.commit()
-            self.db.refresh(alert)
             
             return alert
             
@@ -164,27 +264,42 @@ class AlertService:
         Get count of unread alerts for a user
         """
         try:
-            return self.db.query(Alert).filter(
+            stmt = lambda_stmt(lambda: select(func.count(Alert.id)).where(
                 and_(Alert.user_id == user_id, Alert.is_read == False)
-            ).count()
+            ))
+            
+            return self.db.execute(stmt).scalar_one()
             
         except Exception as e:
             logger.error(f"Error getting unread alert count: {str(e)}")
             raise
     
+    def count_user_alerts(self, user_id: int) -> int:
+        """
+        Get count of all alerts for a user
+        """
+        try:
+            stmt = lambda_stmt(lambda: select(func.count(Alert.id)).where(Alert.user_id == user_id))
+            
+            return self.db.execute(stmt).scalar_one()
+            
+        except Exception as e:
+            logger.error(f"Error counting user alerts: {str(e)}")
+            raise
+    
     def delete_alert(self, alert_id: int, user_id: int) -> bool:
         """
         Delete an alert
         """
         try:
-            alert = self.db.query(Alert).filter(
-                and_(Alert.id == alert_id, Alert.user_id == user_id)
-            ).first()
+            # Single DELETE, the ownership check is part of the WHERE
+            result = self.db.execute(
+                delete(Alert).where(and_(Alert.id == alert_id, Alert.user_id == user_id))
+            )
             
-            if not alert:
+            if not result.rowcount:
                 return False
             
-            self.db.delete(alert)
             self.db.commit()
             
             return True
@@ -194,80 +309,94 @@ class AlertService:
             logger.error(f"Error deleting alert: {str(e)}")
             raise
     
-    def get_alerts_by_severity(self, user_id: int, severity: SeverityEnum) -> List[Alert]:
+    def get_alerts_by_severity(self, user_id: int, severity: SeverityEnum) -> List[RowMapping]:
         """
-        Get alerts by severity level
+        Get alerts by severity level as read-only row mappings
         """
         try:
-            return self.db.query(Alert).filter(
+            stmt = select(*ALERT_LIST_COLUMNS).where(
                 and_(Alert.user_id == user_id, Alert.severity == severity)
-            ).order_by(Alert.created_at.desc()).all()
+            ).order_by(Alert.created_at.desc())
+            
+            return self.db.execute(stmt).mappings().all()
             
         except Exception as e:
             logger.error(f"Error getting alerts by severity: {str(e)}")
             raise
     
-    def get_critical_alerts(self, user_id: int) -> List[Alert]:
+    def get_critical_alerts(self, user_id: int) -> List[RowMapping]:
         """
-        Get critical alerts for a user
+        Get critical alerts for a user as read-only row mappings
         """
         try:
-            return self.db.query(Alert).filter(
+            stmt = select(*ALERT_LIST_COLUMNS).where(
                 and_(
                     Alert.user_id == user_id,
                     Alert.severity == SeverityEnum.CRITICAL,
                     Alert.is_acknowledged == False
                 )
-            ).order_by(Alert.created_at.desc()).all()
+            ).order_by(Alert.created_at.desc())
+            
+            return self.db.execute(stmt).mappings().all()
             
         except Exception as e:
             logger.error(f"Error getting critical alerts: {str(e)}")
             raise
     
-    def _notify_family_members(self, user_id: int, alert: Alert) -> None:
+    def _notify_family_members(self, user_id: int, alert: Alert, commit: bool = True) -> None:
         """
         Notify family members about an alert
         This is a placeholder for actual notification logic
         """
         try:
-            # Get family members who should be notified
-            family_members = self.db.query(FamilyMember).filter(
-                and_(
-                    FamilyMember.user_id == user_id,
-                    FamilyMember.notify_on_alert == True
-                )
-            ).all()
-            
-            for family_member in family_members:
-                # Create alert for family member
-                family_alert = Alert(
-                    user_id=family_member.user_id,
-                    family_member_id=family_member.linked_user_id,
-                    alert_type=alert.alert_type,
-                    severity=alert.severity,
-                    message=f"Cảnh báo cho người thân: {alert.message}",
-                    detection_result_id=alert.detection_result_id
-                )
-                
-                self.db.add(family_alert)
-            
-            self.db.commit()
+            family_members = self._get_family_recipients(user_id)
+            
+            if family_members:
+                # A savepoint, so a failure here only drops the family alerts
+                # and not the caller's uncommitted writes
+                with self.db.begin_nested():
+                    # One executemany INSERT for all family alerts instead of an
+                    # ORM object per member going through the unit of work
+                    self.db.execute(insert(Alert), [
+                        {
+                            "user_id": family_member.user_id,
+                            "family_member_id": family_member.id,
+                            "alert_type": alert.alert_type,
+                            "severity": alert.severity,
+                            "message": f"Cảnh báo cho người thân: {alert.message}",
+                            "detection_result_id": alert.detection_result_id
+                        } for family_member in family_members
+                    ])
+                if commit:
+                    self.db.commit()
             
             logger.info(f"Notified {len(family_members)} family members about alert {alert.id}")
             
         except Exception as e:
+            if commit:
+                self.db.rollback()
             logger.error(f"Error notifying family members: {str(e)}")
             # Don't raise here to avoid breaking the main alert creation
     
+    def _get_family_recipients(self, user_id: int) -> List[Any]:
+        """
+        Family members of a user who should be notified, just the columns needed
+        """
+        family_members = self._family_recipients.get(user_id)
+        if family_members is None:
+            family_members = self.db.execute(
+                select(FamilyMember.id, FamilyMember.user_id).where(
+                    and_(
+                        FamilyMember.user_id == user_id,
+                        FamilyMember.notify_on_alert == True
+                    )
+                )
+            ).all()
+            self._family_recipients[user_id] = family_members
+        return family_members
+    
     def _determine_severity(self, risk_score: int) -> SeverityEnum:
         """
         Determine alert severity based on risk score
         """
-        if risk_score >= 80:
-            return SeverityEnum.CRITICAL
-        elif risk_score >= 60:
-            return SeverityEnum.HIGH
-        elif risk_score >= 40:
-            return SeverityEnum.MEDIUM
-        else:
-            return SeverityEnum.LOW 
\ No newline at end of file
+        return _SEVERITY_LEVELS[bisect_right(_SEVERITY_THRESHOLDS, risk_score)]
\ No newline at end of file
@@ -1,4 +1,6 @@
 from sqlalchemy.orm import Session
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from ..models.user import User 
 from ..models.family import FamilyMember
 from fastapi import HTTPException
@@ -21,40 +23,43 @@ def link_family_member(
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid QR payload")
 
-    elderly_user = db.query(User).filter(User.id == elderly_user_id, User.is_elderly == True).first()
-    family_user = db.query(User).filter(User.id == family_user_id).first()
+    # Both users in one query, just the columns the checks need
+    users = dict(db.execute(
+        select(User.id, User.is_elderly).where(User.id.in_([elderly_user_id, family_user_id]))
+    ).all())
 
-    if not elderly_user or not family_user:
+    if not users.get(elderly_user_id) or family_user_id not in users:
         raise HTTPException(status_code=404, detail="User(s) not found")
 
-    # Check if already linked
-    existing_link = db.query(FamilyMember).filter(
-        FamilyMember.user_id == elderly_user_id,
-        FamilyMember.linked_user_id == family_user_id
-    ).first()
-    if existing_link:
-        raise HTTPException(status_code=409, message="Người dùng đã kết nốinối")
-
-    family_link = FamilyMember(
-        name=name,
-        relationship=relationship,
-        phone_number=phone_number,
-        email=email,
-        notify_on_alert=True,
-        is_primary_contact=True,  # Optional business logic
-        user_id=elderly_user_id,
-        linked_user_id=family_user_id
-    )
-    db.add(family_link)
+    # Insert the link unless it already exists, in one race-free statement
+    link_id = db.execute(
+        pg_insert(FamilyMember)
+        .values(
+            name=name,
+            relation_type=relationship,
+            phone_number=phone_number,
+            email=email,
+            notify_on_alert=True,
+            is_primary_contact=True,  # Optional business logic
+            user_id=elderly_user_id,
+            linked_user_id=family_user_id
+        )
+        .on_conflict_do_nothing(constraint="uq_family_link")
+        .returning(FamilyMember.id)
+    ).scalar()
+    if link_id is None:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Người dùng đã kết nối")
     db.commit()
-    db.refresh(family_link)
 
     return {"message": "Kết nối với thành viên gia đình thành công!"}
 
 def check_if_linked(elderly_user_id: int, family_user_id: int, db: Session):
-    link = db.query(FamilyMember).filter(
-        FamilyMember.user_id == elderly_user_id,
-        FamilyMember.linked_user_id == family_user_id
+    link = db.execute(
+        select(FamilyMember.id, FamilyMember.notify_on_alert).where(
+            FamilyMember.user_id == elderly_user_id,
+            FamilyMember.linked_user_id == family_user_id
+        )
     ).first()
 
     return {
@@ -64,14 +69,15 @@ def check_if_linked(elderly_user_id: int, family_user_id: int, db: Session):
     }
 
 def unlink_family(elderly_user_id: int, family_user_id: int, db: Session):
-    link = db.query(FamilyMember).filter(
+    # Delete directly; the alerts of the link go with it through ON DELETE CASCADE
+    result = db.execute(delete(FamilyMember).where(
         FamilyMember.user_id == elderly_user_id,
         FamilyMember.linked_user_id == family_user_id
-    ).first()
+    ))
 
-    if not link:
+    if not result.rowcount:
+        db.rollback()
         raise HTTPException(status_code=404, detail="No existing link found")
 
-    db.delete(link)
     db.commit()
     return {"message": "Family member unlinked successfully"}
@@ -1,16 +1,131 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
-from typing import List, Optional, Dict, Any
-from datetime import datetime
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy import and_, exists, or_, select, text, tuple_, update
+from typing import List, Optional, Dict, Any, Tuple
+from datetime import datetime, timedelta
 from ..models.phone_number import PhoneNumber
+from ..models.base import UTC_NOW
 from ..models.user import User
 from ..models.alert import Alert
 from ..models.family import FamilyMember
+from .alert_service import _SEVERITY_LEVELS, _SEVERITY_THRESHOLDS
 from ..schemas import PhoneNumberCreate, PhoneNumber as PhoneNumberSchema
+from ..util.ttl_cache import TTLCache
+from ..util.phone import normalize_phone
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Per-process caches for the hottest read endpoints. Writes in this service
+# invalidate them; anything else is picked up when the entry expires.
+_CHECK_CACHE = TTLCache(maxsize=10000, ttl=60)
+_FLAGGED_CACHE = TTLCache(maxsize=256, ttl=30)
+
+# last_checked is only rewritten once it's older than this, so a burst of
+# lookups for the same number doesn't turn into a burst of row updates
+_LAST_CHECKED_INTERVAL = timedelta(seconds=60)
+
+# Columns of the PhoneNumber response schema. List queries select just these
+# with Core and return plain rows, skipping ORM instances entirely.
+PHONE_LIST_COLUMNS = (
+    PhoneNumber.id,
+    PhoneNumber.number,
+    PhoneNumber.country_code,
+    PhoneNumber.info,
+    PhoneNumber.origin,
+    PhoneNumber.is_flagged,
+    PhoneNumber.flag_reason,
+    PhoneNumber.risk_score,
+    PhoneNumber.last_checked,
+    PhoneNumber.created_at,
+    PhoneNumber.updated_at,
+    PhoneNumber.owner_id
+)
+
+def _severity_case_sql(risk_score: str) -> str:
+    """
+    SQL CASE mapping a risk score to its severity, built from the same
+    thresholds as AlertService._determine_severity
+    """
+    whens = " ".join(
+        f"WHEN {risk_score} >= {threshold} THEN '{level.value}'"
+        for threshold, level in reversed(tuple(zip(_SEVERITY_THRESHOLDS, _SEVERITY_LEVELS[1:])))
+    )
+    return f"CASE {whens} ELSE '{_SEVERITY_LEVELS[0].value}' END"
+
+# Check a number and, when it's flagged, raise the scam alert for the user and
+# their family in one statement. last_checked is throttled like in
+# _check_phone_number, and updated_at is left alone: a check doesn't change
+# the number, so it mustn't change its ETag either.
+_CHECK_AND_ALERT_SQL = text(f"""
+WITH p AS (
+    UPDATE phone_numbers
+    SET last_checked = CASE WHEN last_checked IS NULL OR last_checked <= timezone('utc', now()) - :last_checked_interval
+                            THEN timezone('utc', now()) ELSE last_checked END
+    WHERE number = :number
+    RETURNING is_flagged, flag_reason, risk_score, info, origin, last_checked, created_at
+),
+a AS (
+    INSERT INTO alerts (user_id, alert_type, severity, message, detection_result_id, is_read, is_acknowledged, created_at)
+    SELECT :user_id, 'scam_detected',
+           CAST({_severity_case_sql('p.risk_score')} AS severity_enum),
+           :message, :detection_result_id, false, false, timezone('utc', now())
+    FROM p WHERE p.is_flagged
+    RETURNING id, alert_type, severity, message, detection_result_id
+),
+f AS (
+    INSERT INTO alerts (user_id, family_member_id, alert_type, severity, message, detection_result_id, is_read, is_acknowledged, created_at)
+    SELECT fm.user_id, fm.id, a.alert_type, a.severity, :family_prefix || a.message, a.detection_result_id, false, false, timezone('utc', now())
+    FROM a JOIN family_members fm ON fm.user_id = :user_id AND fm.notify_on_alert
+    RETURNING 1
+)
+SELECT p.*, (SELECT id FROM a) AS alert_id, (SELECT count(*) FROM f) AS notified
+FROM p
+""")
+
+# Columns check results are built from, selected as plain rows
+PHONE_CHECK_COLUMNS = (
+    PhoneNumber.id,
+    PhoneNumber.number,
+    PhoneNumber.is_flagged,
+    PhoneNumber.flag_reason,
+    PhoneNumber.risk_score,
+    PhoneNumber.info,
+    PhoneNumber.origin,
+    PhoneNumber.last_checked,
+    PhoneNumber.created_at
+)
+
+def _touch_last_checked_values(last_checked: datetime) -> Dict[str, Any]:
+    """
+    UPDATE values stamping last_checked only. updated_at is set to itself so
+    its onupdate doesn't fire. The weak /phone/{id} ETag is built from
+    updated_at and deliberately doesn't cover last_checked, which lookups
+    move all the time; otherwise a 304 would only last until the next lookup.
+    """
+    return {"last_checked": last_checked, "updated_at": PhoneNumber.updated_at}
+
+def encode_flagged_cursor(phone) -> str:
+    """
+    Opaque keyset cursor pointing just past the given flagged phone row
+    """
+    return f"{phone['risk_score']}_{phone['id']}"
+
+def decode_flagged_cursor(cursor: str) -> Tuple[int, int]:
+    """
+    Parse a cursor from encode_flagged_cursor, raises ValueError when malformed
+    """
+    risk_score, _, phone_id = cursor.partition("_")
+    return int(risk_score), int(phone_id)
+
+def invalidate_phone_cache(cleaned_number: Optional[str] = None) -> None:
+    """
+    Drop cached lookups after a phone number is created or changed
+    """
+    if cleaned_number is not None:
+        _CHECK_CACHE.delete(cleaned_number)
+    _FLAGGED_CACHE.clear()
+
 class PhoneService:
     def __init__(self, db: Session):
         self.db = db
@@ -20,42 +135,168 @@ class PhoneService:
         Check if a phone number is flagged in the database
         Returns detailed information about the phone number
         """
+        # Clean the phone number (remove spaces, dashes, etc.)
+        cleaned_number = self._clean_phone_number(phone_number)
+        
+        # Callers may modify the result, so hand out copies of cached dicts
+        cached = _CHECK_CACHE.get(cleaned_number)
+        if cached is not None:
+            return dict(cached)
+        
         try:
-            # Clean the phone number (remove spaces, dashes, etc.)
-            cleaned_number = self._clean_phone_number(phone_number)
+            result = self._check_phone_number(cleaned_number)
+        except Exception as e:
+            # Serve the last known answer rather than failing while the DB is down
+            stale = _CHECK_CACHE.get(cleaned_number, allow_stale=True)
+            if stale is None:
+                raise
+            logger.warning(f"Serving cached check for {cleaned_number} after DB error: {str(e)}")
+            return dict(stale)
+        
+        _CHECK_CACHE.set(cleaned_number, result)
+        return dict(result)
+    
+    def check_phone_numbers_bulk(self, phone_numbers: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        check_phone_number for many numbers, with a single IN query for the
+        ones not already cached
+        
+        Returns:
+            Dictionary mapping each given phone number to its check result
+        """
+        cleaned = {phone_number: self._clean_phone_number(phone_number) for phone_number in phone_numbers}
+        
+        results = {}
+        for cleaned_number in set(cleaned.values()):
+            cached = _CHECK_CACHE.get(cleaned_number)
+            if cached is not None:
+                results[cleaned_number] = cached
+        
+        missing = [cleaned_number for cleaned_number in set(cleaned.values()) if cleaned_number not in results]
+        if missing:
+            try:
+                phone_records = self.db.execute(
+                    select(*PHONE_CHECK_COLUMNS).where(PhoneNumber.number.in_(missing))
+                ).all()
+                by_number = {phone_record.number: phone_record for phone_record in phone_records}
+                
+                last_checked = datetime.utcnow()
+                stale_numbers = {
+                    phone_record.number for phone_record in phone_records
+                    if self._last_checked_is_stale(phone_record, last_checked)
+                }
+                if stale_numbers:
+                    # Update last_checked of every stale number in one statement.
+                    # updated_at is kept as is, see _touch_last_checked_values.
+                    self.db.execute(
+                        update(PhoneNumber)
+                        .where(PhoneNumber.number.in_(list(stale_numbers)))
+                        .values(**_touch_last_checked_values(last_checked))
+                        .execution_options(synchronize_session=False)
+                    )
+                    self.db.commit()
+                
+            except Exception as e:
+                self.db.rollback()
+                logger.error(f"Error bulk checking phone numbers: {str(e)}")
+                raise
+            
+            for cleaned_number in missing:
+                result = self._check_result(by_number.get(cleaned_number))
+                if cleaned_number in stale_numbers:
+                    result["last_checked"] = last_checked
+                _CHECK_CACHE.set(cleaned_number, result)
+                results[cleaned_number] = result
+        
+        return {phone_number: dict(results[cleaned_number]) for phone_number, cleaned_number in cleaned.items()}
+    
+    def check_and_alert_atomic(self, phone_number: str, user_id: int,
+                               detection_result_id: int) -> Tuple[Dict[str, Any], Optional[int]]:
+        """
+        check_phone_number plus AlertService.create_scam_alert for flagged
+        numbers, in a single statement and transaction
+        
+        Returns:
+            The check result and the id of the created alert, or None when
+            the number isn't flagged
+        """
+        cleaned_number = self._clean_phone_number(phone_number)
+        
+        try:
+            row = self.db.execute(_CHECK_AND_ALERT_SQL, {
+                "number": cleaned_number,
+                "last_checked_interval": _LAST_CHECKED_INTERVAL,
+                "user_id": user_id,
+                "message": f"Phát hiện cuộc gọi có khả năng lừa đảo {phone_number}",
+                "family_prefix": "Cảnh báo cho người thân: ",
+                "detection_result_id": detection_result_id
+            }).first()
+            self.db.commit()
             
-            # Search for the phone number in the database
-            phone_record = self.db.query(PhoneNumber).filter(
-                PhoneNumber.number == cleaned_number
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Error checking phone number {cleaned_number} and creating alert: {str(e)}")
+            raise
+        
+        result = self._check_result(row)
+        _CHECK_CACHE.set(cleaned_number, result)
+        
+        alert_id = row.alert_id if row else None
+        if alert_id is not None:
+            logger.info(f"Notified {row.notified} family members about alert {alert_id}")
+        
+        return dict(result), alert_id
+    
+    def _check_phone_number(self, cleaned_number: str) -> Dict[str, Any]:
+        try:
+            # Search for the phone number in the database, as a plain row
+            phone_record = self.db.execute(
+                select(*PHONE_CHECK_COLUMNS).where(PhoneNumber.number == cleaned_number)
             ).first()
+            result = self._check_result(phone_record)
             
-            if phone_record:
+            last_checked = datetime.utcnow()
+            if phone_record and self._last_checked_is_stale(phone_record, last_checked):
                 # Update last_checked timestamp
-                phone_record.last_checked = datetime.utcnow()
+                self.db.execute(
+                    update(PhoneNumber)
+                    .where(PhoneNumber.id == phone_record.id)
+                    .values(**_touch_last_checked_values(last_checked))
+                )
                 self.db.commit()
-                
-                return {
-                    "found": True,
-                    "is_flagged": phone_record.is_flagged,
-                    "flag_reason": phone_record.flag_reason,
-                    "risk_score": phone_record.risk_score,
-                    "info": phone_record.info,
-                    "origin": phone_record.origin,
-                    "last_checked": phone_record.last_checked,
-                    "created_at": phone_record.created_at
-                }
-            else:
-                return {
-                    "found": False,
-                    "is_flagged": False,
-                    "risk_score": 0,
-                    "message": "Số điện thoại không được tìm thấy trong cơ sở dữ liệu."
-                }
+                result["last_checked"] = last_checked
+            
+            return result
                 
         except Exception as e:
-            logger.error(f"Error checking phone number {phone_number}: {str(e)}")
+            logger.error(f"Error checking phone number {cleaned_number}: {str(e)}")
             raise
     
+    def _last_checked_is_stale(self, phone_record, now: datetime) -> bool:
+        return phone_record.last_checked is None or now - phone_record.last_checked >= _LAST_CHECKED_INTERVAL
+    
+    def _check_result(self, phone_record) -> Dict[str, Any]:
+        # phone_record is a PHONE_CHECK_COLUMNS row (or anything with the same
+        # attributes), None when the number isn't known
+        if phone_record:
+            return {
+                "found": True,
+                "is_flagged": phone_record.is_flagged,
+                "flag_reason": phone_record.flag_reason,
+                "risk_score": phone_record.risk_score,
+                "info": phone_record.info,
+                "origin": phone_record.origin,
+                "last_checked": phone_record.last_checked,
+                "created_at": phone_record.created_at
+            }
+        else:
+            return {
+                "found": False,
+                "is_flagged": False,
+                "risk_score": 0,
+                "message": "Số điện thoại không được tìm thấy trong cơ sở dữ liệu."
+            }
+    
     def add_phone_number(self, phone_data: PhoneNumberCreate) -> PhoneNumber:
         """
         Add a new phone number to the database
@@ -64,11 +305,11 @@ class PhoneService:
             cleaned_number = self._clean_phone_number(phone_data.number)
             
             # Check if phone number already exists
-            existing_phone = self.db.query(PhoneNumber).filter(
-                PhoneNumber.number == cleaned_number
-            ).first()
+            already_exists = self.db.scalar(
+                select(exists().where(PhoneNumber.number == cleaned_number))
+            )
             
-            if existing_phone:
+            if already_exists:
                 raise ValueError(f"Phone number {cleaned_number} already exists")
             
             phone_record = PhoneNumber(
@@ -81,7 +322,7 @@ class PhoneService:
             
             self.db.add(phone_record)
             self.db.commit()
-            self.db.refresh(phone_record)
+            invalidate_phone_cache(cleaned_number)
             
             return phone_record
             
@@ -90,35 +331,37 @@ class PhoneService:
             logger.error(f"Error adding phone number: {str(e)}")
             raise
     
-    def flag_phone_number(self, phone_number: str, flag_reason: str, risk_score: int = 50) -> PhoneNumber:
+    def flag_phone_number(self, phone_number: str, flag_reason: str, risk_score: int = 50,
+                          commit: bool = True) -> PhoneNumber:
         """
         Flag a phone number as suspicious or scam
+        
+        Args:
+            commit: When False the change is only flushed, for callers that
+                commit it together with their own writes (and then call
+                invalidate_phone_cache)
         """
         try:
             cleaned_number = self._clean_phone_number(phone_number)
             
-            phone_record = self.db.query(PhoneNumber).filter(
-                PhoneNumber.number == cleaned_number
-            ).first()
-            
-            if not phone_record:
-                # Create new record if doesn't exist
-                phone_record = PhoneNumber(
-                    number=cleaned_number,
-                    is_flagged=True,
-                    flag_reason=flag_reason,
-                    risk_score=risk_score
+            # Insert the flagged phone, or flag the existing one, in one statement
+            flagged = {"is_flagged": True, "flag_reason": flag_reason, "risk_score": risk_score}
+            phone_record = self.db.scalars(
+                pg_insert(PhoneNumber)
+                .values(number=cleaned_number, **flagged)
+                .on_conflict_do_update(
+                    index_elements=[PhoneNumber.number],
+                    set_={**flagged, "updated_at": UTC_NOW}
                 )
-                self.db.add(phone_record)
-            else:
-                # Update existing record
-                phone_record.is_flagged = True
-                phone_record.flag_reason = flag_reason
-                phone_record.risk_score = risk_score
-                phone_record.updated_at = datetime.utcnow()
+                .returning(PhoneNumber),
+                execution_options={"populate_existing": True}
+            ).one()
+            
+            if not commit:
+                return phone_record
             
             self.db.commit()
-            self.db.refresh(phone_record)
+            invalidate_phone_cache(cleaned_number)
             
             return phone_record
             
@@ -127,43 +370,97 @@ class PhoneService:
             logger.error(f"Error flagging phone number: {str(e)}")
             raise
     
-    def get_flagged_phones(self, limit: int = 100, offset: int = 0) -> List[PhoneNumber]:
+    def get_flagged_phones(self, limit: int = 100, offset: int = 0,
+                           before: Optional[Tuple[int, int]] = None) -> List[Dict[str, Any]]:
         """
-        Get all flagged phone numbers
+        Get all flagged phone numbers as plain dict rows, riskiest first
+        
+        Args:
+            before: (risk_score, id) of the last phone of the previous page. When
+                given, the page starts right after it (keyset pagination) and
+                offset should be left at 0
         """
         try:
-            return self.db.query(PhoneNumber).filter(
-                PhoneNumber.is_flagged == True
-            ).order_by(PhoneNumber.updated_at.desc()).offset(offset).limit(limit).all()
+            stmt = select(*PHONE_LIST_COLUMNS).where(PhoneNumber.is_flagged == True)
+            
+            if before is not None:
+                # Seeks through the partial flagged index instead of scanning
+                # and discarding offset rows
+                stmt = stmt.where(tuple_(PhoneNumber.risk_score, PhoneNumber.id) < tuple_(*before))
+            
+            stmt = stmt.order_by(
+                PhoneNumber.risk_score.desc(), PhoneNumber.id.desc()
+            ).offset(offset).limit(limit)
+            
+            return [dict(row) for row in self.db.execute(stmt).mappings()]
             
         except Exception as e:
             logger.error(f"Error getting flagged phones: {str(e)}")
             raise
     
+    def get_flagged_phones_cached(self, limit: int = 100, offset: int = 0,
+                                  before: Optional[Tuple[int, int]] = None) -> List[Dict[str, Any]]:
+        """
+        get_flagged_phones, cached briefly per page
+        """
+        key = (limit, offset, before)
+        cached = _FLAGGED_CACHE.get(key)
+        if cached is not None:
+            return cached
+        
+        try:
+            phones = self.get_flagged_phones(limit, offset, before)
+        except Exception:
+            stale = _FLAGGED_CACHE.get(key, allow_stale=True)
+            if stale is None:
+                raise
+            logger.warning("Serving cached flagged phones after DB error")
+            return stale
+        
+        _FLAGGED_CACHE.set(key, phones)
+        return phones
+    
     def get_phone_by_id(self, phone_id: int) -> Optional[PhoneNumber]:
         """
         Get phone number by ID
         """
         try:
-            return self.db.query(PhoneNumber).filter(PhoneNumber.id == phone_id).first()
+            # Primary key lookup, answered from the identity map when already loaded
+            return self.db.get(PhoneNumber, phone_id)
         except Exception as e:
             logger.error(f"Error getting phone by ID {phone_id}: {str(e)}")
             raise
     
-    def update_phone_risk_score(self, phone_id: int, risk_score: int) -> PhoneNumber:
+    def get_phone_updated_at(self, phone_id: int) -> Optional[datetime]:
+        """
+        updated_at of a phone number, or None if it doesn't exist
+        """
+        return self.db.execute(
+            select(PhoneNumber.updated_at).where(PhoneNumber.id == phone_id)
+        ).scalar_one_or_none()
+    
+    def update_phone_risk_score(self, phone_id: int, risk_score: int, commit: bool = True) -> PhoneNumber:
         """
         Update the risk score of a phone number
+        
+        Args:
+            commit: As for flag_phone_number
         """
         try:
-            phone_record = self.get_phone_by_id(phone_id)
+            # One UPDATE ... RETURNING, updated_at is bumped by its onupdate
+            phone_record = self.db.execute(
+                update(PhoneNumber)
+                .where(PhoneNumber.id == phone_id)
+                .values(risk_score=risk_score)
+                .returning(PhoneNumber)
+            ).scalar_one_or_none()
+            
             if not phone_record:
                 raise ValueError(f"Số điện thoại với {phone_id} khônh được tìm thấy")
             
-            phone_record.risk_score = risk_score
-            phone_record.updated_at = datetime.utcnow()
-            
-            self.db.commit()
-            self.db.refresh(phone_record)
+            if commit:
+                self.db.commit()
+                invalidate_phone_cache(phone_record.number)
             
             return phone_record
             
@@ -172,31 +469,35 @@ class PhoneService:
             logger.error(f"Error updating phone risk score: {str(e)}")
             raise
     
-    def search_phones(self, query: str, limit: int = 50) -> List[PhoneNumber]:
+    def search_phones(self, query: str, limit: int = 50) -> List[Dict[str, Any]]:
         """
-        Search phone numbers by number, info, or origin
+        Search phone numbers by number, info, or origin, as plain dict rows
         """
         try:
-            return self.db.query(PhoneNumber).filter(
+            stmt = select(*PHONE_LIST_COLUMNS).where(
+                # Case-insensitive ILIKE '%q%', served by the trigram indexes.
+                # The query is one bound parameter, so the statement caches once.
                 or_(
-                    PhoneNumber.number.contains(query),
-                    PhoneNumber.info.contains(query),
-                    PhoneNumber.origin.contains(query)
+                    PhoneNumber.number.icontains(query, autoescape=True),
+                    PhoneNumber.info.icontains(query, autoescape=True),
+                    PhoneNumber.origin.icontains(query, autoescape=True)
                 )
-            ).limit(limit).all()
+            ).limit(limit)
+            
+            return [dict(row) for row in self.db.execute(stmt).mappings()]
             
         except Exception as e:
             logger.error(f"Error searching phones: {str(e)}")
             raise
     
-    def get_user_phones(self, user_id: int) -> List[PhoneNumber]:
+    def get_user_phones(self, user_id: int) -> List[Dict[str, Any]]:
         """
-        Get all phone numbers associated with a user
+        Get all phone numbers associated with a user, as plain dict rows
         """
         try:
-            return self.db.query(PhoneNumber).filter(
-                PhoneNumber.owner_id == user_id
-            ).all()
+            stmt = select(*PHONE_LIST_COLUMNS).where(PhoneNumber.owner_id == user_id)
+            
+            return [dict(row) for row in self.db.execute(stmt).mappings()]
             
         except Exception as e:
             logger.error(f"Error getting user phones: {str(e)}")
@@ -206,7 +507,4 @@ class PhoneService:
         """
         Clean phone number by removing spaces, dashes, and other non-digit characters
         """
-        import re
-        # Remove all non-digit characters except +
-        cleaned = re.sub(r'[^\d+]', '', phone_number)
-        return cleaned 
\ No newline at end of file
+        return normalize_phone(phone_number)
\ No newline at end of file
@@ -1,17 +1,38 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session, noload
+from sqlalchemy import and_, or_, bindparam, insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.engine import RowMapping
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 from ..models.report import Report
 from ..models.phone_number import PhoneNumber
+from ..models.base import UTC_NOW
+from .phone_service import invalidate_phone_cache
+from ..util.phone import normalize_phone
 from ..models.website import Website
 from ..models.sms_msg import SMSLog
 from ..models.user import User
 from ..schemas import ReportCreate, Report as ReportSchema
+import re
 import logging
 
 logger = logging.getLogger(__name__)
 
+_URL_SCHEME_RE = re.compile(r'^https?://')
+_WWW_PREFIX_RE = re.compile(r'^www\.')
+
+# Statements for the hot lookups, built once at import and reused with new
+# parameters on every call
+# Only the id is needed, skip prefetching the website's reports
+_WEBSITE_BY_DOMAIN = select(Website).options(noload(Website.reports)).where(Website.domain == bindparam("domain"))
+_REPORT_BY_ID = select(Report).where(Report.id == bindparam("report_id"))
+_REPORTS_BY_USER = select(Report).where(
+    Report.user_id == bindparam("user_id")
+).order_by(Report.created_at.desc()).offset(bindparam("offset")).limit(bindparam("limit"))
+_REPORTS_BY_TYPE = select(Report).where(
+    Report.report_type == bindparam("report_type")
+).order_by(Report.created_at.desc()).offset(bindparam("offset")).limit(bindparam("limit"))
+
 class ReportService:
     def __init__(self, db: Session):
         self.db = db
@@ -24,23 +45,15 @@ class ReportService:
             # Clean the phone number
             cleaned_number = self._clean_phone_number(phone_number)
             
-            # Check if phone number exists
-            phone_record = self.db.query(PhoneNumber).filter(
-                PhoneNumber.number == cleaned_number
-            ).first()
-            
-            # If phone doesn't exist, create it
-            if not phone_record:
-                phone_record = PhoneNumber(
-                    number=cleaned_number,
-                    info=f"Được báo cáo bởi người dùng {user_id}",
-                    origin="user_report",
-                    is_flagged=false,
-                    flag_reason="",
-                    risk_score=50
-                )
-                self.db.add(phone_record)
-                self.db.flush()  # Get the ID without committing
+            # Get the phone's id, creating the phone if it doesn't exist
+            phone_id = self._upsert_phone(
+                number=cleaned_number,
+                info=f"Được báo cáo bởi người dùng {user_id}",
+                origin="user_report",
+                is_flagged=False,
+                flag_reason="",
+                risk_score=50
+            )
             
             # Create the report
             report = Report(
@@ -49,12 +62,14 @@ class ReportService:
                 status="pending",
                 priority=priority,
                 user_id=user_id,
-                reported_phone_id=phone_record.id
+                reported_phone_id=phone_id
             )
             
+            # One commit for the whole report; the INSERT returns the generated
+            # id and timestamps, so there's nothing to refresh
             self.db.add(report)
             self.db.commit()
-            self.db.refresh(report)
+            invalidate_phone_cache(cleaned_number)
             
             logger.info(f"Phone report created: {report.id} for phone {cleaned_number}")
             return report
@@ -64,6 +79,81 @@ class ReportService:
             logger.error(f"Error creating phone report: {str(e)}")
             raise
     
+    def report_phones_bulk(self, items: List[Dict[str, Any]]) -> List[RowMapping]:
+        """
+        report_phone for many numbers at once: one SELECT for the known numbers,
+        one executemany INSERT for the unknown ones and one for the reports,
+        all in a single transaction
+        
+        Args:
+            items: Dicts with phone_number, reason, user_id and optionally priority
+            
+        Returns:
+            The created reports as row mappings, in the same order as the input
+        """
+        if not items:
+            return []
+        
+        try:
+            cleaned_numbers = [self._clean_phone_number(item["phone_number"]) for item in items]
+            
+            phone_ids = dict(self.db.execute(
+                select(PhoneNumber.number, PhoneNumber.id).where(PhoneNumber.number.in_(set(cleaned_numbers)))
+            ).all())
+            
+            # Unknown numbers are created like report_phone does, once each even
+            # when reported several times. ON CONFLICT covers a concurrent insert.
+            new_phones = {}
+            for item, cleaned_number in zip(items, cleaned_numbers):
+                if cleaned_number not in phone_ids and cleaned_number not in new_phones:
+                    new_phones[cleaned_number] = {
+                        "number": cleaned_number,
+                        "info": f"Được báo cáo bởi người dùng {item['user_id']}",
+                        "origin": "user_report",
+                        "is_flagged": False,
+                        "flag_reason": "",
+                        "risk_score": 50
+                    }
+            if new_phones:
+                phone_ids.update(self.db.execute(
+                    pg_insert(PhoneNumber)
+                    .on_conflict_do_nothing(index_elements=[PhoneNumber.number])
+                    .returning(PhoneNumber.number, PhoneNumber.id),
+                    list(new_phones.values())
+                ).all())
+                raced = [cleaned_number for cleaned_number in new_phones if cleaned_number not in phone_ids]
+                if raced:
+                    phone_ids.update(self.db.execute(
+                        select(PhoneNumber.number, PhoneNumber.id).where(PhoneNumber.number.in_(raced))
+                    ).all())
+            
+            # RETURNING with executemany is batched by insertmanyvalues
+            reports = self.db.execute(
+                insert(Report).returning(*Report.__table__.c, sort_by_parameter_order=True),
+                [
+                    {
+                        "reason": item["reason"],
+                        "report_type": "phone",
+                        "status": "pending",
+                        "priority": item.get("priority", "medium"),
+                        "user_id": item["user_id"],
+                        "reported_phone_id": phone_ids[cleaned_number]
+                    } for item, cleaned_number in zip(items, cleaned_numbers)
+                ]
+            ).mappings().all()
+            self.db.commit()
+            
+            for cleaned_number in set(cleaned_numbers):
+                invalidate_phone_cache(cleaned_number)
+            
+            logger.info(f"Phone reports created in bulk: {len(reports)} for {len(phone_ids)} phones")
+            return reports
+            
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Error bulk creating phone reports: {str(e)}")
+            raise
+    
     def report_website(self, domain: str, reason: str, user_id: int, priority: str = "medium", url: Optional[str] = None) -> Report:
         """
         Report a website. If the website doesn't exist, create it first.
@@ -73,9 +163,7 @@ class ReportService:
             cleaned_domain = self._clean_domain(domain)
             
             # Check if website exists
-            website_record = self.db.query(Website).filter(
-                Website.domain == cleaned_domain
-            ).first()
+            website_record = self.db.execute(_WEBSITE_BY_DOMAIN, {"domain": cleaned_domain}).scalar_one_or_none()
             
             # If website doesn't exist, create it
             if not website_record:
@@ -88,22 +176,19 @@ class ReportService:
                     is_flagged=False,
                     flag_reason=""
                 )
-                self.db.add(website_record)
-                self.db.flush()  # Get the ID without committing
             
-            # Create the report
+            # Create the report, the website is inserted first if it's new
             report = Report(
                 reason=reason,
                 report_type="website",
                 status="pending",
                 priority=priority,
                 user_id=user_id,
-                reported_website_id=website_record.id
+                reported_website=website_record
             )
             
             self.db.add(report)
             self.db.commit()
-            self.db.refresh(report)
             
             logger.info(f"Website report created: {report.id} for domain {cleaned_domain}")
             return report
@@ -121,54 +206,45 @@ class ReportService:
             # Clean the phone number
             cleaned_number = self._clean_phone_number(sender_phone)
             
-            # Check if phone number exists
-            phone_record = self.db.query(PhoneNumber).filter(
-                PhoneNumber.number == cleaned_number
-            ).first()
-            
-            # If phone doesn't exist, create it
-            if not phone_record:
-                phone_record = PhoneNumber(
-                    number=cleaned_number,
-                    info=f"Được báo cáo hành vi bất thường bởi người dùngdùng {user_id}",
-                    origin="sms_report",
-                    is_flagged=False,
-                    flag_reason="Đã được báo cáo hành vi bất thường",
-                    risk_score=50
-                )
-                self.db.add(phone_record)
-                self.db.flush()  # Get the ID without committing
+            # Get the phone's id, creating the phone if it doesn't exist
+            phone_id = self._upsert_phone(
+                number=cleaned_number,
+                info=f"Được báo cáo hành vi bất thường bởi người dùngdùng {user_id}",
+                origin="sms_report",
+                is_flagged=False,
+                flag_reason="Đã được báo cáo hành vi bất thường",
+                risk_score=50
+            )
+            
+            # Create the report (linked to phone number, optionally to SMS)
+            report_values = {
+                "reason": reason,
+                "report_type": "sms",
+                "status": "pending",
+                "priority": priority,
+                "user_id": user_id,
+                "reported_phone_id": phone_id
+            }
             
-            # If message_body is provided, also create an SMS log entry
-            sms_record = None
             if message_body:
-                sms_record = SMSLog(
-                    message_body=message_body,
-                    sender=cleaned_number,
-                    is_flagged=False,
-                    flag_reason="",
-                    risk_score=50,
-                    message_type="incoming",
-                    user_id=user_id,
-                    phone_id=phone_record.id
+                # Store the SMS log entry first, the report references it. Both
+                # inserts commit together below.
+                report_values["reported_sms_id"] = self.db.scalar(
+                    insert(SMSLog).values(
+                        message_body=message_body,
+                        sender=cleaned_number,
+                        is_flagged=False,
+                        flag_reason="",
+                        risk_score=50,
+                        message_type="incoming",
+                        user_id=user_id,
+                        phone_id=phone_id
+                    ).returning(SMSLog.id)
                 )
-                self.db.add(sms_record)
-                self.db.flush()  # Get the ID without committing
-            
-            # Create the report (linked to phone number, optionally to SMS)
-            report = Report(
-                reason=reason,
-                report_type="sms",
-                status="pending",
-                priority=priority,
-                user_id=user_id,
-                reported_phone_id=phone_record.id,
-                reported_sms_id=sms_record.id if sms_record else None
-            )
             
-            self.db.add(report)
+            report = self.db.scalars(insert(Report).values(**report_values).returning(Report)).one()
             self.db.commit()
-            self.db.refresh(report)
+            invalidate_phone_cache(cleaned_number)
             
             logger.info(f"SMS report created: {report.id} for phone {cleaned_number}")
             return report
@@ -183,9 +259,9 @@ class ReportService:
         Get all reports by a specific user
         """
         try:
-            reports = self.db.query(Report).filter(
-                Report.user_id == user_id
-            ).order_by(Report.created_at.desc()).offset(offset).limit(limit).all()
+            reports = self.db.execute(
+                _REPORTS_BY_USER, {"user_id": user_id, "offset": offset, "limit": limit}
+            ).scalars().all()
             
             return reports
             
@@ -198,9 +274,9 @@ class ReportService:
         Get all reports of a specific type
         """
         try:
-            reports = self.db.query(Report).filter(
-                Report.report_type == report_type
-            ).order_by(Report.created_at.desc()).offset(offset).limit(limit).all()
+            reports = self.db.execute(
+                _REPORTS_BY_TYPE, {"report_type": report_type, "offset": offset, "limit": limit}
+            ).scalars().all()
             
             return reports
             
@@ -213,8 +289,7 @@ class ReportService:
         Get a specific report by ID
         """
         try:
-            report = self.db.query(Report).filter(Report.id == report_id).first()
-            return report
+            return self.db.execute(_REPORT_BY_ID, {"report_id": report_id}).scalar_one_or_none()
             
         except Exception as e:
             logger.error(f"Error getting report by ID: {str(e)}")
@@ -225,7 +300,7 @@ class ReportService:
         Update the status of a report
         """
         try:
-            report = self.db.query(Report).filter(Report.id == report_id).first()
+            report = self.db.execute(_REPORT_BY_ID, {"report_id": report_id}).scalar_one_or_none()
             if not report:
                 raise ValueError(f"Report with ID {report_id} not found")
             
@@ -239,7 +314,6 @@ class ReportService:
             report.updated_at = datetime.utcnow()
             
             self.db.commit()
-            self.db.refresh(report)
             
             return report
             
@@ -248,24 +322,33 @@ class ReportService:
             logger.error(f"Error updating report status: {str(e)}")
             raise
     
+    def _upsert_phone(self, **values) -> int:
+        """
+        Id of the phone with values["number"], inserted with values if it
+        doesn't exist yet. One race-free statement; an existing phone only gets
+        its updated_at bumped.
+        """
+        return self.db.execute(
+            pg_insert(PhoneNumber)
+            .values(**values)
+            .on_conflict_do_update(index_elements=[PhoneNumber.number], set_={"updated_at": UTC_NOW})
+            .returning(PhoneNumber.id)
+        ).scalar_one()
+    
     def _clean_phone_number(self, phone_number: str) -> str:
         """
         Clean phone number by removing spaces, dashes, and other non-digit characters
         """
-        import re
-        # Remove all non-digit characters except +
-        cleaned = re.sub(r'[^\d+]', '', phone_number)
-        return cleaned
+        return normalize_phone(phone_number)
     
     def _clean_domain(self, domain: str) -> str:
         """
         Clean domain by removing protocol and path
         """
-        import re
         # Remove protocol (http://, https://)
-        cleaned = re.sub(r'^https?://', '', domain.lower())
+        cleaned = _URL_SCHEME_RE.sub('', domain.lower())
         # Remove path and query parameters
-        cleaned = cleaned.split('/')[0]
+        cleaned = cleaned.split('/', 1)[0]
         # Remove www. prefix
-        cleaned = re.sub(r'^www\.', '', cleaned)
+        cleaned = _WWW_PREFIX_RE.sub('', cleaned)
         return cleaned
\ No newline at end of file
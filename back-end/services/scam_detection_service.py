@@ -1,15 +1,41 @@
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 from typing import Dict, Any, Optional
 from datetime import datetime
-from .phone_service import PhoneService
+from .phone_service import PhoneService, invalidate_phone_cache
 from .alert_service import AlertService
 from ..models.scan_result import ScamDetectionResult
 from ..models.scan import ScanRequest
+from ..models.alert import Alert
 from ..schemas import SourceTypeEnum, ResultLabelEnum
+import re
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Number fragments and context keywords the heuristic analysis treats as scam signals,
+# each set compiled into one alternation so a check is a single scan in C
+_SCAM_NUMBER_PATTERNS = ("024", "028", "1900")
+_SCAM_CONTEXT_KEYWORDS = ("urgent", "account", "suspended", "verify", "social security", "irs", "tax")
+_SCAM_NUMBER_RE = re.compile("|".join(map(re.escape, _SCAM_NUMBER_PATTERNS)))
+_SCAM_CONTEXT_RE = re.compile("|".join(map(re.escape, _SCAM_CONTEXT_KEYWORDS)), re.IGNORECASE)
+
+# Detection history: the scan columns it lists, and the number of results of
+# each scan, counted by a correlated subquery on scan_request_id's index
+_HISTORY_SCAN_COLUMNS = (
+    ScanRequest.id,
+    ScanRequest.source_from,
+    ScanRequest.source_type,
+    ScanRequest.status,
+    ScanRequest.timestamp,
+)
+_SCAN_RESULT_COUNT = (
+    select(func.count(ScamDetectionResult.id))
+    .where(ScamDetectionResult.scan_request_id == ScanRequest.id)
+    .correlate(ScanRequest)
+    .scalar_subquery()
+)
+
 class ScamDetectionService:
     def __init__(self, db: Session):
         self.db = db
@@ -17,14 +43,23 @@ class ScamDetectionService:
         self.alert_service = AlertService(db)
     
     def detect_scam_from_phone(self, phone_number: str, user_id: int, 
-                              context: str = None) -> Dict[str, Any]:
+                              context: str = None,
+                              phone_check: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Comprehensive scam detection for phone numbers
         This combines database lookup, AI analysis, and alert creation
+        
+        Args:
+            phone_check: Result of an earlier check_phone_numbers_bulk lookup,
+                skips the per-number database check
+        
+        Every write of the detection is flushed as it goes and committed once
+        at the end.
         """
         try:
             # Step 1: Check if phone number is already flagged in database
-            phone_check = self.phone_service.check_phone_number(phone_number, user_id)
+            if phone_check is None:
+                phone_check = self.phone_service.check_phone_number(phone_number, user_id)
             
             # Step 2: Create scan request for tracking
             scan_request = self._create_scan_request(
@@ -45,13 +80,16 @@ class ScamDetectionService:
             )
             
             # Step 5: Update phone record if needed
+            phone_changed = False
             if phone_check["found"] and phone_check["is_flagged"]:
                 # Phone is already flagged, update risk score if AI analysis suggests higher risk
                 if ai_analysis["risk_score"] > phone_check["risk_score"]:
                     self.phone_service.update_phone_risk_score(
                         phone_check["phone_id"], 
-                        ai_analysis["risk_score"]
+                        ai_analysis["risk_score"],
+                        commit=False
                     )
+                    phone_changed = True
                     phone_check["risk_score"] = ai_analysis["risk_score"]
             else:
                 # Phone not in database, add it if AI analysis flags it
@@ -59,8 +97,10 @@ class ScamDetectionService:
                     phone_record = self.phone_service.flag_phone_number(
                         phone_number=phone_number,
                         flag_reason=ai_analysis["reason"],
-                        risk_score=ai_analysis["risk_score"]
+                        risk_score=ai_analysis["risk_score"],
+                        commit=False
                     )
+                    phone_changed = True
                     phone_check = {
                         "found": True,
                         "is_flagged": True,
@@ -81,7 +121,8 @@ class ScamDetectionService:
                     phone_number=phone_number,
                     risk_score=max(phone_check["risk_score"], ai_analysis["risk_score"]),
                     detection_result_id=detection_result.id,
-                    message=f"Scam detected from {phone_number}. AI confidence: {ai_analysis['confidence_score']}%"
+                    message=f"Scam detected from {phone_number}. AI confidence: {ai_analysis['confidence_score']}%",
+                    commit=False
                 )
                 alert_created = True
                 alert_id = alert.id
@@ -90,6 +131,8 @@ class ScamDetectionService:
             scan_request.status = "completed"
             scan_request.completed_at = datetime.utcnow()
             self.db.commit()
+            if phone_changed:
+                invalidate_phone_cache(self.phone_service._clean_phone_number(phone_number))
             
             return {
                 "phone_check": phone_check,
@@ -102,6 +145,7 @@ class ScamDetectionService:
             }
             
         except Exception as e:
+            self.db.rollback()
             logger.error(f"Error in scam detection: {str(e)}")
             raise
     
@@ -114,13 +158,11 @@ class ScamDetectionService:
             user_id=user_id,
             source_type=source_type,
             source_from=source_from,
-            status="processing",
-            timestamp=datetime.utcnow()
+            status="processing"
         )
         
         self.db.add(scan_request)
-        self.db.commit()
-        self.db.refresh(scan_request)
+        self.db.flush()  # Get the ID without committing
         
         return scan_request
     
@@ -139,7 +181,7 @@ class ScamDetectionService:
         # Check for common scam patterns
         if phone_number.startswith("+1") and len(phone_number) == 12:
             # VN Number
-            if any(pattern in phone_number for pattern in ["024", "028", "1900"]):
+            if _SCAM_NUMBER_RE.search(phone_number):
                 risk_factors.append("Các đầu số điện thoại lừa đảo")
                 risk_score += 20
         
@@ -150,11 +192,9 @@ class ScamDetectionService:
             risk_score += 25
         
         # Phân tích dựa trên ngữ cảnh nội dung
-        if context:
-            scam_keywords = ["urgent", "account", "suspended", "verify", "social security", "irs", "tax"]
-            if any(keyword in context.lower() for keyword in scam_keywords):
-                risk_factors.append("Suspicious context")
-                risk_score += 40
+        if context and _SCAM_CONTEXT_RE.search(context):
+            risk_factors.append("Suspicious context")
+            risk_score += 40
         
         # Determine result label
         if risk_score >= 70:
@@ -195,8 +235,7 @@ class ScamDetectionService:
         )
         
         self.db.add(detection_result)
-        self.db.commit()
-        self.db.refresh(detection_result)
+        self.db.flush()  # Get the ID without committing
         
         return detection_result
     
@@ -218,31 +257,39 @@ class ScamDetectionService:
         Get user's scam detection history
         """
         try:
-            # Get recent scan requests
-            scan_requests = self.db.query(ScanRequest).filter(
-                ScanRequest.user_id == user_id
-            ).order_by(ScanRequest.timestamp.desc()).limit(limit).all()
-            
-            # Get detection results
-            detection_results = self.db.query(ScamDetectionResult).filter(
-                ScamDetectionResult.scan_request_id.in_([sr.id for sr in scan_requests])
+            # One round trip: the recent scans in index order from
+            # ix_scan_req_user_ts, each with its result count, and the user's
+            # alert count alongside. Results and alerts are only counted, so
+            # neither is loaded.
+            scans = self.db.execute(
+                select(
+                    *_HISTORY_SCAN_COLUMNS,
+                    _SCAN_RESULT_COUNT.label("result_count"),
+                    select(func.count(Alert.id))
+                    .where(Alert.user_id == user_id)
+                    .scalar_subquery()
+                    .label("alert_count")
+                )
+                .where(ScanRequest.user_id == user_id)
+                .order_by(ScanRequest.timestamp.desc())
+                .limit(limit)
             ).all()
             
-            # Get alerts
-            alerts = self.alert_service.get_user_alerts(user_id, limit=limit)
+            # Without any scans there's no row to carry the alert count
+            alert_count = scans[0].alert_count if scans else self.alert_service.count_user_alerts(user_id)
             
             return {
-                "scan_requests": len(scan_requests),
-                "detection_results": len(detection_results),
-                "alerts": len(alerts),
+                "scan_requests": len(scans),
+                "detection_results": sum(scan.result_count for scan in scans),
+                "alerts": alert_count,
                 "recent_scans": [
                     {
-                        "id": sr.id,
-                        "source_from": sr.source_from,
-                        "source_type": sr.source_type,
-                        "status": sr.status,
-                        "timestamp": sr.timestamp.isoformat()
-                    } for sr in scan_requests
+                        "id": scan.id,
+                        "source_from": scan.source_from,
+                        "source_type": scan.source_type,
+                        "status": scan.status,
+                        "timestamp": scan.timestamp
+                    } for scan in scans
                 ]
             }
             
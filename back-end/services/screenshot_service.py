@@ -1,7 +1,10 @@
 import os
+import asyncio
+import hashlib
+import tempfile
+from sqlalchemy import update
 from sqlalchemy.orm import Session
 from typing import Optional, Dict, Any
-from datetime import datetime
 from ..models.screenshot import Screenshot
 from ..schemas import ScreenshotCreate
 from ..ai_services.services import ai_services
@@ -11,47 +14,110 @@ from werkzeug.utils import secure_filename
 
 logger = logging.getLogger(__name__)
 
+# Uploads are copied to disk 1 MiB at a time
+_UPLOAD_CHUNK_SIZE = 1 << 20
+
+# Directories already created by this process. Services are built per
+# request, so the set lives at module level; only 1 + 256 shard dirs exist.
+_ENSURED_DIRS = set()
+
+def _ensure_dir(path: str) -> None:
+    if path not in _ENSURED_DIRS:
+        os.makedirs(path, exist_ok=True)
+        _ENSURED_DIRS.add(path)
+
 class ScreenshotService:
     def __init__(self, db: Session, upload_dir: str = "./data/screenshot_uploads"):
         self.db = db
         self.upload_dir = os.path.abspath(upload_dir)
 
     def save_screenshot(self, file, user_id: int, description: Optional[str] = None) -> Screenshot:
-        # Create user-specific upload directory
-        user_dir = os.path.join(self.upload_dir, str(user_id))
-        os.makedirs(user_dir, exist_ok=True)
-
-        # Secure and build filename
-        base_filename = secure_filename(file.filename)
-        file_root, file_ext = os.path.splitext(base_filename)
-        file_path = os.path.join(user_dir, base_filename)
-        timestamp = datetime.utcnow().strftime("%Y%m%d%H%M%S%f")
-        new_filename = f"{file_root}_{timestamp}{file_ext}"
-        file_path = os.path.join(user_dir, new_filename)
-
-        # Save file to disk
-        with open(file_path, "wb") as buffer:
-            buffer.write(file.file.read())
-
-        # Create DB record
+        file_ext = self._upload_ext(file)
+        digest = hashlib.blake2b(digest_size=16)
+
+        # Save file to disk in chunks, never holding the whole upload in memory,
+        # and hash it on the way for its content-addressed key
+        buffer = self._open_upload_buffer()
+        image_size = 0
+        try:
+            while chunk := file.file.read(_UPLOAD_CHUNK_SIZE):
+                digest.update(chunk)
+                image_size += buffer.write(chunk)
+        finally:
+            buffer.close()
+
+        image_path = self._store_upload(buffer.name, digest.hexdigest(), file_ext)
+        return self._create_screenshot(image_path, image_size, file_ext, user_id, description)
+
+    async def save_screenshot_async(self, file, user_id: int, description: Optional[str] = None) -> Screenshot:
+        """
+        Non-blocking version of save_screenshot for async routes. The upload
+        is read chunk by chunk and disk writes run in a worker thread, so the
+        event loop keeps serving other requests.
+        """
+        file_ext = self._upload_ext(file)
+        digest = hashlib.blake2b(digest_size=16)
+
+        buffer = await asyncio.to_thread(self._open_upload_buffer)
+        image_size = 0
+        try:
+            while chunk := await file.read(_UPLOAD_CHUNK_SIZE):
+                digest.update(chunk)
+                image_size += await asyncio.to_thread(buffer.write, chunk)
+        finally:
+            await asyncio.to_thread(buffer.close)
+
+        image_path = await asyncio.to_thread(self._store_upload, buffer.name, digest.hexdigest(), file_ext)
+        return self._create_screenshot(image_path, image_size, file_ext, user_id, description)
+
+    def resolve_image_path(self, screenshot: Screenshot) -> str:
+        """
+        Absolute path of a screenshot's image. Older rows store an absolute
+        path, which os.path.join returns unchanged.
+        """
+        return os.path.join(self.upload_dir, screenshot.image_path)
+
+    def _upload_ext(self, file) -> str:
+        return os.path.splitext(secure_filename(file.filename))[1].lower()
+
+    def _open_upload_buffer(self):
+        _ensure_dir(self.upload_dir)
+        return tempfile.NamedTemporaryFile(dir=self.upload_dir, suffix=".part", delete=False)
+
+    def _store_upload(self, temp_path: str, key: str, file_ext: str) -> str:
+        """
+        Move a finished upload to its content-addressed place and return the
+        short path relative to upload_dir that gets stored in the DB
+        """
+        image_path = os.path.join(key[:2], key + file_ext)
+        file_path = os.path.join(self.upload_dir, image_path)
+        _ensure_dir(os.path.dirname(file_path))
+
+        if os.path.exists(file_path):
+            # Same image uploaded before, keep a single copy
+            os.remove(temp_path)
+        else:
+            os.replace(temp_path, file_path)
+        return image_path
+
+    def _create_screenshot(self, image_path: str, image_size: int, file_ext: str, user_id: int,
+                           description: Optional[str]) -> Screenshot:
+        # Create DB record; the size was counted while copying, no need to stat the file
         screenshot = Screenshot(
-            image_path=file_path,
-            image_size=os.path.getsize(file_path),
+            image_path=image_path,
+            image_size=image_size,
             image_format=file_ext.lstrip('.'),
             description=description,
             is_processed=False,
-            user_id=user_id,
-            created_at=datetime.utcnow(),
-            timestamp=datetime.utcnow()
+            user_id=user_id
         )
         self.db.add(screenshot)
         self.db.commit()
-        self.db.refresh(screenshot)
         return screenshot
 
 
     def run_ocr(self, screenshot: Screenshot, lang: str = 'vie') -> str:
-        text = ai_services.extract_text_from_image(screenshot.image_path, lang=lang)
+        text = ai_services.extract_text_from_image(self.resolve_image_path(screenshot), lang=lang)
         screenshot.ocr_text = text
         screenshot.is_processed = True
         return text
@@ -111,8 +177,38 @@ class ScreenshotService:
         screenshot = self.save_screenshot(file, user_id, description)
         
         # Use the complete AI services pipeline with image analysis
-        analysis_result = ai_services.process_screenshot_analysis(screenshot.image_path)
+        analysis_result = ai_services.process_screenshot_analysis(self.resolve_image_path(screenshot))
+        
+        return self._store_analysis(screenshot, analysis_result)
+
+    async def process_screenshot_async(self, file, user_id: int, description: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Non-blocking version of process_screenshot, OCR and the LLM image
+        preparation run in parallel
+        """
+        screenshot = await self.save_screenshot_async(file, user_id, description)
         
+        analysis_result = await ai_services.process_screenshot_analysis_async(self.resolve_image_path(screenshot))
+        
+        return self._store_analysis(screenshot, analysis_result)
+
+    def get_screenshot(self, screenshot_id: int) -> Optional[Screenshot]:
+        return self.db.get(Screenshot, screenshot_id)
+
+    def mark_processed(self, screenshot_id: int, ocr_text: Optional[str]) -> bool:
+        """
+        Store the OCR text of a screenshot analyzed in the background, None when
+        the analysis failed. A single UPDATE, the row doesn't need loading first.
+        """
+        result = self.db.execute(
+            update(Screenshot)
+            .where(Screenshot.id == screenshot_id)
+            .values(ocr_text=ocr_text, is_processed=True)
+        )
+        self.db.commit()
+        return result.rowcount > 0
+
+    def _store_analysis(self, screenshot: Screenshot, analysis_result: Dict[str, Any]) -> Dict[str, Any]:
         # Update screenshot with OCR text
         screenshot.ocr_text = analysis_result["ocr_text"]
         screenshot.is_processed = True
@@ -1,4 +1,5 @@
 from sqlalchemy.orm import Session
+from sqlalchemy import bindparam, select
 from typing import List, Optional
 from ..models.user import User
 from ..schemas import UserCreate, User as UserSchema
@@ -7,6 +8,9 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Built once at import, reused with a new user_id on every lookup
+_USER_BY_ID = select(User).where(User.id == bindparam("user_id"))
+
 class UserService:
     def __init__(self, db: Session):
         self.db = db
@@ -18,13 +22,12 @@ class UserService:
                 email=user_data.email,
                 device_id=user_data.device_id,
                 is_elderly=user_data.is_elderly,
-                is_active=True,
-                created_at=datetime.utcnow(),
-                updated_at=datetime.utcnow()
+                is_active=True
             )
             self.db.add(user)
+            # The INSERT returns id and the server-side timestamps, and
+            # committed objects stay loaded, so no refresh SELECT is needed
             self.db.commit()
-            self.db.refresh(user)
             return user
         except Exception as e:
             self.db.rollback()
@@ -32,10 +35,15 @@ class UserService:
             raise
 
     def get_user(self, user_id: int) -> Optional[User]:
-        return self.db.query(User).filter(User.id == user_id).first()
+        return self.db.execute(_USER_BY_ID, {"user_id": user_id}).scalar_one_or_none()
+
+    def get_user_updated_at(self, user_id: int) -> Optional[datetime]:
+        return self.db.execute(
+            select(User.updated_at).where(User.id == user_id)
+        ).scalar_one_or_none()
 
     def get_users(self, skip: int = 0, limit: int = 100) -> List[User]:
-        return self.db.query(User).offset(skip).limit(limit).all()
+        return self.db.scalars(select(User).offset(skip).limit(limit)).all()
 
     def update_user(self, user_id: int, user_data: UserCreate) -> Optional[User]:
         user = self.get_user(user_id)
@@ -48,7 +56,6 @@ class UserService:
             user.is_elderly = user_data.is_elderly
             user.updated_at = datetime.utcnow()
             self.db.commit()
-            self.db.refresh(user)
             return user
         except Exception as e:
             self.db.rollback()
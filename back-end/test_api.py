@@ -4,147 +4,210 @@ Test script for Trustie Backend API
 This script demonstrates the phone number checking and alert functionality
 """
 
-import requests
-import json
-from typing import Dict, Any
+import asyncio
+import httpx
+import os
+import orjson
+from typing import Dict, Any, List, Tuple
 
 # API base URL
 BASE_URL = "http://localhost:8000"
 
-def test_phone_check():
-    """Test phone number checking functionality"""
-    print("=== Testing Phone Number Check ===")
-    
-    # Test data
-    test_phones = [
-        "+18005551234",  # US toll-free (suspicious)
-        "+12345678901",  # Regular US number
-        "+447911123456",  # UK number (international)
-        "555-1234",      # Local number
-    ]
-    
-    for phone in test_phones:
-        print(f"\nChecking phone: {phone}")
-        
-        # Test basic phone check
-        response = requests.post(f"{BASE_URL}/phone/check", json={
-            "phone_number": phone,
-            "user_id": 1
-        })
-        
+# When the server listens on a UNIX socket (TRUSTIE_UDS=/tmp/trustie.sock),
+# requests go through it and skip the loopback TCP stack
+_UDS = os.getenv("TRUSTIE_UDS")
+
+def _client() -> httpx.AsyncClient:
+    limits = httpx.Limits(max_connections=32, keepalive_expiry=30)
+    transport = httpx.AsyncHTTPTransport(uds=_UDS, limits=limits) if _UDS else None
+    return httpx.AsyncClient(base_url=BASE_URL, limits=limits, transport=transport)
+
+# Test data
+_TEST_PHONES = (
+    "+18005551234",  # US toll-free (suspicious)
+    "+12345678901",  # Regular US number
+    "+447911123456",  # UK number (international)
+    "555-1234",      # Local number
+)
+
+# Test scam detection with context
+_SCAM_CASES = (
+    {
+        "phone_number": "+18005551234",
+        "context": "Caller says my social security account is suspended"
+    },
+    {
+        "phone_number": "+12345678901",
+        "context": "Regular call from friend"
+    },
+)
+
+# Independent checks run concurrently over one keep-alive connection pool.
+# Each test collects its output and returns it, and every section is
+# printed as a whole as soon as it completes, so sections never interleave.
+
+# Error bodies are only shown for context, no need to read more than this
+_ERROR_BODY_LIMIT = 512
+
+async def _request(client: httpx.AsyncClient, method: str, url: str, **kwargs) -> Tuple[int, Any]:
+    """
+    Status code and parsed body of a call. The body is streamed: a 200 is read
+    and decoded in full, an error only up to _ERROR_BODY_LIMIT bytes, as text.
+    """
+    async with client.stream(method, url, **kwargs) as response:
         if response.status_code == 200:
-            result = response.json()
-            print(f"  Found: {result['found']}")
-            print(f"  Flagged: {result['is_flagged']}")
-            print(f"  Risk Score: {result['risk_score']}")
-            if result.get('flag_reason'):
-                print(f"  Reason: {result['flag_reason']}")
-        else:
-            print(f"  Error: {response.status_code} - {response.text}")
-
-def test_scam_detection():
+            return response.status_code, orjson.loads(await response.aread())
+        head = b""
+        async for chunk in response.aiter_bytes():
+            head += chunk
+            if len(head) >= _ERROR_BODY_LIMIT:
+                break
+        return response.status_code, head[:_ERROR_BODY_LIMIT].decode(errors="replace")
+
+async def _check_one_phone(client: httpx.AsyncClient, phone: str) -> List[str]:
+    out = [f"\nChecking phone: {phone}"]
+
+    # Test basic phone check
+    status, result = await _request(client, "POST", "/phone/check", json={
+        "phone_number": phone,
+        "user_id": 1
+    })
+
+    if status == 200:
+        out.append(f"  Found: {result['found']}")
+        out.append(f"  Flagged: {result['is_flagged']}")
+        out.append(f"  Risk Score: {result['risk_score']}")
+        if result.get('flag_reason'):
+            out.append(f"  Reason: {result['flag_reason']}")
+    else:
+        out.append(f"  Error: {status} - {result}")
+    return out
+
+async def test_phone_check(client: httpx.AsyncClient) -> List[str]:
+    """Test phone number checking functionality"""
+    out = ["=== Testing Phone Number Check ==="]
+
+    # Each number's lines are added as soon as its check answers
+    for check in asyncio.as_completed([_check_one_phone(client, phone) for phone in _TEST_PHONES]):
+        out.extend(await check)
+    return out
+
+async def _detect_one(client: httpx.AsyncClient, case: Dict[str, Any]) -> List[str]:
+    out = [f"\nDetecting scam for: {case['phone_number']}", f"Context: {case['context']}"]
+
+    status, result = await _request(client, "POST", "/scam-detection/detect", json={
+        "phone_number": case["phone_number"],
+        "user_id": 1,
+        "context": case["context"]
+    })
+
+    if status == 200:
+        out.append(f"  AI Analysis: {result['ai_analysis']['result_label']}")
+        out.append(f"  Risk Score: {result['ai_analysis']['risk_score']}")
+        out.append(f"  Alert Created: {result['alert_created']}")
+        out.append(f"  Recommendation: {result['recommendation']}")
+    else:
+        out.append(f"  Error: {status} - {result}")
+    return out
+
+async def test_scam_detection(client: httpx.AsyncClient) -> List[str]:
     """Test comprehensive scam detection"""
-    print("\n=== Testing Scam Detection ===")
-    
-    # Test scam detection with context
-    test_cases = [
-        {
-            "phone_number": "+18005551234",
-            "context": "Caller says my social security account is suspended"
-        },
-        {
-            "phone_number": "+12345678901",
-            "context": "Regular call from friend"
-        }
-    ]
-    
-    for case in test_cases:
-        print(f"\nDetecting scam for: {case['phone_number']}")
-        print(f"Context: {case['context']}")
-        
-        response = requests.post(f"{BASE_URL}/scam-detection/detect", json={
-            "phone_number": case["phone_number"],
-            "user_id": 1,
-            "context": case["context"]
-        })
-        
-        if response.status_code == 200:
-            result = response.json()
-            print(f"  AI Analysis: {result['ai_analysis']['result_label']}")
-            print(f"  Risk Score: {result['ai_analysis']['risk_score']}")
-            print(f"  Alert Created: {result['alert_created']}")
-            print(f"  Recommendation: {result['recommendation']}")
-        else:
-            print(f"  Error: {response.status_code} - {response.text}")
-
-def test_alerts():
+    out = ["\n=== Testing Scam Detection ==="]
+
+    for detection in asyncio.as_completed([_detect_one(client, case) for case in _SCAM_CASES]):
+        out.extend(await detection)
+    return out
+
+async def test_alerts(client: httpx.AsyncClient) -> List[str]:
     """Test alert functionality"""
-    print("\n=== Testing Alerts ===")
-    
-    # Get user alerts
-    response = requests.get(f"{BASE_URL}/alerts/user/1")
-    
-    if response.status_code == 200:
-        alerts = response.json()
-        print(f"Found {len(alerts)} alerts for user")
-        
-        for alert in alerts[:3]:  # Show first 3 alerts
-            print(f"  Alert {alert['id']}: {alert['message']}")
-            print(f"    Type: {alert['alert_type']}, Severity: {alert['severity']}")
-            print(f"    Read: {alert['is_read']}, Acknowledged: {alert['is_acknowledged']}")
+    out = ["\n=== Testing Alerts ==="]
+
+    # Get the user's latest alerts, only as many as are shown
+    status, alerts = await _request(client, "GET", "/alerts/user/1", params={"limit": 3})
+
+    if status == 200:
+        out.append(f"Latest {len(alerts)} alerts for user")
+
+        for alert in alerts:
+            out.append(f"  Alert {alert['id']}: {alert['message']}")
+            out.append(f"    Type: {alert['alert_type']}, Severity: {alert['severity']}")
+            out.append(f"    Read: {alert['is_read']}, Acknowledged: {alert['is_acknowledged']}")
     else:
-        print(f"Error getting alerts: {response.status_code} - {response.text}")
+        out.append(f"Error getting alerts: {status} - {alerts}")
+    return out
 
-def test_risk_assessment():
+async def test_risk_assessment(client: httpx.AsyncClient) -> List[str]:
     """Test risk assessment without creating alerts"""
-    print("\n=== Testing Risk Assessment ===")
-    
+    out = ["\n=== Testing Risk Assessment ==="]
+
     test_phone = "+18005551234"
-    
-    response = requests.get(f"{BASE_URL}/scam-detection/risk-assessment/{test_phone}?context=urgent call about account")
-    
-    if response.status_code == 200:
-        result = response.json()
-        print(f"Phone: {result['phone_number']}")
-        print(f"Overall Risk Score: {result['overall_risk_score']}")
-        print(f"Risk Level: {result['risk_level']}")
-        print(f"Recommendation: {result['recommendation']}")
-        print(f"AI Confidence: {result['ai_analysis']['confidence_score']}%")
+
+    status, result = await _request(client, "GET", f"/scam-detection/risk-assessment/{test_phone}",
+                                    params={"context": "urgent call about account"})
+
+    if status == 200:
+        out.append(f"Phone: {result['phone_number']}")
+        out.append(f"Overall Risk Score: {result['overall_risk_score']}")
+        out.append(f"Risk Level: {result['risk_level']}")
+        out.append(f"Recommendation: {result['recommendation']}")
+        out.append(f"AI Confidence: {result['ai_analysis']['confidence_score']}%")
     else:
-        print(f"Error in risk assessment: {response.status_code} - {response.text}")
+        out.append(f"Error in risk assessment: {status} - {result}")
+    return out
 
-def test_stats():
+async def test_stats(client: httpx.AsyncClient) -> List[str]:
     """Test detection statistics"""
-    print("\n=== Testing Detection Stats ===")
-    
-    response = requests.get(f"{BASE_URL}/scam-detection/stats/1")
-    
-    if response.status_code == 200:
-        stats = response.json()
-        print(f"Total Scans: {stats['total_scans']}")
-        print(f"Total Alerts: {stats['total_alerts']}")
-        print(f"Success Rate: {stats['success_rate']}%")
-        print(f"Recent Activity: {stats['recent_activity']} scans")
+    out = ["\n=== Testing Detection Stats ==="]
+
+    status, stats = await _request(client, "GET", "/scam-detection/stats/1")
+
+    if status == 200:
+        out.append(f"Total Scans: {stats['total_scans']}")
+        out.append(f"Total Alerts: {stats['total_alerts']}")
+        out.append(f"Success Rate: {stats['success_rate']}%")
+        out.append(f"Recent Activity: {stats['recent_activity']} scans")
     else:
-        print(f"Error getting stats: {response.status_code} - {response.text}")
+        out.append(f"Error getting stats: {status} - {stats}")
+    return out
+
+async def _prewarm(client: httpx.AsyncClient) -> None:
+    """Open a pooled connection before the tests, so none of them pays the handshake"""
+    try:
+        await client.get("/docs", timeout=2)
+    except httpx.HTTPError:
+        pass
+
+async def _print_as_completed(*tests) -> None:
+    for test in asyncio.as_completed(tests):
+        print("\n".join(await test))
+
+async def run_tests():
+    async with _client() as client:
+        await _prewarm(client)
+        # Test basic functionality
+        await _print_as_completed(
+            test_phone_check(client),
+            test_scam_detection(client),
+            test_risk_assessment(client),
+        )
+        # Alerts and stats read what the detections above created
+        await _print_as_completed(
+            test_alerts(client),
+            test_stats(client),
+        )
 
 def main():
     """Run all tests"""
     print("Trustie Backend API Test Suite")
     print("=" * 40)
-    
+
     try:
-        # Test basic functionality
-        test_phone_check()
-        test_scam_detection()
-        test_risk_assessment()
-        test_alerts()
-        test_stats()
-        
+        asyncio.run(run_tests())
+
         print("\n" + "=" * 40)
         print("All tests completed!")
-        
-    except requests.exceptions.ConnectionError:
+
+    except httpx.ConnectError:
         print("Error: Could not connect to the API server.")
         print("Make sure the server is running on http://localhost:8000")
         print("Run: uvicorn main:app --reload")
@@ -152,4 +215,4 @@ def main():
         print(f"Error during testing: {str(e)}")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -4,120 +4,126 @@ Test script for the report functionality
 This script demonstrates how to use the report endpoints
 """
 
-import requests
-import json
+import asyncio
+import httpx
+import os
+import orjson
+import sys
+from typing import Any, List, Optional, Tuple
 
 # Base URL for the API
 BASE_URL = "http://localhost:8000"
 
-def test_phone_report():
-    """Test reporting a phone number"""
-    print("Testing phone report...")
-    
-    url = f"{BASE_URL}/reports/phone"
-    data = {
-        "phone_number": "+1234567890",
-        "reason": "Suspicious calls asking for personal information",
-        "user_id": 1,
-        "priority": "high"
-    }
-    
+# When the server listens on a UNIX socket (TRUSTIE_UDS=/tmp/trustie.sock),
+# requests go through it and skip the loopback TCP stack
+_UDS = os.getenv("TRUSTIE_UDS")
+
+def _client() -> httpx.AsyncClient:
+    limits = httpx.Limits(max_connections=32, keepalive_expiry=30)
+    transport = httpx.AsyncHTTPTransport(uds=_UDS, limits=limits) if _UDS else None
+    return httpx.AsyncClient(base_url=BASE_URL, limits=limits, transport=transport)
+
+# Full response bodies are only pretty-printed for a terminal; piped or CI
+# runs get the status lines alone
+_PRETTY = sys.stdout.isatty()
+
+# Test payloads, serialized once at import and sent as ready-made bodies
+_JSON_HEADERS = {"Content-Type": "application/json"}
+_PHONE_REPORT = orjson.dumps({
+    "phone_number": "+1234567890",
+    "reason": "Suspicious calls asking for personal information",
+    "user_id": 1,
+    "priority": "high"
+})
+_WEBSITE_REPORT = orjson.dumps({
+    "domain": "suspicious-site.com",
+    "reason": "Phishing website asking for login credentials",
+    "user_id": 1,
+    "priority": "high",
+    "url": "https://suspicious-site.com/login"
+})
+_SMS_REPORT = orjson.dumps({
+    "sender_phone": "+1987654321",
+    "reason": "Suspicious SMS claiming prize win",
+    "user_id": 1,
+    "priority": "medium",
+    "message_body": "You have won $1000! Click here to claim: http://fake-link.com"
+})
+
+# Each test returns its printed output along with the response, so tests can
+# run concurrently and still report in order
+TestResult = Tuple[List[str], Optional[Any]]
+
+async def _call(client: httpx.AsyncClient, title: str, method: str, url: str, content: Optional[bytes] = None) -> TestResult:
+    out = [title]
     try:
-        response = requests.post(url, json=data)
-        print(f"Status Code: {response.status_code}")
-        print(f"Response: {json.dumps(response.json(), indent=2)}")
-        return response.json() if response.status_code == 200 else None
+        # Streamed, so an error body that won't be printed is never read
+        headers = _JSON_HEADERS if content is not None else None
+        async with client.stream(method, url, content=content, headers=headers) as response:
+            out.append(f"Status Code: {response.status_code}")
+            if response.status_code != 200 and not _PRETTY:
+                return out, None
+            body = orjson.loads(await response.aread())
+        if _PRETTY:
+            out.append(f"Response: {orjson.dumps(body, option=orjson.OPT_INDENT_2).decode()}")
+        return out, body if response.status_code == 200 else None
     except Exception as e:
-        print(f"Error: {e}")
-        return None
+        out.append(f"Error: {e}")
+        return out, None
+
+async def test_phone_report(client: httpx.AsyncClient) -> TestResult:
+    """Test reporting a phone number"""
+    return await _call(client, "Testing phone report...", "POST", "/reports/phone", _PHONE_REPORT)
 
-def test_website_report():
+async def test_website_report(client: httpx.AsyncClient) -> TestResult:
     """Test reporting a website"""
-    print("\nTesting website report...")
-    
-    url = f"{BASE_URL}/reports/website"
-    data = {
-        "domain": "suspicious-site.com",
-        "reason": "Phishing website asking for login credentials",
-        "user_id": 1,
-        "priority": "high",
-        "url": "https://suspicious-site.com/login"
-    }
-    
-    try:
-        response = requests.post(url, json=data)
-        print(f"Status Code: {response.status_code}")
-        print(f"Response: {json.dumps(response.json(), indent=2)}")
-        return response.json() if response.status_code == 200 else None
-    except Exception as e:
-        print(f"Error: {e}")
-        return None
+    return await _call(client, "\nTesting website report...", "POST", "/reports/website", _WEBSITE_REPORT)
 
-def test_sms_report():
+async def test_sms_report(client: httpx.AsyncClient) -> TestResult:
     """Test reporting an SMS"""
-    print("\nTesting SMS report...")
-    
-    url = f"{BASE_URL}/reports/sms"
-    data = {
-        "sender_phone": "+1987654321",
-        "reason": "Suspicious SMS claiming prize win",
-        "user_id": 1,
-        "priority": "medium",
-        "message_body": "You have won $1000! Click here to claim: http://fake-link.com"
-    }
-    
-    try:
-        response = requests.post(url, json=data)
-        print(f"Status Code: {response.status_code}")
-        print(f"Response: {json.dumps(response.json(), indent=2)}")
-        return response.json() if response.status_code == 200 else None
-    except Exception as e:
-        print(f"Error: {e}")
-        return None
+    return await _call(client, "\nTesting SMS report...", "POST", "/reports/sms", _SMS_REPORT)
 
-def test_get_user_reports():
+async def test_get_user_reports(client: httpx.AsyncClient) -> TestResult:
     """Test getting reports for a user"""
-    print("\nTesting get user reports...")
-    
-    url = f"{BASE_URL}/reports/user/1"
-    
-    try:
-        response = requests.get(url)
-        print(f"Status Code: {response.status_code}")
-        print(f"Response: {json.dumps(response.json(), indent=2)}")
-        return response.json() if response.status_code == 200 else None
-    except Exception as e:
-        print(f"Error: {e}")
-        return None
+    return await _call(client, "\nTesting get user reports...", "GET", "/reports/user/1")
 
-def test_get_reports_by_type():
+async def test_get_reports_by_type(client: httpx.AsyncClient) -> TestResult:
     """Test getting reports by type"""
-    print("\nTesting get reports by type (phone)...")
-    
-    url = f"{BASE_URL}/reports/type/phone"
-    
+    return await _call(client, "\nTesting get reports by type (phone)...", "GET", "/reports/type/phone")
+
+async def _prewarm(client: httpx.AsyncClient) -> None:
+    """Open a pooled connection before the tests, so none of them pays the handshake"""
     try:
-        response = requests.get(url)
-        print(f"Status Code: {response.status_code}")
-        print(f"Response: {json.dumps(response.json(), indent=2)}")
-        return response.json() if response.status_code == 200 else None
-    except Exception as e:
-        print(f"Error: {e}")
-        return None
+        await client.get("/docs", timeout=2)
+    except httpx.HTTPError:
+        pass
+
+async def run_tests() -> List[TestResult]:
+    async with _client() as client:
+        await _prewarm(client)
+        # Test creating reports
+        results = await asyncio.gather(
+            test_phone_report(client),
+            test_website_report(client),
+            test_sms_report(client),
+        )
+        # Test retrieving reports, once the ones above exist
+        results += await asyncio.gather(
+            test_get_user_reports(client),
+            test_get_reports_by_type(client),
+        )
+    return results
 
 def main():
     """Run all tests"""
     print("=== Report Functionality Test ===\n")
-    
-    # Test creating reports
-    phone_report = test_phone_report()
-    website_report = test_website_report()
-    sms_report = test_sms_report()
-    
-    # Test retrieving reports
-    user_reports = test_get_user_reports()
-    phone_reports = test_get_reports_by_type()
-    
+
+    results = asyncio.run(run_tests())
+    for out, _ in results:
+        print("\n".join(out))
+
+    phone_report, website_report, sms_report, user_reports, phone_reports = (result for _, result in results)
+
     print("\n=== Test Summary ===")
     print(f"Phone report created: {'Yes' if phone_report else 'No'}")
     print(f"Website report created: {'Yes' if website_report else 'No'}")
@@ -126,4 +132,4 @@ def main():
     print(f"Phone reports retrieved: {'Yes' if phone_reports else 'No'}")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
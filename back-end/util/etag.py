@@ -0,0 +1,18 @@
+from datetime import datetime
+from typing import Optional
+
+def updated_at_etag(updated_at: datetime) -> str:
+    """
+    Weak ETag for a row's representation, which only changes when the row's
+    updated_at does
+    """
+    return f'W/"{updated_at:%Y%m%d%H%M%S%f}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Whether an If-None-Match header value covers etag
+    """
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
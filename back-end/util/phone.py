@@ -0,0 +1,11 @@
+import re
+
+# Everything except digits and '+' is formatting
+_PHONE_FORMATTING_RE = re.compile(r'[^\d+]')
+
+def normalize_phone(phone_number: str) -> str:
+    """
+    Canonical form phone numbers are stored and looked up in: "+84 (912) 345-678"
+    becomes "+84912345678", so an equality match on the indexed column finds it
+    """
+    return _PHONE_FORMATTING_RE.sub('', phone_number)